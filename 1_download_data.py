@@ -4,14 +4,17 @@ UPDATED: Download MORE data for comprehensive coverage
 - 50,000 crop records (multiple states, districts, years)
 - 10,000 rainfall records (comprehensive climate data)
 """
-import requests
-import pandas as pd
 from dotenv import load_dotenv
 import os
 import time
 
+import tracing
+from fetcher import fetch_pages, FetchError
+from checkpoint import Checkpoint
+
 # Load your API key
 load_dotenv()
+tracing.configure()
 API_KEY = os.getenv('DATA_GOV_API_KEY')
 
 # Dataset Resource IDs - VERIFIED WORKING
@@ -20,6 +23,14 @@ DATASETS = {
     "rainfall": "8e0bd482-4aba-4d99-9cb9-ff124f6f1c2f"  # IMD rainfall data
 }
 
+# Number of page requests kept in flight at once
+WORKERS = int(os.getenv('SAMARTH_DOWNLOAD_WORKERS', '8'))
+
+# Records per on-disk shard; bounds how much is held in memory at once
+SHARD_ROWS = 5000
+
+SUMMARY_COLUMNS = ['state_name', 'crop', 'crop_year', 'subdivision', 'year']
+
 def download_dataset(resource_id, dataset_name, limit=10000):
     """Download dataset from data.gov.in with progress tracking"""
     
@@ -28,81 +39,75 @@ def download_dataset(resource_id, dataset_name, limit=10000):
     print(f"Target: {limit} records")
     print(f"{'='*60}")
     
-    url = f"https://api.data.gov.in/resource/{resource_id}"
+    name = dataset_name.replace(' ', '_').lower()
+    folder = 'data/agriculture' if 'crop' in dataset_name.lower() else 'data/climate'
+    os.makedirs(folder, exist_ok=True)
     
-    all_records = []
-    offset = 0
+    # Completed page ranges live on disk as shards, so a failed run can resume
+    checkpoint = Checkpoint(f"data/shards/{name}", resource_id)
+    start_offset = checkpoint.next_offset()
+    if start_offset:
+        print(f"Resuming: {checkpoint.rows:,} records already on disk, continuing from offset {start_offset:,}")
+    
+    buffer = []
+    buffer_start = start_offset
     batch_size = 100
     
-    while offset < limit:
-        params = {
-            "api-key": API_KEY,
-            "format": "json",
-            "offset": offset,
-            "limit": batch_size
-        }
-        
-        print(f"Fetching records {offset} to {offset+batch_size}... ", end='')
-        
-        try:
-            response = requests.get(url, params=params, timeout=30)
+    try:
+        # Pages are fetched concurrently but come back in offset order
+        pages = fetch_pages(resource_id, API_KEY, limit, page_size=batch_size,
+                            workers=WORKERS, start_offset=start_offset)
+        for offset, records in tracing.traced_iter('download.page', pages):
+            if not buffer:
+                buffer_start = offset
+            buffer.extend(records)
+            print(f"Fetched records {offset} to {offset+len(records)}... ✓ Got {len(records)} records")
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                if 'records' in data and len(data['records']) > 0:
-                    all_records.extend(data['records'])
-                    print(f"✓ Got {len(data['records'])} records")
-                    offset += batch_size
-                    
-                    # Small delay to avoid rate limiting
-                    time.sleep(0.5)
-                else:
-                    print("No more records available.")
-                    break
-            else:
-                print(f"Error: HTTP {response.status_code}")
-                break
-                
-        except Exception as e:
-            print(f"Error: {e}")
-            break
-    
-    if all_records:
-        df = pd.DataFrame(all_records)
-        
-        # Create folder
-        folder = 'data/agriculture' if 'crop' in dataset_name.lower() else 'data/climate'
-        os.makedirs(folder, exist_ok=True)
-        
-        # Save
-        filename = f"{folder}/{dataset_name.replace(' ', '_').lower()}.csv"
-        df.to_csv(filename, index=False)
-        
+            if len(buffer) >= SHARD_ROWS:
+                checkpoint.add_shard(buffer_start, buffer)
+                buffer = []
+    except FetchError as e:
+        print(f"Error: {e}")
+    finally:
+        # Persist whatever arrived before the error/interrupt
+        if buffer:
+            checkpoint.add_shard(buffer_start, buffer)
+    
+    filename = f"{folder}/{name}.parquet"
+    with tracing.span('download.consolidate'):
+        total = checkpoint.consolidate(filename)
+    
+    if total:
         print(f"\n✅ SUCCESS!")
-        print(f"   Records downloaded: {len(df)}")
+        print(f"   Records on disk: {total}")
         print(f"   Saved to: {filename}")
         print(f"   File size: {os.path.getsize(filename) / (1024*1024):.2f} MB")
         
-        # Show sample of what we got
-        if 'state_name' in df.columns:
-            print(f"   States: {df['state_name'].nunique()}")
-            print(f"   Sample states: {df['state_name'].unique()[:5].tolist()}")
-        if 'crop' in df.columns:
-            print(f"   Crops: {df['crop'].nunique()}")
-            print(f"   Sample crops: {df['crop'].unique()[:5].tolist()}")
-        if 'crop_year' in df.columns:
-            print(f"   Years: {df['crop_year'].min()} to {df['crop_year'].max()}")
-        if 'subdivision' in df.columns:
-            print(f"   Subdivisions: {df['subdivision'].nunique()}")
-            print(f"   Sample: {df['subdivision'].unique()[:5].tolist()}")
-        if 'year' in df.columns:
-            print(f"   Years: {df['year'].min()} to {df['year'].max()}")
+        # Show sample of what we got (one shard in memory at a time)
+        summary = {}
+        for df in checkpoint.iter_shards(columns=SUMMARY_COLUMNS):
+            for col in df.columns:
+                values = summary.setdefault(col, {})
+                values.update(dict.fromkeys(df[col].dropna().unique().tolist()))
+        
+        if 'state_name' in summary:
+            print(f"   States: {len(summary['state_name'])}")
+            print(f"   Sample states: {list(summary['state_name'])[:5]}")
+        if 'crop' in summary:
+            print(f"   Crops: {len(summary['crop'])}")
+            print(f"   Sample crops: {list(summary['crop'])[:5]}")
+        if 'crop_year' in summary:
+            print(f"   Years: {min(summary['crop_year'])} to {max(summary['crop_year'])}")
+        if 'subdivision' in summary:
+            print(f"   Subdivisions: {len(summary['subdivision'])}")
+            print(f"   Sample: {list(summary['subdivision'])[:5]}")
+        if 'year' in summary:
+            print(f"   Years: {min(summary['year'])} to {max(summary['year'])}")
         
-        return df
+        return total
     else:
         print("\n❌ No data downloaded")
-        return None
+        return 0
 
 def main():
     print("\n" + "="*60)
@@ -115,27 +120,31 @@ def main():
         return
     
     print(f"\n✓ API Key found: {API_KEY[:20]}...")
-    print("\n⚠️  This will take 15-20 minutes. Please be patient!")
+    print("\n⚠️  This may take a few minutes. Please be patient!")
     
     start_time = time.time()
     
     # Download crop production data - GET 50,000 RECORDS
     print("\n[1/2] Downloading Crop Production Data...")
     print("This will give us multiple states, districts, and years")
-    crop_df = download_dataset(
-        DATASETS["crop_production"], 
-        "crop_production",
-        limit=50000  # 50K records for comprehensive coverage
-    )
+    with tracing.span('download.crop_production') as s:
+        crop_rows = download_dataset(
+            DATASETS["crop_production"], 
+            "crop_production",
+            limit=50000  # 50K records for comprehensive coverage
+        )
+        s.set(rows=crop_rows)
     
     # Download rainfall data - GET 10,000 RECORDS
     print("\n[2/2] Downloading Rainfall Data...")
     print("This will give us comprehensive climate patterns")
-    rain_df = download_dataset(
-        DATASETS["rainfall"],
-        "rainfall",
-        limit=10000  # 10K records for better climate coverage
-    )
+    with tracing.span('download.rainfall') as s:
+        rain_rows = download_dataset(
+            DATASETS["rainfall"],
+            "rainfall",
+            limit=10000  # 10K records for better climate coverage
+        )
+        s.set(rows=rain_rows)
     
     elapsed_time = time.time() - start_time
     
@@ -143,15 +152,16 @@ def main():
     print("✅ DATA DOWNLOAD COMPLETE!")
     print("="*60)
     
-    if crop_df is not None:
-        print(f"\n📊 Crop Data: {len(crop_df):,} records")
-        print(f"   Saved to: data/agriculture/crop_production.csv")
+    if crop_rows:
+        print(f"\n📊 Crop Data: {crop_rows:,} records")
+        print(f"   Saved to: data/agriculture/crop_production.parquet")
     
-    if rain_df is not None:
-        print(f"\n🌧️  Rainfall Data: {len(rain_df):,} records")
-        print(f"   Saved to: data/climate/rainfall.csv")
+    if rain_rows:
+        print(f"\n🌧️  Rainfall Data: {rain_rows:,} records")
+        print(f"   Saved to: data/climate/rainfall.parquet")
     
     print(f"\n⏱️  Total time: {elapsed_time/60:.1f} minutes")
+    tracing.print_summary()
     print("\n✅ STEP 1 COMPLETE!")
     print("Next: Run python 2_clean_data.py")
 
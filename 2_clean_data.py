@@ -1,140 +1,245 @@
 """
 Step 2: Clean and Prepare Data
 UPDATED: Handle larger datasets efficiently
+- Raw tables are cleaned in fixed-size chunks and written out incrementally,
+  so peak memory depends on the chunk size, not on the dataset size
+- Optionally, chunks are cleaned in parallel worker processes
 """
 import pandas as pd
 import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import storage
+import tracing
+
+# Rows per cleaning chunk, and worker processes (1 = clean in this process)
+CHUNK_ROWS = int(os.getenv('SAMARTH_CLEAN_CHUNK_ROWS', '100000'))
+WORKERS = int(os.getenv('SAMARTH_CLEAN_WORKERS', '1'))
+
+CROP_CRITICAL_COLS = ['state_name', 'district_name', 'crop_year', 'season', 'crop', 'area_', 'production_']
+
+
+def clean_crop_chunk(df):
+    """Apply the crop cleaning rules to one chunk; returns (cleaned_df, drop_counts)"""
 
-def clean_crop_data():
-    """Clean crop production data (optimized for large dataset)"""
-    
-    print("\n" + "="*60)
-    print("Cleaning Crop Production Data")
-    print("="*60)
-    
-    # Load data
-    print("Loading crop data...")
-    df = pd.read_csv('data/agriculture/crop_production.csv')
-    
-    print(f"Original records: {len(df):,}")
-    print(f"Columns: {list(df.columns)}")
-    
     # Standardize column names
     df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
-    
-    # Identify critical columns
-    critical_cols = []
-    for col in ['state_name', 'district_name', 'crop_year', 'season', 'crop', 'area_', 'production_']:
-        if col in df.columns:
-            critical_cols.append(col)
-    
+
+    # Build one keep-mask rule by rule, so each rule's drops are counted
+    # once and the frame is only copied at the end
+    counts = {}
+    keep = pd.Series(True, index=df.index)
+
     # Remove rows with missing critical data
-    before = len(df)
+    critical_cols = [col for col in CROP_CRITICAL_COLS if col in df.columns]
     if critical_cols:
-        df = df.dropna(subset=critical_cols)
-    after = len(df)
-    print(f"Removed {before - after:,} rows with missing data")
-    
+        keep &= df[critical_cols].notna().all(axis=1)
+    counts['missing'] = int((~keep).sum())
+
     # Remove aggregate/total rows
     if 'district_name' in df.columns:
-        df = df[~df['district_name'].str.lower().str.contains('total', na=False)]
-        print(f"Removed aggregate rows")
-    
+        total_rows = keep & df['district_name'].str.lower().str.contains('total', na=False)
+        counts['aggregate'] = int(total_rows.sum())
+        keep &= ~total_rows
+
     # Convert numeric columns
     for col in ['area_', 'production_', 'crop_year']:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors='coerce')
-    
+
     # Remove rows with zero or negative production
     if 'production_' in df.columns:
-        before = len(df)
-        df = df[df['production_'] > 0]
-        print(f"Removed {before - len(df):,} rows with zero/negative production")
-    
+        bad = keep & ~(df['production_'] > 0)
+        counts['production'] = int(bad.sum())
+        keep &= ~bad
+
     # Remove rows with zero area
     if 'area_' in df.columns:
-        before = len(df)
-        df = df[df['area_'] > 0]
-        print(f"Removed {before - len(df):,} rows with zero area")
-    
-    # Save cleaned data
-    os.makedirs('processed_data', exist_ok=True)
-    df.to_csv('processed_data/crop_data_cleaned.csv', index=False)
-    
-    print(f"\n✅ Cleaned crop data: {len(df):,} records")
-    print(f"   Saved to: processed_data/crop_data_cleaned.csv")
-    
-    if 'state_name' in df.columns:
-        print(f"   States: {df['state_name'].nunique()}")
-        print(f"   Top 5 states: {df['state_name'].value_counts().head().index.tolist()}")
-    if 'crop' in df.columns:
-        print(f"   Crops: {df['crop'].nunique()}")
-        print(f"   Top 5 crops: {df['crop'].value_counts().head().index.tolist()}")
-    if 'crop_year' in df.columns:
-        print(f"   Years: {int(df['crop_year'].min())} to {int(df['crop_year'].max())}")
-    
-    return df
-
-def clean_rainfall_data():
-    """Clean rainfall data (optimized for larger dataset)"""
-    
-    print("\n" + "="*60)
-    print("Cleaning Rainfall Data")
-    print("="*60)
-    
-    # Load data
-    print("Loading rainfall data...")
-    df = pd.read_csv('data/climate/rainfall.csv')
-    
-    print(f"Original records: {len(df):,}")
-    print(f"Columns: {list(df.columns)}")
-    
+        bad = keep & ~(df['area_'] > 0)
+        counts['area'] = int(bad.sum())
+        keep &= ~bad
+
+    return df[keep], counts
+
+
+def clean_rainfall_chunk(df):
+    """Apply the rainfall cleaning rules to one chunk; returns (cleaned_df, drop_counts)"""
+
     # Standardize column names
     df.columns = df.columns.str.lower().str.strip()
-    
+    counts = {}
+
     # Remove rows with missing subdivision or year
-    before = len(df)
-    df = df.dropna(subset=['subdivision', 'year'])
-    print(f"Removed {before - len(df):,} rows with missing subdivision/year")
-    
+    keep = df['subdivision'].notna() & df['year'].notna()
+    counts['missing'] = int((~keep).sum())
+
     # Convert year to integer
     df['year'] = pd.to_numeric(df['year'], errors='coerce')
-    df = df.dropna(subset=['year'])
-    df['year'] = df['year'].astype(int)
-    
-    # Save cleaned data
-    df.to_csv('processed_data/rainfall_data_cleaned.csv', index=False)
-    
-    print(f"\n✅ Cleaned rainfall data: {len(df):,} records")
-    print(f"   Saved to: processed_data/rainfall_data_cleaned.csv")
-    print(f"   Subdivisions: {df['subdivision'].nunique()}")
-    print(f"   Top 5 subdivisions: {df['subdivision'].value_counts().head().index.tolist()}")
-    print(f"   Years: {int(df['year'].min())} to {int(df['year'].max())}")
-    
-    return df
+    bad = keep & df['year'].isna()
+    counts['year'] = int(bad.sum())
+    keep &= ~bad
+
+    return df[keep].astype({'year': int}), counts
+
+
+def _clean_in_chunks(clean_chunk, src, dst, chunk_size, workers, on_chunk):
+    """Stream ``src`` through ``clean_chunk`` into ``dst``, in order
+
+    ``on_chunk`` is called with every cleaned chunk so callers can aggregate
+    statistics. Returns (rows_written, drop_counts summed over all chunks).
+    Raises ValueError if no rows are left, after removing ``dst`` so a
+    previous run's table is never built from.
+    """
+    counts = Counter()
+    chunks = tracing.traced_iter('clean.read', storage.iter_batches(src, batch_size=chunk_size))
+
+    with storage.TableWriter(dst) as writer:
+        def emit(result):
+            df, chunk_counts = result
+            counts.update(chunk_counts)
+            with tracing.span('clean.write', rows=len(df)):
+                writer.write(df)
+            on_chunk(df)
+
+        if workers > 1:
+            # Keep only a couple of chunks per worker in flight to bound memory
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(clean_chunk, chunk))
+                    if len(pending) >= workers * 2:
+                        emit(pending.popleft().result())
+                while pending:
+                    emit(pending.popleft().result())
+        else:
+            for chunk in chunks:
+                with tracing.span('clean.chunk', rows=len(chunk)):
+                    result = clean_chunk(chunk)
+                emit(result)
+
+    if not writer.rows:
+        if os.path.exists(dst):
+            os.remove(dst)
+        print(f"\n❌ ERROR: No rows left after cleaning {src}; removed {dst}")
+        raise ValueError(f"No rows left after cleaning {src}")
+    return writer.rows, counts
+
+
+def clean_crop_data(src='data/agriculture/crop_production.parquet',
+                    dst='processed_data/crop_data_cleaned.parquet',
+                    chunk_size=CHUNK_ROWS, workers=WORKERS):
+    """Clean crop production data (optimized for large dataset)"""
+
+    print("\n" + "="*60)
+    print("Cleaning Crop Production Data")
+    print("="*60)
+
+    # Load data
+    print(f"Streaming crop data in chunks of {chunk_size:,} rows ({workers} worker(s))...")
+    print(f"Original records: {storage.table_rows(src):,}")
+    print(f"Columns: {storage.table_columns(src)}")
+
+    # Summary statistics are accumulated chunk by chunk
+    states = Counter()
+    crops = Counter()
+    years = []
+
+    def collect(df):
+        if 'state_name' in df.columns:
+            states.update(df['state_name'].value_counts().to_dict())
+        if 'crop' in df.columns:
+            crops.update(df['crop'].value_counts().to_dict())
+        if 'crop_year' in df.columns and df['crop_year'].notna().any():
+            years.extend([df['crop_year'].min(), df['crop_year'].max()])
+
+    rows, counts = _clean_in_chunks(clean_crop_chunk, src, dst, chunk_size, workers, collect)
+    states = +states
+    crops = +crops
+
+    print(f"Removed {counts['missing']:,} rows with missing data")
+    print(f"Removed {counts['aggregate']:,} aggregate rows")
+    print(f"Removed {counts['production']:,} rows with zero/negative production")
+    print(f"Removed {counts['area']:,} rows with zero area")
+
+    print(f"\n✅ Cleaned crop data: {rows:,} records")
+    print(f"   Saved to: {dst}")
+
+    if states:
+        print(f"   States: {len(states)}")
+        print(f"   Top 5 states: {[name for name, _ in states.most_common(5)]}")
+    if crops:
+        print(f"   Crops: {len(crops)}")
+        print(f"   Top 5 crops: {[name for name, _ in crops.most_common(5)]}")
+    if years:
+        print(f"   Years: {int(min(years))} to {int(max(years))}")
+
+    return rows, counts
+
+
+def clean_rainfall_data(src='data/climate/rainfall.parquet',
+                        dst='processed_data/rainfall_data_cleaned.parquet',
+                        chunk_size=CHUNK_ROWS, workers=WORKERS):
+    """Clean rainfall data (optimized for larger dataset)"""
+
+    print("\n" + "="*60)
+    print("Cleaning Rainfall Data")
+    print("="*60)
+
+    # Load data
+    print(f"Streaming rainfall data in chunks of {chunk_size:,} rows ({workers} worker(s))...")
+    print(f"Original records: {storage.table_rows(src):,}")
+    print(f"Columns: {storage.table_columns(src)}")
+
+    subdivisions = Counter()
+    years = []
+
+    def collect(df):
+        subdivisions.update(df['subdivision'].value_counts().to_dict())
+        if len(df):
+            years.extend([df['year'].min(), df['year'].max()])
+
+    rows, counts = _clean_in_chunks(clean_rainfall_chunk, src, dst, chunk_size, workers, collect)
+    subdivisions = +subdivisions
+
+    print(f"Removed {counts['missing']:,} rows with missing subdivision/year")
+    print(f"Removed {counts['year']:,} rows with a non-numeric year")
+
+    print(f"\n✅ Cleaned rainfall data: {rows:,} records")
+    print(f"   Saved to: {dst}")
+    print(f"   Subdivisions: {len(subdivisions)}")
+    print(f"   Top 5 subdivisions: {[name for name, _ in subdivisions.most_common(5)]}")
+    if years:
+        print(f"   Years: {int(min(years))} to {int(max(years))}")
+
+    return rows, counts
 
 def main():
     print("\n" + "="*60)
     print("PROJECT SAMARTH - DATA CLEANING")
     print("="*60)
-    
+
     # Check if data exists
-    if not os.path.exists('data/agriculture/crop_production.csv'):
+    if not os.path.exists('data/agriculture/crop_production.parquet'):
         print("\n❌ ERROR: Run 1_download_data.py first!")
         return
-    
+
     # Clean crop data
-    crop_df = clean_crop_data()
-    
+    with tracing.span('clean.crop') as s:
+        crop_rows, _ = clean_crop_data()
+        s.set(rows=crop_rows)
+
     # Clean rainfall data
-    rain_df = clean_rainfall_data()
-    
+    with tracing.span('clean.rainfall') as s:
+        rain_rows, _ = clean_rainfall_data()
+        s.set(rows=rain_rows)
+
     print("\n" + "="*60)
     print("✅ DATA CLEANING COMPLETE!")
     print("="*60)
-    print(f"\nTotal cleaned records: {len(crop_df) + len(rain_df):,}")
+    print(f"\nTotal cleaned records: {crop_rows + rain_rows:,}")
     print("\nNext: Run python 3_build_vectorstore.py")
+    tracing.print_summary()
 
 if __name__ == "__main__":
     main()
-
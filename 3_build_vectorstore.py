@@ -2,154 +2,321 @@
 Step 3: Build Vector Database
 Updated for REAL crop production dataset
 """
-import pandas as pd
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores import FAISS
-from langchain.schema import Document
+import argparse
+import faiss
+import itertools
 import os
+from collections import Counter
 
-def create_documents_from_crop_data():
-    """Convert crop data to text documents (UPDATED FORMAT)"""
+import embedding_backends
+import climatology
+import join_index
+import rollups
+import tracing
+import vector_index
+from documents import (crop_documents, rainfall_documents, crop_keys, rainfall_keys,
+                       iter_document_batches)
+from embedding_cache import CachedEmbeddings, cache_key
+
+# Documents rendered and embedded per batch
+BATCH_SIZE = 5000
+
+EMBEDDING_CACHE_DIR = "embedding_cache"
+VECTORSTORE_DIR = "vectorstore"
+
+CROP_DATA = 'processed_data/crop_data_cleaned.parquet'
+RAINFALL_DATA = 'processed_data/rainfall_data_cleaned.parquet'
+
+# Where the docstore takes each source's typed rows from (same order as the build)
+DOCUMENT_TABLES = [
+    ('crop_production', CROP_DATA, crop_keys),
+    ('rainfall', RAINFALL_DATA, rainfall_keys),
+]
+
+def create_documents_from_crop_data(batch_size=BATCH_SIZE):
+    """Convert crop data to (row keys, text documents) batches (UPDATED FORMAT)"""
     
     print("\n" + "="*60)
     print("Creating documents from crop data...")
     print("="*60)
     
-    df = pd.read_csv('processed_data/crop_data_cleaned.csv')
-    
-    documents = []
-    
-    for idx, row in df.iterrows():
-        # Create readable text from data (NEW FIELDS)
-        text = f"""
-Agricultural Production Data:
-State: {row.get('state_name', 'N/A')}
-District: {row.get('district_name', 'N/A')}
-Crop: {row.get('crop', 'N/A')}
-Season: {row.get('season', 'N/A')}
-Year: {row.get('crop_year', 'N/A')}
-Area: {row.get('area_', 0)} hectares
-Production: {row.get('production_', 0)} tonnes
-Yield: {row.get('production_', 0) / row.get('area_', 1) if row.get('area_', 0) > 0 else 0:.2f} tonnes/hectare
-Source: Ministry of Agriculture, data.gov.in
-        """
-        
-        metadata = {
-            'source': 'crop_production',
-            'state': str(row.get('state_name', 'N/A')),
-            'district': str(row.get('district_name', 'N/A')),
-            'crop': str(row.get('crop', 'N/A')),
-            'year': str(row.get('crop_year', 'N/A')),
-            'season': str(row.get('season', 'N/A'))
-        }
-        
-        documents.append(Document(page_content=text, metadata=metadata))
-        
-        if (idx + 1) % 500 == 0:
-            print(f"  Processed {idx + 1} records...")
-    
-    print(f"✅ Created {len(documents)} crop documents")
-    return documents
-
-def create_documents_from_rainfall_data():
-    """Convert rainfall data to text documents"""
+    count = 0
+    for keys, batch in iter_document_batches(CROP_DATA,
+                                             crop_documents, crop_keys, batch_size):
+        count += len(batch)
+        print(f"  Processed {count} records...")
+        yield keys, batch
+    
+    print(f"✅ Created {count} crop documents")
+
+def create_documents_from_rainfall_data(batch_size=BATCH_SIZE):
+    """Convert rainfall data to (row keys, text documents) batches"""
     
     print("\n" + "="*60)
     print("Creating documents from rainfall data...")
     print("="*60)
     
-    df = pd.read_csv('processed_data/rainfall_data_cleaned.csv')
-    
-    documents = []
-    
-    for idx, row in df.iterrows():
-        # Create readable text from data
-        text = f"""
-Climate Data - Rainfall:
-Subdivision: {row.get('subdivision', 'N/A')}
-Year: {row.get('year', 'N/A')}
-January: {row.get('jan', 0)} mm
-February: {row.get('feb', 0)} mm
-March: {row.get('mar', 0)} mm
-April: {row.get('apr', 0)} mm
-May: {row.get('may', 0)} mm
-June: {row.get('jun', 0)} mm
-July: {row.get('jul', 0)} mm
-August: {row.get('aug', 0)} mm
-September: {row.get('sep', 0)} mm
-October: {row.get('oct', 0)} mm
-November: {row.get('nov', 0)} mm
-December: {row.get('dec', 0)} mm
-Annual Total: {row.get('annual', 0)} mm
-Source: India Meteorological Department, data.gov.in
-        """
-        
-        metadata = {
-            'source': 'rainfall',
-            'subdivision': str(row.get('subdivision', 'N/A')),
-            'year': str(row.get('year', 'N/A'))
-        }
-        
-        documents.append(Document(page_content=text, metadata=metadata))
-        
-        if (idx + 1) % 100 == 0:
-            print(f"  Processed {idx + 1} records...")
-    
-    print(f"✅ Created {len(documents)} rainfall documents")
-    return documents
-
-def build_vectorstore(documents):
-    """Create FAISS vector store from documents"""
+    count = 0
+    for keys, batch in iter_document_batches(RAINFALL_DATA,
+                                             rainfall_documents, rainfall_keys, batch_size):
+        count += len(batch)
+        print(f"  Processed {count} records...")
+        yield keys, batch
+    
+    print(f"✅ Created {count} rainfall documents")
+
+def load_embeddings():
+    """Embedding cache in front of the model; the model is only loaded on a cache miss"""
+    embeddings = CachedEmbeddings(
+        embedding_backends.model_name(),
+        load_model=embedding_backends.get_embeddings,
+        cache_dir=EMBEDDING_CACHE_DIR,
+    )
+    print(f"✅ Embedding cache opened for {embeddings.model_name} ({len(embeddings.cache):,} cached vectors)")
+    return embeddings
+
+def live_embeddings_backend():
+    """Embedding backend of the live index (None if there is no index)"""
+    generation = vector_index.current_generation(VECTORSTORE_DIR)
+    if generation is None:
+        return None
+    config = vector_index.load_config(vector_index.generation_path(VECTORSTORE_DIR, generation))
+    # Indexes from before the backend was recorded were built with the default model
+    return config.get('embeddings', 'huggingface')
+
+def collect_garbage(embeddings):
+    dropped = embeddings.cache.gc(embeddings.seen_keys)
+    print(f"✅ Removed {dropped:,} unreferenced vectors from the embedding cache")
+
+def to_flat_index(vectorstore, embeddings):
+    """Swap an approximate index for an exact one, with vectors taken from the embedding cache
+
+    IVF/HNSW indexes can't delete rows without breaking the positional mapping
+    to the docstore, so updates are applied to a flat copy and the approximate
+    index is rebuilt afterwards.
+    """
+    ids = [vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)]
+    flat = faiss.IndexFlatL2(vectorstore.index.d)
+    for start in range(0, len(ids), BATCH_SIZE):
+        texts = [vectorstore.docstore.search(doc_id).page_content for doc_id in ids[start:start + BATCH_SIZE]]
+        flat.add(embeddings.embed_documents_array(texts))
+    vectorstore.index = flat
+
+def finalize_index(vectorstore, config):
+    """Replace the flat build index with the configured index type"""
+    if config["type"] == "flat":
+        return
+    print(f"Building {config['type']} index ({config['params']})...")
+    vectorstore.index = vector_index.build_index(vector_index.flat_vectors(vectorstore.index), config)
+
+def build_vectorstore(batches, gc_cache=False, config=None):
+    """Create FAISS vector store from (row keys, documents) batches"""
     
     print("\n" + "="*60)
     print("Building vector database...")
     print("="*60)
     
-    # Create embeddings
-    print("Loading embedding model...")
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
-    print("✅ Embedding model loaded")
+    embeddings = load_embeddings()
     
     # Create vector store
     print("Creating vector store (this may take a few minutes)...")
-    vectorstore = FAISS.from_documents(documents, embeddings)
+    vectorstore = None
+    seen = Counter()
+    all_keys, all_hashes = [], []
+    for keys, documents in tracing.traced_iter('build.documents', batches):
+        keys = vector_index.unique_keys(keys, seen)
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata for doc in documents]
+        with tracing.span('build.embed', docs=len(texts)) as s:
+            misses = embeddings.misses
+            vectors = embeddings.embed_documents_array(texts)
+            s.set(cache_misses=embeddings.misses - misses)
+        with tracing.span('build.add', docs=len(texts)):
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(zip(texts, vectors), embeddings,
+                                                    metadatas=metadatas, ids=keys)
+            else:
+                vectorstore.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=keys)
+        all_keys += keys
+        all_hashes += [vector_index.content_hash(text) for text in texts]
+    
+    if vectorstore is None:
+        print("\n❌ ERROR: No documents were created from the cleaned data; nothing to index")
+        return None
+    
+    print(f"✅ Embedded {embeddings.misses:,} new documents, reused {embeddings.hits:,} cached vectors")
     
-    # Save vector store
-    os.makedirs('vectorstore', exist_ok=True)
-    vectorstore.save_local("vectorstore")
+    if gc_cache:
+        collect_garbage(embeddings)
     
-    print("✅ Vector store saved to: vectorstore/")
+    config = config or vector_index.index_config("flat")
+    # Recorded so the app and service query with the vectors' own backend
+    config = dict(config, embeddings=embedding_backends.backend_name())
+    with tracing.span('build.index', type=config["type"]):
+        finalize_index(vectorstore, config)
+    
+    # Save vector store as a new generation and switch the app over to it
+    with tracing.span('build.publish', docs=len(all_keys)):
+        generation = vector_index.publish(VECTORSTORE_DIR, vectorstore, all_keys, all_hashes,
+                                          DOCUMENT_TABLES, config)
+    
+    print(f"✅ Vector store saved to: {VECTORSTORE_DIR}/{generation}/")
+    
+    return vectorstore
+
+def update_vectorstore(batches, gc_cache=False, config=None):
+    """Apply only the rows that were added, changed or removed since the live index was built"""
+    
+    print("\n" + "="*60)
+    print("Updating vector database incrementally...")
+    print("="*60)
+    
+    indexed = vector_index.load_manifest(VECTORSTORE_DIR)
+    embeddings = load_embeddings()
+    generation = vector_index.current_generation(VECTORSTORE_DIR)
+    path = vector_index.generation_path(VECTORSTORE_DIR, generation)
+    vectorstore = vector_index.load(path, embeddings, in_memory=True)
+    live_config = vector_index.load_config(path)
+    config = dict(config or live_config, embeddings=embedding_backends.backend_name())
+    
+    # Diff every row against the manifest; only new or changed rows are kept in memory
+    seen = Counter()
+    all_keys, all_hashes = [], []
+    pending_keys, pending_docs = [], []
+    for keys, documents in tracing.traced_iter('build.documents', batches):
+        keys = vector_index.unique_keys(keys, seen)
+        for key, doc in zip(keys, documents):
+            digest = vector_index.content_hash(doc.page_content)
+            all_keys.append(key)
+            all_hashes.append(digest)
+            if indexed.get(key) != digest:
+                pending_keys.append(key)
+                pending_docs.append(doc)
+            if gc_cache:
+                embeddings.seen_keys.add(cache_key(embeddings.model_name, doc.page_content))
+    
+    changed = [key for key in pending_keys if key in indexed]
+    removed = indexed.keys() - set(all_keys)
+    added = len(pending_keys) - len(changed)
+    print(f"Rows: {added:,} new, {len(changed):,} changed, {len(removed):,} removed, "
+          f"{len(all_keys) - len(pending_keys):,} unchanged")
+    
+    if not (pending_keys or removed) and config == live_config:
+        print("✅ Vector store already up to date")
+        return vectorstore
+    
+    if live_config["type"] != "flat":
+        to_flat_index(vectorstore, embeddings)
+    
+    # Replace = delete the stale vectors, then add the new ones under the same IDs
+    stale = changed + sorted(removed)
+    if stale:
+        vectorstore.delete(stale)
+    if pending_docs:
+        texts = [doc.page_content for doc in pending_docs]
+        with tracing.span('build.embed', docs=len(texts)):
+            vectors = embeddings.embed_documents_array(texts)
+        with tracing.span('build.add', docs=len(texts)):
+            vectorstore.add_embeddings(zip(texts, vectors),
+                                       metadatas=[doc.metadata for doc in pending_docs],
+                                       ids=pending_keys)
+    
+    if gc_cache:
+        collect_garbage(embeddings)
+    
+    with tracing.span('build.index', type=config["type"]):
+        finalize_index(vectorstore, config)
+    with tracing.span('build.publish', docs=len(all_keys)):
+        generation = vector_index.publish(VECTORSTORE_DIR, vectorstore, all_keys, all_hashes,
+                                          DOCUMENT_TABLES, config)
+    print(f"✅ Vector store updated: {VECTORSTORE_DIR}/{generation}/")
     
     return vectorstore
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the Samarth vector database")
+    parser.add_argument('--gc-cache', action='store_true',
+                        help="drop cached embeddings not referenced by the current corpus")
+    parser.add_argument('--update', action='store_true',
+                        help="apply only added/changed/removed rows to the existing index")
+    parser.add_argument('--skip-rollups', action='store_true',
+                        help="leave rollups, crop x rainfall joins and the climatology to another process "
+                             "(pipeline.py builds them in parallel)")
+    parser.add_argument('--index-type', choices=list(vector_index.INDEX_TYPES),
+                        help="FAISS index type (default: flat, or the live index's type with --update)")
+    parser.add_argument('--nlist', type=int, help="IVF: number of clusters")
+    parser.add_argument('--nprobe', type=int, help="IVF: clusters searched per query")
+    parser.add_argument('--pq-m', type=int, help="IVF-PQ: sub-quantizers per vector")
+    parser.add_argument('--hnsw-m', type=int, help="HNSW: neighbours per node")
+    parser.add_argument('--ef-search', type=int, help="HNSW: search candidate list size")
+    args = parser.parse_args()
+    
+    config = None
+    if args.index_type:
+        config = vector_index.index_config(
+            args.index_type, nlist=args.nlist, nprobe=args.nprobe,
+            pq_m=args.pq_m, hnsw_m=args.hnsw_m, ef_search=args.ef_search,
+        )
+    
     print("\n" + "="*60)
     print("PROJECT SAMARTH - BUILD VECTOR DATABASE (UPDATED)")
     print("="*60)
     
     # Check if cleaned data exists
-    if not os.path.exists('processed_data/crop_data_cleaned.csv'):
+    if not os.path.exists(CROP_DATA):
         print("\n❌ ERROR: Run 2_clean_data.py first!")
         return
     
-    # Create documents
-    crop_docs = create_documents_from_crop_data()
-    rain_docs = create_documents_from_rainfall_data()
+    # Exact aggregate tables for numeric questions (written before the new index goes live)
+    if not args.skip_rollups:
+        print("\n" + "="*60)
+        print("Building aggregate rollups...")
+        print("="*60)
+        with tracing.span('build.rollups'):
+            built = rollups.build_rollups()
+        for name, rows in built.items():
+            print(f"✅ {name}: {rows:,} rows")
+        # Crop rollups next to the rainfall of their IMD subdivisions
+        with tracing.span('build.joins'):
+            joined = join_index.build_join_tables(rainfall_src=RAINFALL_DATA)
+        for name, rows in joined.items():
+            print(f"✅ {name}: {rows:,} rows")
+        # Rainfall packed into arrays with its seasonal statistics
+        with tracing.span('build.climatology'):
+            meta = climatology.build_climatology(src=RAINFALL_DATA)
+        print(f"✅ climatology: {len(meta['subdivisions'])} subdivisions x "
+              f"{meta['last_year'] - meta['first_year'] + 1} years")
     
-    # Combine all documents
-    all_documents = crop_docs + rain_docs
-    print(f"\n📊 Total documents: {len(all_documents)}")
+    # Documents are generated lazily and embedded batch by batch
+    batches = itertools.chain(
+        create_documents_from_crop_data(),
+        create_documents_from_rainfall_data(),
+    )
     
-    # Build vector store
-    vectorstore = build_vectorstore(all_documents)
+    # Build vector store (or patch the live one)
+    backend = embedding_backends.backend_name()
+    live_backend = live_embeddings_backend()
+    if (args.update and vector_index.load_manifest(VECTORSTORE_DIR) is not None
+            and live_backend in (None, backend)):
+        vectorstore = update_vectorstore(batches, gc_cache=args.gc_cache, config=config)
+    else:
+        if args.update and live_backend not in (None, backend):
+            print(f"\nThe live index holds {live_backend} vectors; doing a full build with {backend} instead")
+        elif args.update:
+            print("\nNo row manifest for the current index; doing a full build instead")
+        vectorstore = build_vectorstore(batches, gc_cache=args.gc_cache, config=config)
+    if vectorstore is None:
+        return
+    total = vectorstore.index.ntotal
+    print(f"\n📊 Total documents: {total}")
     
     print("\n" + "="*60)
     print("✅ VECTOR DATABASE COMPLETE!")
     print("="*60)
-    print(f"\nStored {len(all_documents)} documents")
+    print(f"\nStored {total} documents")
     print("\nNext: Run streamlit run 4_app.py")
+    tracing.print_summary()
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,15 @@
 import os
-import sys
+import time
 import streamlit as st
-from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+import shared_store
+import tracing
+import vector_index
+from bootstrap import Bootstrap, STAGES
+
+# langchain, sentence-transformers, faiss and google.generativeai are imported
+# inside the cached loaders below, so the page renders before any of them load
 
 # ONE place for set_page_config - at the very top after imports-only
 st.set_page_config(
@@ -13,56 +18,166 @@ st.set_page_config(
     layout="wide"
 )
 
-# Paths for checking vectorstore existence
-VECTOR_FAISS_PATH = "vectorstore/index.faiss"
-VECTOR_PKL_PATH = "vectorstore/index.pkl"
-if not (os.path.exists(VECTOR_FAISS_PATH) and os.path.exists(VECTOR_PKL_PATH)):
-    with st.spinner("First-time setup: Downloading, cleaning, and indexing data from data.gov.in. This may take several minutes..."):
-        result1 = os.system(f"{sys.executable} 1_download_data.py")
-        result2 = os.system(f"{sys.executable} 2_clean_data.py")
-        result3 = os.system(f"{sys.executable} 3_build_vectorstore.py")
-    if not (os.path.exists(VECTOR_FAISS_PATH) and os.path.exists(VECTOR_PKL_PATH)):
-        st.error("❌ Vector DB could not be built automatically. No data found or error occurred. Please check scripts and API key or report an issue.")
-        st.stop()
+# Root of the versioned vectorstore (CURRENT points at the live generation)
+VECTORSTORE_DIR = "vectorstore"
 
 load_dotenv()
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+tracing.configure()
+
+@st.cache_resource
+def get_bootstrap():
+    # One per server process; the file lock inside covers other processes
+    return Bootstrap(VECTORSTORE_DIR, on_ready=warm_caches)
+
+def warm_caches(generation):
+    # Runs in the bootstrap thread: the fresh index is loaded before the next rerun asks for it
+    load_vectorstore(generation)
+    load_metadata_index(generation)
+    load_lexical_index(generation)
+    load_rollups(generation, rollups_version())
+
+@st.cache_resource(max_entries=1)
+def load_vectorstore(generation):
+    # Cached per generation, so an incremental update is picked up on the next rerun
+    from embedding_backends import for_index
+    # Read-only and memory-mapped (from the SAMARTH_SHARED_DIR mirror if set), so app processes share one copy
+    path = shared_store.generation_path(VECTORSTORE_DIR, generation)
+    # Index + memory-mapped docstore; search params and the embedding backend it was built with are restored too
+    return vector_index.load(path, for_index(path))
+
+@st.cache_resource(max_entries=1)
+def load_metadata_index(generation):
+    # Inverted index over document metadata, saved with each generation (built here for older ones)
+    from metadata_index import MetadataIndex
+    saved = MetadataIndex.load(shared_store.generation_path(VECTORSTORE_DIR, generation))
+    return saved or MetadataIndex.from_vectorstore(load_vectorstore(generation))
+
+@st.cache_resource(max_entries=1)
+def load_lexical_index(generation):
+    # BM25 postings saved with the generation (None for generations built before it existed)
+    from lexical import LexicalIndex
+    return LexicalIndex.load(shared_store.generation_path(VECTORSTORE_DIR, generation))
+
+def rollups_version():
+    from rollups import version
+    return version()
+
+@st.cache_resource(max_entries=1)
+def load_rollups(generation, version):
+    # Cached per generation and per rebuild of the tables (they can be rebuilt on their own)
+    from rollups import RollupStore
+    return RollupStore.load()
+
+@st.cache_resource
+def load_answer_cache():
+    # One cache shared by every session; reset whenever the vectorstore generation or the rollups change
+    from answer_cache import AnswerCache
+    return AnswerCache()
 
 @st.cache_resource
-def load_vectorstore():
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
-    vectorstore = FAISS.load_local(
-        "vectorstore",
-        embeddings,
-        allow_dangerous_deserialization=True
-    )
-    return vectorstore
-
-def get_answer(question, vectorstore):
-    docs = vectorstore.similarity_search(question, k=5)
-    context = "\n\n".join([doc.page_content for doc in docs])
-    prompt = f"""You are an intelligent assistant analyzing Indian agricultural and climate data from data.gov.in.
-
-Use the following context to answer the question accurately.
-
-IMPORTANT INSTRUCTIONS:
-- Provide specific numbers and statistics from the data
-- Always cite the source (state, district, year, subdivision) for each data point
-- If comparing regions, present data in a clear format
-- If data is unavailable, clearly state that
-- Be precise and factual
-
-Context from data.gov.in:
-{context}
-
-Question: {question}
-
-Detailed Answer with Citations:"""
-    model = genai.GenerativeModel('models/gemini-2.5-flash')
-    response = model.generate_content(prompt)
-    return response.text, docs
+def load_llm():
+    # Created once and reused across turns and sessions (LLM_PROVIDER=gemini|stub)
+    from llm import get_backend
+    return get_backend()
+
+def show_sources(sources, table):
+    with st.expander("📚 View Data Sources"):
+        if table is not None:
+            st.write(f"Exact totals over all matching records ({len(table)} rows):")
+            st.dataframe(table, hide_index=True)
+        else:
+            st.write(f"Retrieved {len(sources)} relevant data points:")
+            for i, doc in enumerate(sources, 1):
+                st.markdown(f"**Source {i}:**")
+                st.json(doc.metadata)
+                st.divider()
+
+def answer_question(question, vectorstore, metadata_index, lexical_index, rollups, answer_cache, llm):
+    """Render the answer to ``question`` in the current chat message and return its text
+
+    Cached answers are shown straight away; otherwise sources are shown as soon
+    as retrieval finishes and the LLM answer streams in below them.
+    """
+    entities = metadata_index.extract(question)
+    # The question is embedded at most once, for the cache lookup and retrieval alike
+    vectors = {}
+    def embed(text):
+        if text not in vectors:
+            vectors[text] = vectorstore.embeddings.embed_query(text)
+        return vectors[text]
+    cached, vector = answer_cache.get(question, entities, embed=embed)
+    if cached is not None:
+        st.markdown(cached.answer)
+        st.caption("⚡ Answered from cache")
+        show_sources(cached.sources, cached.table)
+        return cached.answer
+
+    from qa import stream_answer
+    with st.spinner("Analyzing data from data.gov.in..."):
+        sources, table, chunks = stream_answer(question, vectorstore, llm, metadata_index, rollups,
+                                               lexical_index, embed=embed)
+    show_sources(sources, table)
+    response = st.write_stream(chunks)
+    answer_cache.put(question, response, sources, table, entities, vector)
+    return response
+
+def show_bootstrap(bootstrap):
+    """First-run progress; reruns itself every few seconds until the index is live"""
+    status = bootstrap.status()
+    if status is None or status['state'] != 'failed':
+        bootstrap.start()
+
+    st.info("⏳ First-time setup: downloading, cleaning and indexing data from data.gov.in. "
+            "This runs once in the background and may take several minutes - this page updates by itself.")
+    if status is not None:
+        stages = status['stages']
+        finished = sum(stages[name]['state'] == 'done' for name, _, _ in STAGES)
+        st.progress(finished / len(STAGES))
+        icons = {'pending': "⬜", 'running': "🔄", 'done': "✅", 'failed': "❌"}
+        for name, label, _ in STAGES:
+            stage = stages[name]
+            took = f" ({stage['seconds']}s)" if stage['seconds'] is not None else ""
+            st.write(f"{icons[stage['state']]} {label}{took}")
+            if stage['state'] == 'running' and stage['last_line']:
+                st.caption(stage['last_line'])
+
+        if status['state'] == 'failed':
+            st.error(f"❌ Setup failed: {status['error']}. Please check the scripts and API key, or report an issue.")
+            if st.button("🔁 Retry setup"):
+                bootstrap.start()
+                st.rerun()
+            return
+
+    time.sleep(2)
+    st.rerun()
+
+@st.cache_resource
+def start_metrics_server():
+    # Prometheus text on SAMARTH_METRICS_PORT/metrics, once per server process
+    return tracing.serve_metrics()
+
+def show_trace_stats(placeholder):
+    stats = tracing.summary()
+    if not stats:
+        return
+    with placeholder.container():
+        st.subheader("⏱️ Stage Timings")
+        st.dataframe(
+            [{'stage': name, 'runs': s['count'], 'p50 ms': s['p50_ms'], 'p95 ms': s['p95_ms']}
+             for name, s in stats.items()],
+            hide_index=True, use_container_width=True,
+        )
+        prompt = stats.get('answer.prepare', {}).get('attrs', {})
+        if 'prompt_tokens_est' in prompt:
+            st.caption(f"Median prompt: ~{prompt['prompt_tokens_est']:,.0f} tokens "
+                       f"({prompt['prompt_chars']:,.0f} chars)")
+
+def show_cache_stats(placeholder, answer_cache):
+    stats = answer_cache.stats()
+    with placeholder.container():
+        st.subheader("⚡ Answer Cache")
+        st.write(f"Hits: {stats['hits']} ({stats['semantic_hits']} similar) | Misses: {stats['misses']}")
+        st.write(f"Hit rate: {stats['hit_rate']:.0%} | Entries: {stats['entries']} | Evicted: {stats['evictions']}")
 
 def main():
     st.title("🌾 Project Samarth")
@@ -80,14 +195,30 @@ def main():
         st.write("- Show the pattern of sugarcane production in SUPAUL, Bihar from 2010 to 2014")
         st.write("- Tell me about rainfall patterns")
         st.write("- What is the rice production?")
+        cache_panel = st.empty()
+        trace_panel = st.empty()
+
+    bootstrap = get_bootstrap()
+    if not bootstrap.ready():
+        show_bootstrap(bootstrap)
+        return
 
-    if not os.getenv('GOOGLE_API_KEY'):
+    if os.getenv('LLM_PROVIDER', 'gemini').lower() == 'gemini' and not os.getenv('GOOGLE_API_KEY'):
         st.error("❌ Google API key not found. Please add it to .env file or Streamlit Cloud secrets!")
         return
 
     try:
         with st.spinner("Loading Q&A system..."):
-            vectorstore = load_vectorstore()
+            generation = vector_index.current_generation(VECTORSTORE_DIR)
+            vectorstore = load_vectorstore(generation)
+            metadata_index = load_metadata_index(generation)
+            lexical_index = load_lexical_index(generation)
+            version = rollups_version()
+            rollups = load_rollups(generation, version)
+            answer_cache = load_answer_cache()
+            # Answers from the rollups go stale when only the tables are rebuilt, too
+            answer_cache.set_build((generation, version))
+            llm = load_llm()
         st.success("✅ System ready!")
     except Exception as e:
         st.error(f"❌ Error loading system: {e}")
@@ -105,19 +236,17 @@ def main():
         with st.chat_message("user"):
             st.markdown(prompt)
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing data from data.gov.in..."):
-                try:
-                    response, sources = get_answer(prompt, vectorstore)
-                    st.markdown(response)
-                    with st.expander("📚 View Data Sources"):
-                        st.write(f"Retrieved {len(sources)} relevant data points:")
-                        for i, doc in enumerate(sources, 1):
-                            st.markdown(f"**Source {i}:**")
-                            st.json(doc.metadata)
-                            st.divider()
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                except Exception as e:
-                    st.error(f"Error generating response: {e}")
+            try:
+                response = answer_question(prompt, vectorstore, metadata_index, lexical_index,
+                                           rollups, answer_cache, llm)
+                st.session_state.messages.append({"role": "assistant", "content": response})
+            except Exception as e:
+                st.error(f"Error generating response: {e}")
+
+    show_cache_stats(cache_panel, answer_cache)
+    if tracing.enabled():
+        start_metrics_server()
+        show_trace_stats(trace_panel)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,138 @@
+"""
+Shared answer cache for the Q&A app
+- First keyed by normalized question text, then by embedding similarity to
+  earlier questions (cosine >= threshold)
+- A similar question only counts as a hit if it names the same entities
+  (state, district, crop, year...), so '2004' never answers '2005'
+- LRU eviction with a size cap, TTL expiry, and a full reset whenever the
+  vectorstore build (generation) changes
+- Thread-safe: one instance is shared by every Streamlit session
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from metadata_index import normalize
+
+MAX_ENTRIES = int(os.getenv('SAMARTH_ANSWER_CACHE_SIZE', '512'))
+TTL_SECONDS = float(os.getenv('SAMARTH_ANSWER_CACHE_TTL', '3600'))
+SIMILARITY_THRESHOLD = float(os.getenv('SAMARTH_ANSWER_CACHE_THRESHOLD', '0.92'))
+
+
+def entity_signature(entities):
+    """Hashable form of metadata_index.extract() output"""
+    return tuple(sorted((field, tuple(sorted(values))) for field, values in (entities or {}).items()))
+
+
+class CachedAnswer:
+    __slots__ = ('answer', 'sources', 'table', 'vector', 'signature', 'created')
+
+    def __init__(self, answer, sources, table, vector, signature):
+        self.answer = answer
+        self.sources = sources
+        self.table = table
+        self.vector = vector
+        self.signature = signature
+        self.created = time.monotonic()
+
+
+class AnswerCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, threshold=SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.build_id = None
+        self._entries = OrderedDict()      # normalized question -> CachedAnswer, oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set_build(self, build_id):
+        """Drop every answer if the build (e.g. vectorstore generation and rollups version) changed"""
+        with self._lock:
+            if build_id != self.build_id:
+                self._entries.clear()
+                self.build_id = build_id
+
+    def _expired(self, entry, now):
+        return self.ttl > 0 and now - entry.created > self.ttl
+
+    def get(self, question, entities=None, embed=None):
+        """Cached answer for ``question`` or None
+
+        ``embed`` (question -> vector) is only called when there is no exact
+        text match; the vector is returned alongside so put() can reuse it.
+        Returns (CachedAnswer or None, vector or None).
+        """
+        key = normalize(question)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry, entry.vector
+
+        if embed is None or self.threshold >= 1:
+            with self._lock:
+                self.misses += 1
+            return None, None
+
+        vector = _unit(embed(question))
+        signature = entity_signature(entities)
+        with self._lock:
+            best_key, best_score = None, self.threshold
+            for other_key, other in self._entries.items():
+                if other.signature != signature or other.vector is None or self._expired(other, now):
+                    continue
+                score = float(np.dot(vector, other.vector))
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+            if best_key is None:
+                self.misses += 1
+                return None, vector
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            self.semantic_hits += 1
+            return self._entries[best_key], vector
+
+    def put(self, question, answer, sources=(), table=None, entities=None, vector=None):
+        key = normalize(question)
+        entry = CachedAnswer(answer, list(sources), table,
+                             None if vector is None else _unit(vector), entity_signature(entities))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
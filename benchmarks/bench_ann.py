@@ -0,0 +1,108 @@
+"""
+Benchmark: approximate-nearest-neighbour index types vs the exact flat index
+Reports recall@5 against flat, p50/p99 single-query latency, index size and
+build time for each configuration.
+
+Vectors are either synthetic (clustered, unit-normalized, 384-dim like
+all-MiniLM-L6-v2) or the real document vectors from the embedding cache.
+
+Run from the repo root:
+    python -m benchmarks.bench_ann --rows 200000
+    python -m benchmarks.bench_ann --from-cache embedding_cache/sentence-transformers__all-MiniLM-L6-v2
+    python -m benchmarks.bench_ann --configs "ivf:nlist=1024,nprobe=8;hnsw:hnsw_m=16,ef_search=32"
+"""
+import argparse
+import json
+import os
+import time
+
+import faiss
+import numpy as np
+
+import vector_index
+
+DEFAULT_CONFIGS = ";".join([
+    "flat",
+    "ivf:nprobe=4", "ivf:nprobe=16", "ivf:nprobe=64",
+    "ivfsq8:nprobe=16",
+    "ivfpq:nprobe=16",
+    "hnsw:ef_search=32", "hnsw:ef_search=128",
+])
+
+
+def synthetic_vectors(rows, dim=384, clusters=2000, seed=0):
+    """Clustered unit vectors: sentence embeddings of templated rows are far from uniform"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, rows)] + 0.35 * rng.standard_normal((rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def cached_vectors(cache_dir):
+    with open(os.path.join(cache_dir, "meta.json")) as f:
+        meta = json.load(f)
+    path = os.path.join(cache_dir, f"vectors-{meta['generation']}.f32")
+    return np.array(np.memmap(path, dtype=np.float32, mode="r", shape=(meta["rows"], meta["dim"])))
+
+
+def parse_configs(spec):
+    configs = []
+    for item in filter(None, spec.split(";")):
+        name, _, params = item.partition(":")
+        values = {}
+        for pair in filter(None, params.split(",")):
+            key, _, value = pair.partition("=")
+            values[key.strip()] = int(value)
+        configs.append((item, vector_index.index_config(name.strip(), **values)))
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--from-cache", help="embedding cache model directory to take real vectors from")
+    parser.add_argument("--configs", default=DEFAULT_CONFIGS,
+                        help="';'-separated type[:param=value,...] list")
+    args = parser.parse_args()
+
+    vectors = cached_vectors(args.from_cache) if args.from_cache else synthetic_vectors(args.rows)
+    rng = np.random.default_rng(1)
+    # Queries: perturbed corpus vectors, like a question close to one row's text
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    truth_index = faiss.IndexFlatL2(vectors.shape[1])
+    truth_index.add(vectors)
+    _, truth = truth_index.search(queries, args.k)
+
+    print("\n" + "="*60)
+    print("BENCHMARK - ANN INDEX TYPES (recall / latency / size)")
+    print("="*60)
+    print(f"{len(vectors):,} vectors x {vectors.shape[1]} dims, {args.queries} queries, k={args.k}, "
+          f"{faiss.omp_get_max_threads()} thread(s)")
+    print(f"\n{'config':<26} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'size MB':>8} {'build s':>8}")
+
+    for label, config in parse_configs(args.configs):
+        start = time.perf_counter()
+        index = vector_index.build_index(vectors, config)
+        build_s = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+        latencies = []
+        hits = 0
+        for i in range(len(queries)):
+            t = time.perf_counter()
+            _, found = index.search(queries[i:i + 1], args.k)
+            latencies.append((time.perf_counter() - t) * 1000)
+            hits += len(set(found[0]) & set(truth[i]))
+        recall = hits / (len(queries) * args.k)
+
+        print(f"{label:<26} {recall:>9.3f} {np.percentile(latencies, 50):>8.3f} "
+              f"{np.percentile(latencies, 99):>8.3f} {size_mb:>8.1f} {build_s:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark: peak RSS and throughput of crop cleaning
+Compares the previous whole-frame cleaner with the chunked/streaming cleaner
+(single process and with a process pool). Each mode runs in a fresh
+subprocess so its peak RSS is measured in isolation.
+
+Run from the repo root:
+    python -m benchmarks.bench_clean --rows 2000000
+    python -m benchmarks.bench_clean --rows 2000000 --chunk-size 50000 --workers 4
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+
+def make_raw_crop_table(path, rows, seed=0):
+    """Synthetic raw crop table with the real schema and some dirty rows"""
+    rng = np.random.default_rng(seed)
+    with storage.TableWriter(path) as writer:
+        for start in range(0, rows, 500_000):
+            n = min(500_000, rows - start)
+            districts = np.array([f"DISTRICT_{i}" for i in range(640)] + ["Total"], dtype=object)
+            df = pd.DataFrame({
+                'state_name': rng.choice([f"STATE_{i}" for i in range(33)], n),
+                'district_name': districts[rng.integers(0, len(districts), n)],
+                'crop_year': rng.integers(1997, 2015, n),
+                'season': rng.choice(['Kharif', 'Rabi', 'Whole Year', 'Summer'], n),
+                'crop': rng.choice([f"CROP_{i}" for i in range(120)], n),
+                'area_': rng.gamma(2.0, 500.0, n).round(1),
+                'production_': rng.gamma(2.0, 1500.0, n).round(1),
+            })
+            # ~2% missing, ~2% zero production
+            df.loc[rng.random(n) < 0.02, 'production_'] = np.nan
+            df.loc[rng.random(n) < 0.02, 'production_'] = 0.0
+            writer.write(df)
+
+
+def legacy_clean(src, dst):
+    """The previous clean_crop_data: whole file in one frame, several full copies"""
+    df = storage.load_table(src)
+    df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
+    critical_cols = [c for c in ['state_name', 'district_name', 'crop_year', 'season',
+                                 'crop', 'area_', 'production_'] if c in df.columns]
+    df = df.dropna(subset=critical_cols)
+    df = df[~df['district_name'].str.lower().str.contains('total', na=False)]
+    for col in ['area_', 'production_', 'crop_year']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df = df[df['production_'] > 0]
+    df = df[df['area_'] > 0]
+    storage.save_table(df, dst)
+    return len(df)
+
+
+def _peak_rss_mb():
+    """Peak RSS of this process; VmHWM is used because ru_maxrss survives exec on Linux"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, src, dst, chunk_size, workers):
+    start = time.perf_counter()
+    if mode == 'legacy':
+        rows = legacy_clean(src, dst)
+    else:
+        cleaner = importlib.import_module('2_clean_data')
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows, _ = cleaner.clean_crop_data(src=src, dst=dst, chunk_size=chunk_size,
+                                              workers=workers if mode == 'pool' else 1)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({'mode': mode, 'rows': rows, 'seconds': elapsed,
+                      'peak_rss_mb': _peak_rss_mb(), 'peak_worker_rss_mb': child_rss / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--modes', default='legacy,chunked,pool')
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    parser.add_argument('--src', help=argparse.SUPPRESS)
+    parser.add_argument('--dst', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.run_mode, args.src, args.dst, args.chunk_size, args.workers)
+        return
+
+    print("\n" + "="*60)
+    print("BENCHMARK - CROP CLEANING (peak RSS / throughput)")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, 'crop_production.parquet')
+        print(f"Generating {args.rows:,} raw rows...")
+        make_raw_crop_table(src, args.rows)
+        print(f"Raw table: {os.path.getsize(src) / (1024*1024):.1f} MB on disk")
+
+        print(f"\n{'mode':>8} {'rows out':>11} {'seconds':>8} {'rows/s':>11} {'peak RSS':>10} {'worker RSS':>11}")
+        for mode in args.modes.split(','):
+            dst = os.path.join(tmp, f'cleaned_{mode}.parquet')
+            out = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_clean', '--run-mode', mode,
+                 '--src', src, '--dst', dst,
+                 '--chunk-size', str(args.chunk_size), '--workers', str(args.workers)],
+                check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            worker = f"{r['peak_worker_rss_mb']:.0f} MB" if mode == 'pool' else '-'
+            print(f"{mode:>8} {r['rows']:>11,} {r['seconds']:>8.2f} {args.rows / r['seconds']:>11,.0f} "
+                  f"{r['peak_rss_mb']:>7.0f} MB {worker:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: rainfall range questions, climatology arrays vs pandas vs document retrieval
+Questions are generated for random subdivisions, periods and year ranges
+("What was the average monsoon rainfall in <subdivision> from 2000 to 2010?").
+Reports:
+  range query   Climatology.range_stats() against the same mean computed with
+                pandas from the cleaned table (and the largest difference)
+  answer path   prepare_answer() with the climatology (rollups) and without
+                (document retrieval, as before): share answered from the
+                climatology, share of prompts that state the exact mean,
+                prompt tokens and p50/p99 ms
+
+Run from the repo root (after 3_build_vectorstore.py):
+    python -m benchmarks.bench_climatology --questions 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+import storage
+from benchmarks.bench_pipeline import _load_live
+from climatology import PERIODS, Climatology
+from join_index import RAINFALL_DATA
+from qa import prepare_answer
+from tracing import estimate_tokens
+
+PERIOD_WORDS = {'jf': 'winter', 'mam': 'pre-monsoon', 'jjas': 'monsoon', 'ond': 'post-monsoon', 'annual': 'annual'}
+
+
+def generate_questions(climatology, count, seed=0):
+    rng = np.random.default_rng(seed)
+    questions = []
+    for _ in range(count):
+        subdivision = climatology.subdivisions[rng.integers(len(climatology.subdivisions))]
+        period = list(PERIODS)[rng.integers(len(PERIODS))]
+        start = int(rng.integers(climatology.first_year, climatology.last_year - 10))
+        end = start + int(rng.integers(3, 11))
+        questions.append({
+            'question': f"What was the average {PERIOD_WORDS[period]} rainfall in {subdivision} "
+                        f"from {start} to {end}?",
+            'subdivision': subdivision, 'period': period, 'start': start, 'end': end,
+        })
+    return questions
+
+
+def _pandas_mean(df, item):
+    rows = df[(df['subdivision'] == item['subdivision']) & df['year'].between(item['start'], item['end'])]
+    months = PERIODS[item['period']]
+    years = rows.groupby('year')[months].mean()
+    if item['period'] == 'annual':
+        totals = rows.groupby('year')['annual'].mean().fillna(years.sum(axis=1, min_count=len(months)))
+    else:
+        totals = years.sum(axis=1, min_count=len(months))
+    return totals.mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectorstore, metadata_index, lexical_index, rollups = _load_live()
+    climatology = rollups.climatology or Climatology.load()
+    if climatology is None:
+        raise SystemExit("❌ No climatology; run 3_build_vectorstore.py first")
+    questions = generate_questions(climatology, args.questions, args.seed)
+
+    print("\n" + "="*60)
+    print("BENCHMARK - RAINFALL CLIMATOLOGY")
+    print("="*60)
+    print(f"{len(questions)} questions, {len(climatology.subdivisions)} subdivisions x "
+          f"{climatology.last_year - climatology.first_year + 1} years")
+
+    df = storage.load_table(RAINFALL_DATA)
+    df['subdivision'] = df['subdivision'].astype(str)
+    array_us, pandas_us, diffs = [], [], []
+    for item in questions:
+        start = time.perf_counter()
+        stats = climatology.range_stats(item['subdivision'], item['period'], item['start'], item['end'])
+        array_us.append((time.perf_counter() - start) * 1e6)
+        start = time.perf_counter()
+        expected = _pandas_mean(df, item)
+        pandas_us.append((time.perf_counter() - start) * 1e6)
+        if stats is not None and not np.isnan(expected):
+            diffs.append(abs(stats['mean_mm'] - expected))
+            item['mean'] = stats['mean_mm']
+    print(f"\n{'range query':<14} {'p50 us':>9} {'p99 us':>9}")
+    print(f"{'arrays':<14} {np.percentile(array_us, 50):>9.1f} {np.percentile(array_us, 99):>9.1f}")
+    print(f"{'pandas':<14} {np.percentile(pandas_us, 50):>9.1f} {np.percentile(pandas_us, 99):>9.1f}")
+    print(f"max |difference| {max(diffs, default=0):.4f} mm over {len(diffs)} ranges with data")
+
+    print(f"\n{'answer path':<12} {'climatology':>12} {'exact mean':>11} {'tokens p50':>11} {'p50 ms':>8} {'p99 ms':>8}")
+    for path, store in (('climatology', rollups), ('documents', None)):
+        answered, exact, tokens, ms = 0, 0, [], []
+        for item in questions:
+            start = time.perf_counter()
+            prompt, _, table = prepare_answer(item['question'], vectorstore, metadata_index, store, lexical_index)
+            ms.append((time.perf_counter() - start) * 1000)
+            tokens.append(estimate_tokens(prompt))
+            answered += table is not None and 'Subdivision' in table.columns
+            exact += 'mean' in item and f"{item['mean']:,.2f}" in prompt
+        print(f"{path:<12} {answered / len(questions):>12.1%} {exact / len(questions):>11.1%} "
+              f"{np.percentile(tokens, 50):>11.0f} {np.percentile(ms, 50):>8.2f} {np.percentile(ms, 99):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: prompt size and answer latency, verbatim top-k context vs packed context
+Two question sets from random rows of the live vectorstore:
+  point   one row answers it (a district/crop/year or subdivision/year)
+  trend   every year of a district/crop or subdivision is relevant
+For each question the document prompt is built twice:
+  verbatim   the top --k documents joined as rendered (SAMARTH_CONTEXT_TOKENS=0)
+  packed     context_packer.pack() up to --budget tokens from deeper retrieval
+and the report shows prompt tokens, relevant rows that made it into the
+context, hit rate, prompt build time and stub-LLM time to first token.
+
+The stub backend charges --prompt-token-ms per prompt token before its first
+chunk (a stand-in for the model reading the prompt), so the latency column
+moves with prompt size. Rollups are not consulted, so every question takes the
+document path. First checks that names starting with a digit ('24 PARAGANAS
+NORTH') and units that differ between rows come through packing intact.
+
+Run from the repo root (offline with SAMARTH_EMBEDDINGS=stub):
+    python -m benchmarks.bench_context --questions 200 --budget 400
+"""
+import argparse
+import time
+
+import numpy as np
+
+import context_packer
+from benchmarks.bench_pipeline import _load_live
+from documents import crop_row_document
+from benchmarks.bench_retrieval import generate_questions, is_relevant
+from llm import StubBackend
+from qa import prepare_answer
+from tracing import estimate_tokens
+
+TREND_TEMPLATES = {
+    'crop': ("Show the trend of {crop} production in {district} over the years", ('district', 'crop')),
+    'rainfall': ("How has rainfall in {subdivision} changed over the years?", ('subdivision',)),
+}
+
+
+def trend_questions(points):
+    """A trend question per point question, keyed on the same district/crop or subdivision"""
+    questions = []
+    for item in points:
+        kind = 'rainfall' if 'subdivision' in item['expect'] else 'crop'
+        template, fields = TREND_TEMPLATES[kind]
+        expect = {field: item['expect'][field] for field in fields}
+        questions.append({'question': template.format(**expect), 'expect': expect})
+    return questions
+
+
+def check_packing():
+    """Every row keeps its own district and units when rows are packed into one table"""
+    rows = [{'state_name': 'West Bengal', 'district_name': district, 'crop': 'Rice', 'season': 'Kharif',
+             'crop_year': 2005, 'area_': 100.0, 'production_': 250.0}
+            for district in ('24 PARAGANAS NORTH', '24 PARAGANAS SOUTH')]
+    context, _ = context_packer.pack([crop_row_document(row) for row in rows], budget=10_000)
+    lines = context.splitlines()
+    assert lines[1:] == ['District', '24 PARAGANAS NORTH', '24 PARAGANAS SOUTH'], context
+
+    section = context_packer._Section('Data', None)
+    section.add([('Area', '1.0', 'hectares'), ('Depth', '2', 'm')])
+    section.add([('Area', '1.0', 'hectares'), ('Depth', '2', 'cm')])
+    assert section.render().splitlines()[1:] == ['Depth', '2 m', '2 cm'], section.render()
+
+
+def _measure(questions, components, backend, k, budget):
+    vectorstore, metadata_index, lexical_index, _ = components
+    out = {'tokens': [], 'relevant': [], 'hits': 0, 'prepare_ms': [], 'ttft_ms': []}
+    for item in questions:
+        start = time.perf_counter()
+        prompt, docs, _ = prepare_answer(item['question'], vectorstore, metadata_index, None, lexical_index,
+                                         k=k, context_tokens=budget)
+        prepared = time.perf_counter()
+        next(iter(backend.stream(prompt)))
+        out['ttft_ms'].append((time.perf_counter() - start) * 1000)
+        out['prepare_ms'].append((prepared - start) * 1000)
+        out['tokens'].append(estimate_tokens(prompt))
+        relevant = sum(is_relevant(doc, item['expect']) for doc in docs)
+        out['relevant'].append(relevant)
+        out['hits'] += relevant > 0
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200, help="generated questions")
+    parser.add_argument("--k", type=int, default=5, help="documents in the verbatim prompt")
+    parser.add_argument("--budget", type=int, default=400, help="context token budget for the packed prompt")
+    parser.add_argument("--prompt-token-ms", type=float, default=0.05,
+                        help="stub LLM delay per prompt token before the first chunk")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    check_packing()
+    components = _load_live()
+    points = generate_questions(components[0], args.questions, seed=args.seed)
+    question_sets = {'point': points, 'trend': trend_questions(points)}
+    backend = StubBackend(first_token_delay=0, token_delay=0, prompt_token_delay=args.prompt_token_ms / 1000)
+
+    print("\n" + "="*60)
+    print("BENCHMARK - CONTEXT PACKING")
+    print("="*60)
+    print("✅ Packed rows keep their own names and units")
+    print(f"{len(points)} point + {len(points)} trend questions, verbatim top-{args.k} vs packed to "
+          f"{args.budget} tokens, stub LLM at {args.prompt_token_ms} ms per prompt token")
+
+    print(f"\n{'set':<6} {'prompt':<16} {'tokens p50':>10} {'p95':>5} {'relevant':>9} {'hit':>7} "
+          f"{'prep ms':>8} {'TTFT ms':>8}")
+    for set_name, questions in question_sets.items():
+        results = {
+            f"verbatim k={args.k}": _measure(questions, components, backend, args.k, 0),
+            f"packed {args.budget}": _measure(questions, components, backend, args.k, args.budget),
+        }
+        for name, r in results.items():
+            print(f"{set_name:<6} {name:<16} {np.percentile(r['tokens'], 50):>10.0f} "
+                  f"{np.percentile(r['tokens'], 95):>5.0f} {np.mean(r['relevant']):>9.1f} "
+                  f"{r['hits'] / len(questions):>7.1%} {np.percentile(r['prepare_ms'], 50):>8.2f} "
+                  f"{np.percentile(r['ttft_ms'], 50):>8.2f}")
+        base, packed = results.values()
+        print(f"{'':<6} prompt tokens {sum(packed['tokens']) / sum(base['tokens']) - 1:+.1%}, "
+              f"tokens per relevant row {sum(base['tokens']) / max(sum(base['relevant']), 1):.0f} -> "
+              f"{sum(packed['tokens']) / max(sum(packed['relevant']), 1):.0f}")
+
+
+if __name__ == "__main__":
+    main()
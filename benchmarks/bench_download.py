@@ -0,0 +1,192 @@
+"""
+Benchmark: paginated download against a local stub of the data.gov.in API
+Compares the old one-page-at-a-time loop with the concurrent fetcher, after
+checking that a server which caps pages below the requested size (as the
+sample API key does, at 10 rows) still yields every row.
+
+Run from the repo root:
+    python -m benchmarks.bench_download
+    python -m benchmarks.bench_download --rows 50000,500000 --latency 0.08 --server-rps 200
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from fetcher import AdaptiveRateLimiter, fetch_pages
+
+
+def _make_record(i):
+    return {
+        "state_name": "Andhra Pradesh",
+        "district_name": f"DISTRICT_{i % 600}",
+        "crop_year": 1997 + i % 18,
+        "season": "Kharif",
+        "crop": "Rice",
+        "area_": float(100 + i % 1000),
+        "production_": float(250 + i % 5000),
+    }
+
+
+class StubAPI:
+    """Threaded HTTP server that mimics /resource/<id>?offset=&limit= with latency, a rate cap
+    and optionally a cap on the rows per page"""
+
+    def __init__(self, total_rows, latency=0.05, max_rps=None, page_cap=None):
+        self.total_rows = total_rows
+        self.latency = latency
+        self.max_rps = max_rps
+        self.page_cap = page_cap
+        self.requests = 0
+        self.throttled = 0
+        self._window = []
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/resource"
+
+    def _over_limit(self):
+        if not self.max_rps:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.max_rps:
+                self.throttled += 1
+                return True
+            self._window.append(now)
+            return False
+
+    def _handle(self, handler):
+        with self._lock:
+            self.requests += 1
+        if self._over_limit():
+            handler.send_response(429)
+            handler.send_header("Retry-After", "1")
+            handler.end_headers()
+            return
+
+        time.sleep(self.latency)
+        query = parse_qs(urlparse(handler.path).query)
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["10"])[0])
+        if self.page_cap:
+            limit = min(limit, self.page_cap)
+        stop = min(self.total_rows, offset + limit)
+        body = json.dumps({
+            "total": self.total_rows,
+            "count": max(0, stop - offset),
+            "records": [_make_record(i) for i in range(offset, stop)],
+        }).encode()
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def legacy_download(base_url, limit, delay):
+    """The original 1_download_data.py loop: one request, then a fixed sleep"""
+    url = f"{base_url}/bench"
+    records = 0
+    offset = 0
+    while offset < limit:
+        params = {"api-key": "bench", "format": "json", "offset": offset, "limit": 100}
+        response = requests.get(url, params=params, timeout=30)
+        if response.status_code != 200:
+            break
+        page = response.json().get("records") or []
+        if not page:
+            break
+        records += len(page)
+        offset += 100
+        time.sleep(delay)
+    return records
+
+
+def concurrent_download(base_url, limit, workers):
+    records = 0
+    limiter = AdaptiveRateLimiter()
+    for offset, page in fetch_pages("bench", "bench", limit, workers=workers,
+                                    limiter=limiter, base_url=base_url):
+        assert offset == records, f"pages must arrive in offset order without gaps (got {offset}, expected {records})"
+        records += len(page)
+    return records, limiter.rate
+
+
+def check_page_cap(workers, rows=2000, cap=10):
+    """Pages capped below the requested size must not end the download or leave gaps"""
+    with StubAPI(rows, latency=0, page_cap=cap) as stub:
+        got, _ = concurrent_download(stub.base_url, rows * 2, workers)
+    assert got == rows, f"pages capped at {cap} rows: expected {rows} records, got {got}"
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="50000,500000", help="comma-separated row targets")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated server latency per page (s)")
+    parser.add_argument("--server-rps", type=int, default=0, help="answer 429 above this many requests/sec (0 = no cap)")
+    parser.add_argument("--legacy-delay", type=float, default=0.5, help="sleep between pages in the old loop")
+    parser.add_argument("--legacy-rows", type=int, default=5000,
+                        help="rows to actually time with the old loop; larger targets are extrapolated")
+    args = parser.parse_args()
+
+    targets = [int(r) for r in args.rows.split(",") if r]
+    checked = check_page_cap(args.workers)
+
+    print("\n" + "="*60)
+    print("BENCHMARK - PAGINATED DOWNLOAD (local stub API)")
+    print("="*60)
+    print(f"✅ All {checked:,} rows downloaded with pages capped at 10 rows")
+    print(f"latency={args.latency}s/page  workers={args.workers}  server cap={args.server_rps or 'none'} rps")
+
+    with StubAPI(max(targets), latency=args.latency) as stub:
+        start = time.perf_counter()
+        got = legacy_download(stub.base_url, args.legacy_rows, args.legacy_delay)
+        legacy_rate = got / (time.perf_counter() - start)
+
+    print(f"\n{'rows':>10} {'legacy (est.)':>15} {'concurrent':>12} {'speedup':>9} {'429s':>6} {'final rate':>11}")
+    for rows in targets:
+        with StubAPI(rows, latency=args.latency, max_rps=args.server_rps or None) as stub:
+            start = time.perf_counter()
+            got, final_rate = concurrent_download(stub.base_url, rows, args.workers)
+            elapsed = time.perf_counter() - start
+            throttled = stub.throttled
+        assert got == rows, f"expected {rows} records, got {got}"
+        legacy_s = rows / legacy_rate
+        print(f"{rows:>10,} {legacy_s:>14.1f}s {elapsed:>11.1f}s {legacy_s / elapsed:>8.1f}x "
+              f"{throttled:>6} {final_rate:>8.1f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: embedding backends - throughput, query latency and agreement
+Encodes a sample of live documents and generated questions with each backend
+and reports:
+  load s        model load (plus ONNX download/quantization on first use)
+  docs/s        document encoding throughput (build path)
+  query ms      p50 single-question encode (answer path)
+  cosine        mean / min cosine to the reference backend's vector, per text
+  top-5 overlap share of each question's 5 nearest sample documents that the
+                reference backend also ranks in its top 5
+
+The reference is --reference (default huggingface, the PyTorch model the
+index was built with so far). ONNX backends take --batch-size / --threads;
+--no-sort encodes them in input order to show what length sorting saves.
+
+Run from the repo root (after 3_build_vectorstore.py):
+    python -m benchmarks.bench_embeddings --docs 5000
+    python -m benchmarks.bench_embeddings --backends onnx-int8 --batch-size 128 --threads 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+import embedding_backends
+from benchmarks.bench_pipeline import _load_live
+from benchmarks.bench_retrieval import generate_questions
+from retrieval import _documents
+
+
+def _load(name, args, sort_by_length=True):
+    if name in ('onnx', 'onnx-int8'):
+        return embedding_backends.OnnxEmbeddings(quantize=name == 'onnx-int8', batch_size=args.batch_size,
+                                                 threads=args.threads, sort_by_length=sort_by_length)
+    return embedding_backends.get_embeddings(name)
+
+
+def _encode(model, texts):
+    if hasattr(model, 'embed_array'):
+        return model.embed_array(texts)
+    return np.asarray(model.embed_documents(texts), dtype=np.float32)
+
+
+def _measure(name, model, docs, questions, load_s):
+    _encode(model, docs[:8])                       # warm-up
+    start = time.perf_counter()
+    doc_vectors = _encode(model, docs)
+    encode_s = time.perf_counter() - start
+
+    query_ms, query_vectors = [], []
+    for question in questions:
+        start = time.perf_counter()
+        query_vectors.append(model.embed_query(question))
+        query_ms.append((time.perf_counter() - start) * 1000)
+    return {'name': name, 'load_s': load_s, 'docs_per_s': len(docs) / encode_s,
+            'query_p50_ms': float(np.percentile(query_ms, 50)),
+            'docs': doc_vectors, 'queries': np.asarray(query_vectors, dtype=np.float32)}
+
+
+def _top5(queries, docs):
+    return np.argsort(-(queries @ docs.T), axis=1)[:, :5]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="huggingface,onnx,onnx-int8")
+    parser.add_argument("--reference", default="huggingface", help="backend the others are compared with")
+    parser.add_argument("--docs", type=int, default=2000, help="sampled documents to encode")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, help="ONNX batch size (default SAMARTH_EMBED_BATCH)")
+    parser.add_argument("--threads", type=int, help="ONNX intra-op threads (default SAMARTH_EMBED_THREADS)")
+    parser.add_argument("--no-sort", action="store_true", help="also time ONNX without length sorting")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectorstore = _load_live()[0]
+    rng = np.random.default_rng(args.seed)
+    positions = rng.choice(vectorstore.index.ntotal, size=min(args.docs, vectorstore.index.ntotal), replace=False)
+    docs = [doc.page_content for doc in _documents(vectorstore, np.sort(positions))]
+    questions = [q['question'] for q in generate_questions(vectorstore, args.questions, seed=args.seed)]
+
+    print("\n" + "="*60)
+    print("BENCHMARK - EMBEDDING BACKENDS")
+    print("="*60)
+    print(f"{len(docs):,} documents, {len(questions)} questions")
+
+    names = [args.reference] + [n for n in args.backends.split(',') if n and n != args.reference]
+    runs = []
+    for name in names:
+        variants = [(name, True)]
+        if args.no_sort and name in ('onnx', 'onnx-int8'):
+            variants.append((f"{name} (unsorted)", False))
+        for label, sort_by_length in variants:
+            start = time.perf_counter()
+            try:
+                model = _load(name, args, sort_by_length)
+            except (ImportError, OSError) as e:
+                print(f"❌ {label}: {e}")
+                continue
+            runs.append(_measure(label, model, docs, questions, time.perf_counter() - start))
+
+    if not runs:
+        raise SystemExit("❌ No backend could be loaded")
+    reference = runs[0]
+    if reference['name'] != args.reference:
+        print(f"⚠️ Reference {args.reference} unavailable; comparing against {reference['name']}")
+    reference_top = _top5(reference['queries'], reference['docs'])
+
+    print(f"\n{'backend':<24} {'load s':>7} {'docs/s':>9} {'query ms':>9} {'cosine':>15} {'top-5':>7}")
+    for r in runs:
+        cosine = (r['docs'] * reference['docs']).sum(axis=1)
+        top = _top5(r['queries'], r['docs'])
+        overlap = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(top, reference_top)])
+        print(f"{r['name']:<24} {r['load_s']:>7.1f} {r['docs_per_s']:>9,.0f} {r['query_p50_ms']:>9.2f} "
+              f"{cosine.mean():>7.4f}/{cosine.min():.4f} {overlap:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
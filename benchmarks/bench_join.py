@@ -0,0 +1,119 @@
+"""
+Benchmark: crop x rainfall questions, join lookup vs document retrieval
+Questions are generated from random rows of the district join table ("How did
+rainfall affect <crop> in <district> from <year-3> to <year+3>?", and the same
+for the state). For each, the answer is prepared twice:
+  join        RollupStore.lookup_join(): one key lookup in the join table
+  documents   the same question through retrieval (no rollups), as before
+and the report counts, per question, the years for which the prompt holds
+both the crop figures and the rainfall of that region's subdivision(s).
+First checks that crop questions about states that are also IMD subdivisions
+(Bihar, Kerala, ...) but do not mention rainfall still read the crop rollups.
+
+Run from the repo root (after 3_build_vectorstore.py):
+    python -m benchmarks.bench_join --questions 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+import storage
+from benchmarks.bench_pipeline import _load_live
+from join_index import JOINS, subdivisions_for
+from metadata_index import normalize
+from qa import prepare_answer
+from rollups import ROLLUPS_DIR
+
+TEMPLATES = {
+    'crop_rainfall_district': "How did rainfall affect {crop} in {district_name} from {start} to {end}?",
+    'crop_rainfall_state': "How did the monsoon affect {crop} production in {state_name} from {start} to {end}?",
+}
+
+
+def generate_questions(count, seed=0):
+    rng = np.random.default_rng(seed)
+    questions = []
+    for name, template in TEMPLATES.items():
+        table = storage.load_table(f"{ROLLUPS_DIR}/{name}.parquet")
+        for i in rng.choice(len(table), size=min(count // 2, len(table)), replace=False):
+            row = table.iloc[i]
+            fields = {key: str(row[key]) for key in JOINS[name][1][:-1]}
+            year = int(row['crop_year'])
+            questions.append({
+                'question': template.format(start=year - 3, end=year + 3, **fields),
+                'fields': fields,
+                'years': set(range(year - 3, year + 4)),
+            })
+    return questions
+
+
+def _covered_years(item, docs, table):
+    """Years with both crop figures and rainfall for the question's region in the prompt"""
+    fields = item['fields']
+    if table is not None:
+        rows = table[table['jjas_mm'].notna() | table['annual_mm'].notna()]
+        return set(rows['crop_year'].astype(int)) & item['years']
+    subdivisions = {s.lower() for s in subdivisions_for(fields['state_name'], fields.get('district_name'))}
+    crop_years, rain_years = set(), set()
+    for doc in docs:
+        meta = doc.metadata
+        year = int(meta.get('year', 0) or 0)
+        if meta.get('source') == 'rainfall':
+            if str(meta.get('subdivision', '')).lower() in subdivisions:
+                rain_years.add(year)
+        elif all(str(meta.get(field, '')).strip().lower() == fields[column].strip().lower()
+                 for field, column in (('crop', 'crop'), ('state', 'state_name'), ('district', 'district_name'))
+                 if column in fields):
+            crop_years.add(year)
+    return crop_years & rain_years & item['years']
+
+
+def check_routing(metadata_index, rollups, count=20):
+    """Crop questions naming a state that is also a subdivision must not be sent to rainfall"""
+    table = rollups.rollups['district_crop_year'].table
+    states = {name for name in table['state_name'].cat.categories
+              if [normalize(s) for s in subdivisions_for(name)] == [normalize(name)]}
+    rows = table[table['state_name'].isin(states)].drop_duplicates(['state_name', 'district_name', 'crop'])
+    for _, row in rows.head(count).iterrows():
+        year = int(row['crop_year'])
+        for question in (f"Show the pattern of {row['crop']} production in {row['district_name']}, "
+                         f"{row['state_name']} from {year} to {year + 4}",
+                         f"What was the {row['crop']} production in {row['state_name']} in {year}?"):
+            found = rollups.lookup(metadata_index.extract(question))
+            assert found and found[0] in ('state_crop_year', 'district_crop_year'), \
+                f"{question!r} was answered by {found and found[0]}"
+    return len(rows.head(count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectorstore, metadata_index, lexical_index, rollups = _load_live()
+    questions = generate_questions(args.questions, args.seed)
+    checked = check_routing(metadata_index, rollups)
+
+    print("\n" + "="*60)
+    print("BENCHMARK - CROP x RAINFALL QUESTIONS")
+    print("="*60)
+    print(f"✅ {checked} crop questions in states that are also subdivisions read the crop rollups")
+    print(f"{len(questions)} questions over 7-year ranges")
+    print(f"\n{'path':<10} {'answered by join':>17} {'years covered':>14} {'p50 ms':>8} {'p99 ms':>8}")
+
+    for path, store in (('join', rollups), ('documents', None)):
+        covered, joined, ms = [], 0, []
+        for item in questions:
+            start = time.perf_counter()
+            _, docs, table = prepare_answer(item['question'], vectorstore, metadata_index, store, lexical_index)
+            ms.append((time.perf_counter() - start) * 1000)
+            joined += table is not None and 'jjas_mm' in table.columns
+            covered.append(len(_covered_years(item, docs, table)))
+        print(f"{path:<10} {joined / len(questions):>17.1%} {np.mean(covered):>14.2f} "
+              f"{np.percentile(ms, 50):>8.2f} {np.percentile(ms, 99):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
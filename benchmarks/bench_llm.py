@@ -0,0 +1,88 @@
+"""
+Benchmark: time-to-first-token vs total latency of the answer path
+For every question: retrieval/prompt time, time until the first answer chunk
+(what a user waits for with streaming) and time until the full answer (what
+they waited for before, behind a spinner).
+
+Uses the live vectorstore, metadata index and rollups, and the LLM backend
+from LLM_PROVIDER unless --backend is given. The stub backend runs offline.
+
+Run from the repo root:
+    python -m benchmarks.bench_llm --backend stub
+    python -m benchmarks.bench_llm --backend gemini --repeat 3
+"""
+import argparse
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+import vector_index
+from embedding_backends import for_index
+from lexical import LexicalIndex
+from llm import get_backend
+from metadata_index import MetadataIndex
+from qa import prepare_answer
+from rollups import RollupStore
+
+VECTORSTORE_DIR = "vectorstore"
+
+QUESTIONS = [
+    "What crops are in the data?",
+    "What was the production of rice in GUNTUR district, Andhra Pradesh in 2004?",
+    "Show the pattern of sugarcane production in SUPAUL, Bihar from 2010 to 2014",
+    "Tell me about rainfall patterns",
+    "What is the rice production?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", help="gemini or stub (default: LLM_PROVIDER)")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    load_dotenv()
+
+    path = vector_index.generation_path(VECTORSTORE_DIR, vector_index.current_generation(VECTORSTORE_DIR))
+    vectorstore = vector_index.load(path, for_index(path))
+    metadata_index = MetadataIndex.load(path) or MetadataIndex.from_vectorstore(vectorstore)
+    lexical_index = LexicalIndex.load(path)
+    rollups = RollupStore.load()
+
+    start = time.perf_counter()
+    backend = get_backend(args.backend)
+    client_ms = (time.perf_counter() - start) * 1000
+
+    print("\n" + "="*60)
+    print(f"BENCHMARK - ANSWER LATENCY ({backend.name} backend)")
+    print("="*60)
+    print(f"Client created once in {client_ms:.1f} ms")
+    print(f"\n{'question':<48} {'prep ms':>8} {'TTFT ms':>9} {'total ms':>9} {'chunks':>7}")
+
+    ttft, totals = [], []
+    for _ in range(args.repeat):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            prompt, _, _ = prepare_answer(question, vectorstore, metadata_index, rollups, lexical_index)
+            prepared = time.perf_counter()
+            first = None
+            chunks = 0
+            for _ in backend.stream(prompt):
+                if first is None:
+                    first = time.perf_counter()
+                chunks += 1
+            done = time.perf_counter()
+            first = first or done
+            ttft.append((first - start) * 1000)
+            totals.append((done - start) * 1000)
+            print(f"{question[:47]:<48} {(prepared - start) * 1000:>8.1f} {ttft[-1]:>9.1f} "
+                  f"{totals[-1]:>9.1f} {chunks:>7}")
+
+    print(f"\np50 time to first token: {np.percentile(ttft, 50):,.1f} ms "
+          f"(blocking generate_content: {np.percentile(totals, 50):,.1f} ms)")
+    print(f"p99 time to first token: {np.percentile(ttft, 99):,.1f} ms "
+          f"(blocking generate_content: {np.percentile(totals, 99):,.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
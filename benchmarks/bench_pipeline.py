@@ -0,0 +1,274 @@
+"""
+Benchmark: the whole pipeline on synthetic data, as machine-readable JSON
+Stages, each timed in its own subprocess so peak RSS is measured in isolation:
+  generate   synthetic raw tables (synthetic_data.py)
+  clean      2_clean_data.py, crop + rainfall
+  documents  Document rendering for every cleaned row
+  embed      embedding every document (fills the embedding cache)
+  build      3_build_vectorstore.py: rollups, index, docstore, publish
+  load       loading the live generation (index, docstore, metadata/BM25)
+  query      retrieval and stub-LLM answers for labelled questions
+
+Runs offline: SAMARTH_EMBEDDINGS=stub and the stub LLM unless told otherwise.
+Results (seconds, rows/s, peak RSS per stage, plus commit and config) go to
+--output; --compare prints the change against an earlier results file.
+
+Run from the repo root:
+    python -m benchmarks.bench_pipeline --scale 10k
+    python -m benchmarks.bench_pipeline --scale 1m --output pipeline-1m.json --compare baseline-1m.json
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import synthetic_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ['generate', 'clean', 'documents', 'embed', 'build', 'load', 'query']
+
+
+def _status_mb(field):
+    """VmRSS / VmHWM of this process in MB (Linux); ru_maxrss elsewhere"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _document_batches(build):
+    return [build.create_documents_from_crop_data, build.create_documents_from_rainfall_data]
+
+
+def _load_live():
+    import vector_index
+    from embedding_backends import for_index
+    from lexical import LexicalIndex
+    from metadata_index import MetadataIndex
+    from rollups import RollupStore
+    from shared_store import generation_path
+
+    path = generation_path('vectorstore', vector_index.current_generation('vectorstore'))
+    vectorstore = vector_index.load(path, for_index(path))
+    return (vectorstore, MetadataIndex.load(path) or MetadataIndex.from_vectorstore(vectorstore),
+            LexicalIndex.load(path), RollupStore.load())
+
+
+def stage_generate(args):
+    crop, rainfall = synthetic_data.generate('.', args.crop_rows, args.rainfall_rows, args.seed)
+    return {'rows': crop + rainfall, 'crop_rows': crop, 'rainfall_rows': rainfall,
+            'raw_mb': sum(os.path.getsize(p) for p in (synthetic_data.CROP_PATH, synthetic_data.RAINFALL_PATH))
+            / (1024 * 1024)}
+
+
+def stage_clean(args):
+    cleaner = importlib.import_module('2_clean_data')
+    crop, _ = cleaner.clean_crop_data()
+    rainfall, _ = cleaner.clean_rainfall_data()
+    return {'rows': crop + rainfall, 'crop_rows': crop, 'rainfall_rows': rainfall}
+
+
+def stage_documents(args):
+    build = importlib.import_module('3_build_vectorstore')
+    rows = chars = 0
+    for make in _document_batches(build):
+        for _, batch in make():
+            rows += len(batch)
+            chars += sum(len(doc.page_content) for doc in batch)
+    return {'rows': rows, 'avg_chars': chars / max(rows, 1)}
+
+
+def stage_embed(args):
+    build = importlib.import_module('3_build_vectorstore')
+    embeddings = build.load_embeddings()
+    rows, embed_s = 0, 0.0
+    for make in _document_batches(build):
+        for _, batch in make():
+            start = time.perf_counter()
+            embeddings.embed_documents_array([doc.page_content for doc in batch])
+            embed_s += time.perf_counter() - start
+            rows += len(batch)
+    return {'rows': rows, 'embed_seconds': embed_s, 'embed_rows_per_s': rows / embed_s if embed_s else None,
+            'model': embeddings.model_name}
+
+
+def stage_build(args):
+    build = importlib.import_module('3_build_vectorstore')
+    sys.argv = ['3_build_vectorstore.py'] + (['--index-type', args.index_type] if args.index_type else [])
+    build.main()
+    import vector_index
+    path = vector_index.generation_path('vectorstore', vector_index.current_generation('vectorstore'))
+    size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    return {'rows': len(vector_index.load_manifest('vectorstore')), 'generation_mb': size / (1024 * 1024)}
+
+
+def stage_load(args):
+    before = _status_mb('VmRSS')
+    vectorstore, *_ = _load_live()
+    return {'rows': vectorstore.index.ntotal, 'rss_delta_mb': _status_mb('VmRSS') - before}
+
+
+def stage_query(args):
+    from benchmarks.bench_retrieval import generate_questions, is_relevant
+    from llm import StubBackend
+    from qa import get_answer
+    from retrieval import retrieve
+
+    vectorstore, metadata_index, lexical_index, rollups = _load_live()
+    questions = generate_questions(vectorstore, args.queries, seed=args.seed)
+    backend = StubBackend(first_token_delay=0, token_delay=0)
+
+    retrieve_ms, answer_ms, hits = [], [], 0
+    for item in questions:
+        start = time.perf_counter()
+        docs = retrieve(item['question'], vectorstore, metadata_index, lexical_index, k=5)
+        retrieve_ms.append((time.perf_counter() - start) * 1000)
+        hits += any(is_relevant(doc, item['expect']) for doc in docs)
+
+        start = time.perf_counter()
+        get_answer(item['question'], vectorstore, backend, metadata_index, rollups, lexical_index)
+        answer_ms.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'rows': len(questions),
+        'hit_at_5': hits / len(questions),
+        'retrieve_p50_ms': float(np.percentile(retrieve_ms, 50)),
+        'retrieve_p99_ms': float(np.percentile(retrieve_ms, 99)),
+        'answer_p50_ms': float(np.percentile(answer_ms, 50)),
+        'answer_p99_ms': float(np.percentile(answer_ms, 99)),
+    }
+
+
+def run_stage(args):
+    """Child process: run one stage inside the work directory, print its result as JSON"""
+    os.chdir(args.workdir)
+    stage = globals()[f"stage_{args.run_stage}"]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = stage(args)
+    result['seconds'] = time.perf_counter() - start
+    result['peak_rss_mb'] = _status_mb('VmHWM')
+    if result.get('rows'):
+        result['rows_per_s'] = result['rows'] / result['seconds']
+    print(json.dumps(result))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"{'stage':<10} {'seconds':>18} {'peak RSS MB':>20}")
+    for stage, now in results['stages'].items():
+        old = baseline.get('stages', {}).get(stage)
+        if not old:
+            continue
+        print(f"{stage:<10} {old['seconds']:>7.2f} -> {now['seconds']:>7.2f} "
+              f"{old['peak_rss_mb']:>8.0f} -> {now['peak_rss_mb']:>8.0f} "
+              f"({now['seconds'] / old['seconds'] - 1:+.0%} time, "
+              f"{now['peak_rss_mb'] / old['peak_rss_mb'] - 1:+.0%} RSS)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='10k', help="10k, 1m, 10m or a crop row count")
+    parser.add_argument('--rainfall-rows', help="default: crop rows / 10, at least 4,212")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--index-type', help="FAISS index type for the build stage (default flat)")
+    parser.add_argument('--queries', type=int, default=200, help="labelled questions in the query stage")
+    parser.add_argument('--embeddings', default='stub', help="SAMARTH_EMBEDDINGS for every stage")
+    parser.add_argument('--workdir', help="keep data and indexes here (default: a temporary directory)")
+    parser.add_argument('--output', help="results JSON (default: pipeline-<crop rows>.json)")
+    parser.add_argument('--compare', help="earlier results JSON to compare against")
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    parser.add_argument('--crop-rows', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        args.rainfall_rows = int(args.rainfall_rows) if args.rainfall_rows else None
+        run_stage(args)
+        return
+
+    crop_rows = synthetic_data.parse_rows(args.scale)
+    rainfall_rows = (synthetic_data.parse_rows(args.rainfall_rows) if args.rainfall_rows
+                     else synthetic_data.default_rainfall_rows(crop_rows))
+    stages = [s for s in args.stages.split(',') if s]
+    output = args.output or f"pipeline-{crop_rows}.json"
+
+    results = {
+        'benchmark': 'pipeline',
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {'crop_rows': crop_rows, 'rainfall_rows': rainfall_rows, 'seed': args.seed,
+                   'embeddings': args.embeddings, 'llm': 'stub', 'index_type': args.index_type or 'flat',
+                   'queries': args.queries},
+        'stages': {},
+    }
+
+    print("\n" + "="*60)
+    print("BENCHMARK - PIPELINE ON SYNTHETIC DATA")
+    print("="*60)
+    print(f"{crop_rows:,} crop + {rainfall_rows:,} rainfall rows, {args.embeddings} embeddings, stub LLM")
+    print(f"\n{'stage':<10} {'seconds':>9} {'rows/s':>12} {'peak RSS':>10}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='samarth-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    env = dict(os.environ, SAMARTH_EMBEDDINGS=args.embeddings,
+               PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    try:
+        for stage in stages:
+            cmd = [sys.executable, '-m', 'benchmarks.bench_pipeline', '--run-stage', stage,
+                   '--workdir', workdir, '--crop-rows', str(crop_rows), '--rainfall-rows', str(rainfall_rows),
+                   '--seed', str(args.seed), '--queries', str(args.queries)]
+            if args.index_type:
+                cmd += ['--index-type', args.index_type]
+            proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(proc.stderr[-3000:])
+                raise SystemExit(f"❌ Stage {stage} failed")
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            results['stages'][stage] = r
+            rate = f"{r['rows_per_s']:,.0f}" if r.get('rows_per_s') else '-'
+            print(f"{stage:<10} {r['seconds']:>9.2f} {rate:>12} {r['peak_rss_mb']:>7.0f} MB")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: retrieval quality and latency, dense vs BM25 vs hybrid
+Questions are labelled with the metadata a correct hit must carry (state,
+district, crop, year / subdivision, year). By default --questions of them are
+generated from random rows of the live vectorstore; --questions-file takes a
+JSONL file of {"question": ..., "expect": {"district": ..., "year": ...}} instead.
+
+Reports hit@k (any correct row in the top k), precision@k, MRR and p50/p99
+latency for each retriever.
+
+Run from the repo root (after 3_build_vectorstore.py):
+    python -m benchmarks.bench_retrieval --questions 300
+    python -m benchmarks.bench_retrieval --questions-file regression.jsonl
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+import vector_index
+from embedding_backends import for_index
+from lexical import LexicalIndex, reciprocal_rank_fusion
+from metadata_index import MetadataIndex
+from retrieval import FUSION_DEPTH, _documents, retrieve, search_dense
+
+VECTORSTORE_DIR = "vectorstore"
+
+CROP_TEMPLATES = [
+    ("What was the production of {crop} in {district} district, {state} in {year}?",
+     ('state', 'district', 'crop', 'year')),
+    ("{crop} yield in {district} ({state}) during {year}",
+     ('district', 'crop', 'year')),
+    ("How much {crop} did {district} grow in {year}?",
+     ('district', 'crop', 'year')),
+]
+RAINFALL_TEMPLATES = [
+    ("What was the annual rainfall in {subdivision} in {year}?", ('subdivision', 'year')),
+    ("Monthly rainfall for {subdivision}, {year}", ('subdivision', 'year')),
+]
+
+
+def generate_questions(vectorstore, count, seed=0):
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(vectorstore.index.ntotal, size=min(count, vectorstore.index.ntotal), replace=False)
+    questions = []
+    for i, doc in enumerate(_documents(vectorstore, positions)):
+        meta = doc.metadata
+        templates = RAINFALL_TEMPLATES if meta.get('source') == 'rainfall' else CROP_TEMPLATES
+        template, fields = templates[i % len(templates)]
+        questions.append({'question': template.format(**meta), 'expect': {f: meta[f] for f in fields}})
+    return questions
+
+
+def is_relevant(doc, expect):
+    return all(str(doc.metadata.get(field, '')).lower() == str(value).lower()
+               for field, value in expect.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200, help="generated questions")
+    parser.add_argument("--questions-file", help="JSONL of labelled questions")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    path = vector_index.generation_path(VECTORSTORE_DIR, vector_index.current_generation(VECTORSTORE_DIR))
+    vectorstore = vector_index.load(path, for_index(path))
+    metadata_index = MetadataIndex.load(path) or MetadataIndex.from_vectorstore(vectorstore)
+    lexical_index = LexicalIndex.load(path)
+    if lexical_index is None:
+        raise SystemExit("The live generation has no BM25 index; rebuild with 3_build_vectorstore.py")
+
+    if args.questions_file:
+        with open(args.questions_file) as f:
+            questions = [json.loads(line) for line in f if line.strip()]
+    else:
+        questions = generate_questions(vectorstore, args.questions)
+
+    k = args.k
+    embed = vectorstore.embeddings.embed_query
+    retrievers = {
+        'dense': lambda q: _documents(vectorstore, search_dense(vectorstore, embed(q), k)),
+        'bm25': lambda q: _documents(vectorstore, lexical_index.search(q, k)),
+        'hybrid (RRF)': lambda q: _documents(vectorstore, reciprocal_rank_fusion(
+            [search_dense(vectorstore, embed(q), k * FUSION_DEPTH), lexical_index.search(q, k * FUSION_DEPTH)], k)),
+        'hybrid + shortcut': lambda q: retrieve(q, vectorstore, None, lexical_index, k=k),
+        'metadata filter': lambda q: retrieve(q, vectorstore, metadata_index, None, k=k),
+        'metadata + hybrid': lambda q: retrieve(q, vectorstore, metadata_index, lexical_index, k=k),
+    }
+
+    print("\n" + "="*60)
+    print("BENCHMARK - RETRIEVAL QUALITY AND LATENCY")
+    print("="*60)
+    print(f"{vectorstore.index.ntotal:,} documents, {len(questions)} labelled questions, k={k}")
+    print(f"\n{'retriever':<20} {'hit@k':>7} {'prec@k':>7} {'MRR':>7} {'p50 ms':>8} {'p99 ms':>8}")
+
+    for name, run in retrievers.items():
+        hits, precision, rr, latencies = 0, 0.0, 0.0, []
+        for item in questions:
+            start = time.perf_counter()
+            docs = run(item['question'])
+            latencies.append((time.perf_counter() - start) * 1000)
+            relevant = [is_relevant(doc, item['expect']) for doc in docs]
+            hits += any(relevant)
+            precision += sum(relevant) / k
+            rr += next((1 / (rank + 1) for rank, ok in enumerate(relevant) if ok), 0.0)
+        n = len(questions)
+        print(f"{name:<20} {hits / n:>7.3f} {precision / n:>7.3f} {rr / n:>7.3f} "
+              f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
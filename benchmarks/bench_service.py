@@ -0,0 +1,175 @@
+"""
+End-to-end check and benchmark: service.py batch and serve with the stub LLM
+Generates --questions point questions from random rows of the live vectorstore
+(mostly answered from the rollups), plus a crop-only question per crop row
+(too broad for a rollup table, so answered from retrieved documents), and
+runs them through the real command line, each in its own process:
+  batch   python service.py batch in.jsonl out.jsonl --llm stub
+          every question comes back in order with its own fields, no error,
+          a stub answer echoing the question, and sources or a rollup table
+  serve   python service.py serve --llm stub on a free port
+          GET /health, POST /retrieve and /answer, a bad request gets 400,
+          and GET /stats counts the answers
+The stub LLM runs without delays, so the reported throughput and latency are
+the retrieval, embedding-batching and HTTP overhead of the service itself,
+along with the share of document answers whose sources include a row matching
+what the question names.
+
+Run from the repo root (offline with SAMARTH_EMBEDDINGS=stub):
+    python -m benchmarks.bench_service --questions 200 --concurrency 16
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.bench_pipeline import ROOT, _load_live
+from benchmarks.bench_retrieval import generate_questions, is_relevant
+
+SERVICE = os.path.join(ROOT, 'service.py')
+
+STUB_ENV = {'LLM_PROVIDER': 'stub', 'SAMARTH_STUB_FIRST_TOKEN_S': '0', 'SAMARTH_STUB_TOKEN_S': '0'}
+
+
+class _Source:
+    """Just enough of a Document for is_relevant()"""
+
+    def __init__(self, source):
+        self.metadata = source['metadata']
+
+
+def document_questions(points):
+    """A crop-only question per crop point question; these take the document path"""
+    return [{'question': f"Tell me about {item['expect']['crop']} cultivation",
+             'expect': {'crop': item['expect']['crop']}}
+            for item in points if 'crop' in item['expect']]
+
+
+def _check_answer(result, question):
+    assert 'error' not in result, result
+    assert result['answer'].startswith(f"[stub] Answer to: {question}"), result['answer'][:200]
+    assert result['sources'] or result['table'], f"no sources or table for {question!r}"
+    assert result['latency_ms'] >= 0, result
+
+
+def check_batch(questions, concurrency, env):
+    """Run `service.py batch` on the questions and check every answer line"""
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = os.path.join(tmp, 'questions.jsonl'), os.path.join(tmp, 'answers.jsonl')
+        with open(src, 'w') as f:
+            for i, item in enumerate(questions):
+                f.write(json.dumps({'id': i, **item}) + "\n")
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, SERVICE, '--llm', 'stub', 'batch', src, dst,
+                               '--concurrency', str(concurrency)],
+                              env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        assert proc.returncode == 0, proc.stderr[-2000:]
+        with open(dst) as f:
+            results = [json.loads(line) for line in f]
+
+    assert len(results) == len(questions), (len(results), len(questions))
+    for i, (item, result) in enumerate(zip(questions, results)):
+        assert result['id'] == i and result['expect'] == item['expect'], result
+        assert result['question'] == item['question'], result
+        _check_answer(result, item['question'])
+    summary = [line for line in proc.stdout.splitlines() if line.startswith(('Throughput', 'Latency', 'Embedding'))]
+    return results, elapsed, summary
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _request(url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode()
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def check_serve(questions, env, timeout=120):
+    """Start `service.py serve`, exercise every route, then stop it"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen([sys.executable, SERVICE, '--llm', 'stub', 'serve', '--port', str(port)],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        deadline = time.time() + timeout
+        while True:
+            assert proc.poll() is None, proc.stdout.read()[-2000:]
+            try:
+                status, health = _request(f"{url}/health")
+                break
+            except OSError:
+                assert time.time() < deadline, "service did not come up"
+                time.sleep(0.2)
+        assert status == 200 and health['status'] == 'ok', health
+
+        item = questions[0]
+        status, retrieved = _request(f"{url}/retrieve", {'question': item['question'], 'k': 3})
+        assert status == 200 and retrieved['question'] == item['question'], retrieved
+        assert 0 < len(retrieved['sources']) <= 3, retrieved
+        for item in questions:
+            status, result = _request(f"{url}/answer", {'question': item['question']})
+            assert status == 200, result
+            _check_answer(result, item['question'])
+        status, error = _request(f"{url}/answer", {'k': 5})
+        assert status == 400 and 'error' in error, error
+
+        status, stats = _request(f"{url}/stats")
+        assert status == 200 and stats['llm_backend'] == 'stub', stats
+        assert stats['answer']['count'] == len(questions) and stats['errors'] == 0, stats
+        return stats
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200, help="generated questions for the batch run")
+    parser.add_argument("--serve-questions", type=int, default=20, help="of those, sent one by one to /answer")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectorstore, *_ = _load_live()
+    points = generate_questions(vectorstore, args.questions, seed=args.seed)
+    questions = points + document_questions(points)
+    env = {**os.environ, **STUB_ENV}
+
+    print("\n" + "="*60)
+    print("BENCHMARK - SERVICE END TO END (stub LLM)")
+    print("="*60)
+
+    results, elapsed, summary = check_batch(questions, args.concurrency, env)
+    with_sources = [(r, item) for r, item in zip(results, questions) if r['sources']]
+    assert with_sources, "no question took the document path"
+    relevant = sum(any(is_relevant(_Source(s), item['expect']) for s in r['sources']) for r, item in with_sources)
+    print(f"✅ batch: {len(results)} answers in order, each echoing its question with sources or a table")
+    print(f"   {len(results) - len(with_sources)} from rollup tables, {len(with_sources)} from documents "
+          f"({relevant / max(len(with_sources), 1):.1%} with a matching row in the sources)")
+    print(f"   {elapsed:.1f}s including process start")
+    for line in summary:
+        print(f"   {line}")
+
+    half = args.serve_questions // 2
+    stats = check_serve(points[:args.serve_questions - half] + questions[len(points):][:half], env)
+    print(f"✅ serve: /health, /retrieve, {stats['answer']['count']} x /answer, 400 on a bad request, /stats")
+    print(f"   /answer p50 {stats['answer']['p50_ms']} ms, p99 {stats['answer']['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
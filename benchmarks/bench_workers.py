@@ -0,0 +1,151 @@
+"""
+Benchmark: aggregate memory of N app worker processes on one host
+Starts --workers processes at a time (default 1, 4 and 8). Each one loads the
+live generation the way the app does, answers --questions generated
+questions and runs as many unfiltered similarity searches (which scan the
+whole index), then waits while the parent reads /proc/<pid>/smaps_rollup of
+every worker still alive. Modes:
+  private   index read onto each worker's heap, documents rendered into an
+            in-memory docstore (every process holds its own copy)
+  mapped    read-only memory maps of the generation in vectorstore/ (default)
+  shared    the same, from a mirror in --shared-dir (SAMARTH_SHARED_DIR,
+            tmpfs such as /dev/shm), copied once by the first worker
+Reported per mode and worker count: the sum of RSS (shared pages counted in
+every process), the sum of PSS (shared pages split between the processes
+mapping them, so this is what the workers cost the host), private MB per
+worker, the mirror size in shared memory, and load / query time per worker.
+
+Linux only (smaps_rollup). Run from the repo root (offline with SAMARTH_EMBEDDINGS=stub):
+    python -m benchmarks.bench_workers --workers 1,4,8 --modes private,mapped,shared
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_SHARED_DIR = "/dev/shm/samarth-bench"
+
+MEMORY_FIELDS = ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty')
+
+
+def smaps(pid):
+    """{field: MB} from /proc/<pid>/smaps_rollup"""
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in MEMORY_FIELDS:
+                out[name] = int(value.split()[0]) / 1024
+    return out
+
+
+def worker(args):
+    """One app process: load, answer, report, then hold everything mapped until told to exit"""
+    import vector_index
+    from benchmarks.bench_retrieval import generate_questions
+    from embedding_backends import for_index
+    from lexical import LexicalIndex
+    from metadata_index import MetadataIndex
+    from qa import prepare_answer
+    from rollups import RollupStore
+    from shared_store import generation_path
+
+    start = time.perf_counter()
+    generation = vector_index.current_generation('vectorstore')
+    path = generation_path('vectorstore', generation, args.shared_dir if args.worker == 'shared' else '')
+    vectorstore = vector_index.load(path, for_index(path), in_memory=args.worker == 'private')
+    metadata_index = MetadataIndex.load(path) or MetadataIndex.from_vectorstore(vectorstore)
+    lexical_index = LexicalIndex.load(path)
+    rollups = RollupStore.load()
+    loaded = time.perf_counter()
+
+    questions = generate_questions(vectorstore, args.questions, seed=args.seed)
+    for item in questions:
+        prepare_answer(item['question'], vectorstore, metadata_index, rollups, lexical_index)
+        vectorstore.similarity_search(item['question'], k=5)
+    queried = time.perf_counter()
+
+    print(json.dumps({'load_s': loaded - start,
+                      'query_ms': (queried - loaded) * 1000 / max(len(questions), 1)}), flush=True)
+    sys.stdin.read()
+
+
+def run(mode, workers, args):
+    command = [sys.executable, "-m", "benchmarks.bench_workers", "--worker", mode,
+               "--questions", str(args.questions), "--seed", str(args.seed), "--shared-dir", args.shared_dir]
+    procs = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True) for _ in range(workers)]
+    try:
+        reports = []
+        for proc in procs:
+            line = proc.stdout.readline()
+            if not line:
+                raise SystemExit(f"❌ A {mode} worker exited early (status {proc.wait()})")
+            reports.append(json.loads(line))
+        # Every worker is loaded and still holding its maps
+        memory = [smaps(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            if proc.stdin:
+                proc.stdin.close()
+        for proc in procs:
+            proc.wait()
+    from shared_store import mirror_bytes
+    return {
+        'rss': sum(m['Rss'] for m in memory),
+        'pss': sum(m['Pss'] for m in memory),
+        'private': np.mean([m['Private_Clean'] + m['Private_Dirty'] for m in memory]),
+        'mirror': mirror_bytes(args.shared_dir) / (1024 * 1024) if mode == 'shared' else 0,
+        'load_s': np.mean([r['load_s'] for r in reports]),
+        'query_ms': np.mean([r['query_ms'] for r in reports]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,4,8", help="comma-separated worker counts")
+    parser.add_argument("--modes", default="private,mapped,shared")
+    parser.add_argument("--questions", type=int, default=20, help="questions per worker")
+    parser.add_argument("--shared-dir", default=os.getenv("SAMARTH_SHARED_DIR") or DEFAULT_SHARED_DIR)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--worker", choices=['private', 'mapped', 'shared'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("❌ Needs Linux /proc/<pid>/smaps_rollup")
+
+    import vector_index
+    generation = vector_index.current_generation('vectorstore')
+    if generation is None:
+        raise SystemExit("❌ No vectorstore found. Run 3_build_vectorstore.py first!")
+    path = vector_index.generation_path('vectorstore', generation)
+    size = sum(os.path.getsize(os.path.join(dirpath, name))
+               for dirpath, _, names in os.walk(path) for name in names) / (1024 * 1024)
+
+    print("\n" + "="*60)
+    print("BENCHMARK - WORKER MEMORY")
+    print("="*60)
+    print(f"Generation {generation}: {size:,.0f} MB on disk, {args.questions} questions per worker")
+    print(f"\n{'mode':<8} {'workers':>7} {'sum RSS MB':>11} {'sum PSS MB':>11} {'private/w':>10} "
+          f"{'mirror MB':>10} {'load s':>7} {'query ms':>9}")
+
+    created = not os.path.exists(args.shared_dir)
+    try:
+        for mode in args.modes.split(','):
+            for workers in (int(n) for n in args.workers.split(',')):
+                r = run(mode, workers, args)
+                print(f"{mode:<8} {workers:>7} {r['rss']:>11,.0f} {r['pss']:>11,.0f} {r['private']:>10,.0f} "
+                      f"{r['mirror']:>10,.0f} {r['load_s']:>7.2f} {r['query_ms']:>9.2f}")
+    finally:
+        if created:
+            shutil.rmtree(args.shared_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
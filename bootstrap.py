@@ -0,0 +1,152 @@
+"""
+First-run bootstrap: download -> clean -> build, in the background
+- Runs the three pipeline scripts once, in a worker thread, as subprocesses
+- A cross-process file lock makes sure only one process (or Streamlit
+  session) ever runs the pipeline; everyone else just reads its progress
+- Progress is written to a small JSON status file after every stage and
+  every few log lines, so any session can render it
+- Only stdlib imports (and the light vector_index helpers): safe to use
+  before the page has rendered
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import vector_index
+from file_lock import try_lock, unlock
+
+STAGES = [
+    ('download', "Downloading data from data.gov.in", "1_download_data.py"),
+    ('clean', "Cleaning and deduplicating", "2_clean_data.py"),
+    ('build', "Building the vector database", "3_build_vectorstore.py"),
+]
+
+LOCK_FILE = ".bootstrap.lock"
+STATUS_FILE = ".bootstrap.json"
+LOG_DIR = "logs"
+
+
+class Bootstrap:
+    """Builds the vectorstore once in the background; one instance per process"""
+
+    def __init__(self, vectorstore_dir="vectorstore", root=".", on_ready=None):
+        self.vectorstore_dir = vectorstore_dir
+        self.root = root
+        self.on_ready = on_ready              # called with the new generation once built
+        self._thread = None
+        self._guard = threading.Lock()
+
+    def ready(self):
+        return vector_index.exists(self.vectorstore_dir)
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def running(self):
+        """True if this or any other process is running the pipeline right now"""
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        # The lock is released by the OS if its holder dies, so probing it is reliable
+        with open(self._path(LOCK_FILE), "a+") as f:
+            if try_lock(f):
+                unlock(f)
+                return False
+            return True
+
+    def start(self):
+        """Start the pipeline unless the index exists or a build is already running"""
+        with self._guard:
+            if self.ready() or (self._thread is not None and self._thread.is_alive()):
+                return False
+            lock = open(self._path(LOCK_FILE), "a+")
+            if not try_lock(lock):
+                lock.close()
+                return False
+            self._thread = threading.Thread(target=self._run, args=(lock,),
+                                            name="samarth-bootstrap", daemon=True)
+            self._thread.start()
+            return True
+
+    def status(self):
+        """Last written progress: {'state', 'stage', 'stages': {...}, ...}, or None"""
+        try:
+            with open(self._path(STATUS_FILE)) as f:
+                status = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if status.get('state') == 'running' and not self.running():
+            # The process that wrote this is gone
+            status['state'] = 'failed'
+            status['error'] = "Bootstrap was interrupted; retry to resume"
+        return status
+
+    def _write_status(self, status):
+        status['updated'] = time.time()
+        tmp = self._path(f"{STATUS_FILE}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(status, f, indent=2)
+        os.replace(tmp, self._path(STATUS_FILE))
+
+    def _run(self, lock):
+        status = {
+            'state': 'running', 'stage': None, 'started': time.time(), 'error': None,
+            'stages': {name: {'label': label, 'state': 'pending', 'seconds': None, 'last_line': ""}
+                       for name, label, _ in STAGES},
+        }
+        try:
+            os.makedirs(self._path(LOG_DIR), exist_ok=True)
+            for name, _, script in STAGES:
+                stage = status['stages'][name]
+                status['stage'] = name
+                stage['state'] = 'running'
+                self._write_status(status)
+                started = time.time()
+                returncode = self._run_stage(script, name, stage, status)
+                stage['seconds'] = round(time.time() - started, 1)
+                if returncode != 0:
+                    stage['state'] = 'failed'
+                    raise RuntimeError(f"{script} exited with status {returncode} "
+                                       f"(see {LOG_DIR}/bootstrap-{name}.log)")
+                stage['state'] = 'done'
+                self._write_status(status)
+
+            if not self.ready():
+                raise RuntimeError("Pipeline finished but no vectorstore was published")
+            status['state'] = 'done'
+            status['stage'] = None
+            self._write_status(status)
+        except Exception as e:
+            status['state'] = 'failed'
+            status['error'] = str(e)
+            self._write_status(status)
+            return
+        finally:
+            unlock(lock)
+            lock.close()
+
+        if self.on_ready is not None:
+            try:
+                self.on_ready(vector_index.current_generation(self.vectorstore_dir))
+            except Exception:
+                pass  # Warming caches is best-effort; the app loads the index on demand
+
+    def _run_stage(self, script, name, stage, status):
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        with open(self._path(os.path.join(LOG_DIR, f"bootstrap-{name}.log")), "w") as log:
+            process = subprocess.Popen(
+                [sys.executable, script], cwd=self.root, env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace",
+            )
+            last_write = 0.0
+            for line in process.stdout:
+                log.write(line)
+                if line.strip():
+                    stage['last_line'] = line.strip()[:200]
+                    # Throttle status writes; scripts can print thousands of lines
+                    if time.time() - last_write > 1:
+                        self._write_status(status)
+                        last_write = time.time()
+            return process.wait()
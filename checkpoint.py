@@ -0,0 +1,116 @@
+"""
+On-disk checkpoints for resumable downloads
+- Fetched page ranges are written as Parquet shard files as soon as they complete
+- A manifest records the resource ID, the offset range of each shard and its SHA-256
+- Later runs verify the shards and resume from the end of the last good one
+"""
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+import storage
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _atomic_write(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Shard directory plus manifest for one data.gov.in resource"""
+
+    def __init__(self, shard_dir, resource_id):
+        self.shard_dir = shard_dir
+        self.resource_id = resource_id
+        self.manifest_path = os.path.join(shard_dir, MANIFEST_NAME)
+        os.makedirs(shard_dir, exist_ok=True)
+        self.manifest = self._load()
+
+    def _load(self):
+        fresh = {"resource_id": self.resource_id, "shards": []}
+        if not os.path.exists(self.manifest_path):
+            return fresh
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("resource_id") != self.resource_id:
+            return fresh
+
+        # Keep shards only up to the first one that is missing or corrupt;
+        # everything after it gets fetched again.
+        good = []
+        for shard in manifest.get("shards", []):
+            path = os.path.join(self.shard_dir, shard["file"])
+            if not os.path.exists(path) or _sha256(path) != shard["sha256"]:
+                break
+            good.append(shard)
+        manifest["shards"] = good
+        return manifest
+
+    def _save(self):
+        self.manifest["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        _atomic_write(self.manifest_path, json.dumps(self.manifest, indent=2).encode())
+
+    @property
+    def shards(self):
+        return self.manifest["shards"]
+
+    @property
+    def rows(self):
+        return sum(shard["rows"] for shard in self.shards)
+
+    def next_offset(self):
+        """First offset that has not been persisted yet"""
+        return self.shards[-1]["end"] if self.shards else 0
+
+    def add_shard(self, start, records):
+        """Persist a contiguous run of records beginning at ``start``"""
+        end = start + len(records)
+        name = f"{start:09d}-{end:09d}.parquet"
+        path = os.path.join(self.shard_dir, name)
+        storage.save_table(pd.DataFrame(records), path)
+
+        self.shards.append({
+            "file": name,
+            "start": start,
+            "end": end,
+            "rows": len(records),
+            "sha256": _sha256(path),
+        })
+        self._save()
+
+    def iter_shards(self, columns=None):
+        """Yield each shard as a DataFrame, in offset order"""
+        for shard in self.shards:
+            path = os.path.join(self.shard_dir, shard["file"])
+            if columns:
+                present = storage.table_columns(path)
+                yield storage.load_table(path, columns=[c for c in columns if c in present])
+            else:
+                yield storage.load_table(path)
+
+    def consolidate(self, out_path):
+        """Stream every shard into a single table at ``out_path``; returns the row count"""
+        # Pages need not all carry the same fields: write the union of their columns
+        columns = dict.fromkeys(name for shard in self.shards
+                                for name in storage.table_columns(os.path.join(self.shard_dir, shard["file"])))
+        with storage.TableWriter(out_path, columns) as writer:
+            for df in self.iter_shards():
+                writer.write(df)
+        return writer.rows
@@ -0,0 +1,299 @@
+"""
+Rainfall climatology: the cleaned rainfall table as dense arrays with precomputed statistics
+- Monthly rainfall packed into a subdivision x year x month float32 array
+  (NaN where a subdivision-year is missing)
+- Built once: seasonal totals (Jan-Feb, Mar-May, Jun-Sep monsoon, Oct-Dec,
+  annual), each subdivision's long-period average (LPA), departures from it,
+  trailing rolling means and wettest-first rank tables
+- Saved as .npy files beside the rollups and memory-mapped on load, so a
+  range query ("average monsoon rainfall in Kerala from 2000 to 2010") is a
+  slice of a few floats: microseconds, no FAISS search and no rows for the
+  LLM to add up
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import storage
+from join_index import RAINFALL_DATA, SEASONS
+from metadata_index import normalize
+from rollups import ROLLUPS_DIR
+
+CLIMATOLOGY_DIR = os.path.join(ROLLUPS_DIR, "climatology")
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+# Period -> months summed (IMD seasons); a period with a missing month has no total
+PERIODS = {
+    'jf': ['jan', 'feb'],                       # winter
+    'mam': ['mar', 'apr', 'may'],               # pre-monsoon
+    **SEASONS,
+    'annual': MONTHS,
+}
+PERIOD_LABELS = {'jf': 'Jan-Feb', 'mam': 'Mar-May', 'jjas': 'Jun-Sep', 'ond': 'Oct-Dec', 'annual': 'Annual'}
+
+# LPA base period as "1951-2000"; empty means every year on record (the crop x rainfall joins use it too)
+LPA_YEARS = os.getenv("SAMARTH_LPA_YEARS", "")
+ROLLING_YEARS = int(os.getenv("SAMARTH_ROLLING_YEARS", "10"))
+
+# Array name -> dtype; all are subdivision x year x period except lpa (subdivision x period)
+ARRAYS = {
+    'monthly': np.float32,      # subdivision x year x month
+    'totals': np.float32,
+    'lpa': np.float32,
+    'departure': np.float32,    # % of LPA
+    'rolling': np.float32,      # trailing mean over ROLLING_YEARS (at least half of them present)
+    'rank': np.int16,           # 1 = wettest year of the subdivision, 0 = no total
+    'order': np.int16,          # year offsets, wettest first, -1 padding
+}
+META_FILE = "climatology.json"
+
+
+def _parse_years(text):
+    if not text:
+        return None
+    lo, hi = (int(y) for y in text.split('-'))
+    return lo, hi
+
+
+def _period_totals(monthly, annual):
+    """subdivision x year x period totals; annual prefers the table's own annual figure"""
+    totals = []
+    for period, months in PERIODS.items():
+        values = monthly[..., [MONTHS.index(m) for m in months]]
+        total = np.where(np.isnan(values).any(axis=-1), np.nan, values.sum(axis=-1))
+        if period == 'annual' and annual is not None:
+            total = np.where(np.isnan(annual), total, annual)
+        totals.append(total)
+    return np.stack(totals, axis=-1).astype(np.float32)
+
+
+def _nanmean(values, axis):
+    present = ~np.isnan(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(present, values, 0).sum(axis=axis) / present.sum(axis=axis)
+
+
+def _rolling(totals, window):
+    """Trailing mean over ``window`` years (axis 1), NaN unless half the window has totals"""
+    present = ~np.isnan(totals)
+    sums = np.concatenate([np.zeros_like(totals[:, :1], dtype=np.float64),
+                           np.cumsum(np.where(present, totals, 0), axis=1, dtype=np.float64)], axis=1)
+    counts = np.concatenate([np.zeros_like(present[:, :1], dtype=np.int64),
+                             np.cumsum(present, axis=1)], axis=1)
+    lo = np.maximum(np.arange(totals.shape[1]) + 1 - window, 0)
+    window_sums = sums[:, 1:] - sums[:, lo]
+    window_counts = counts[:, 1:] - counts[:, lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(window_counts >= (window + 1) // 2, window_sums / window_counts, np.nan)
+
+
+def _ranks(totals):
+    """(rank, order) per subdivision and period over years: 1 = wettest; missing years last"""
+    missing = np.isnan(totals)
+    order = np.argsort(np.where(missing, np.inf, -totals), axis=1, kind='stable')
+    rank = np.empty(totals.shape, dtype=np.int16)
+    positions = np.broadcast_to(np.arange(1, totals.shape[1] + 1)[None, :, None], totals.shape)
+    np.put_along_axis(rank, order, positions.astype(np.int16), axis=1)
+    rank[missing] = 0
+    valid = (~missing).sum(axis=1, keepdims=True)
+    order = np.where(np.arange(totals.shape[1])[None, :, None] < valid, order, -1)
+    return rank, order.astype(np.int16)
+
+
+def _save(path, array):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def compute_climatology(src=RAINFALL_DATA, lpa_years=LPA_YEARS, window=ROLLING_YEARS):
+    """(metadata, {name: array}) for the cleaned rainfall table, without writing anything
+
+    The one place seasonal totals and LPA departures are computed; the crop x
+    rainfall joins read theirs from here too.
+    """
+    columns = storage.table_columns(src)
+    df = storage.load_table(src, columns=['subdivision', 'year'] + MONTHS + [c for c in ['annual'] if c in columns])
+    df['subdivision'] = df['subdivision'].astype(str)
+    values = [c for c in df.columns if c not in ('subdivision', 'year')]
+    # Duplicate subdivision-years are averaged, as in the joins
+    df = df.groupby(['subdivision', 'year'], as_index=False)[values].mean()
+
+    subdivisions = sorted(df['subdivision'].unique())
+    first, last = int(df['year'].min()), int(df['year'].max())
+    s = pd.Categorical(df['subdivision'], categories=subdivisions).codes
+    y = df['year'].to_numpy() - first
+    monthly = np.full((len(subdivisions), last - first + 1, len(MONTHS)), np.nan, dtype=np.float32)
+    monthly[s, y] = df[MONTHS].to_numpy(dtype=np.float32)
+    annual = None
+    if 'annual' in df.columns:
+        annual = np.full(monthly.shape[:2], np.nan, dtype=np.float32)
+        annual[s, y] = df['annual'].to_numpy(dtype=np.float32)
+
+    totals = _period_totals(monthly, annual)
+    base = _parse_years(lpa_years) or (first, last)
+    lo, hi = max(base[0], first) - first, min(base[1], last) - first + 1
+    lpa = _nanmean(totals[:, lo:hi], axis=1).astype(np.float32)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        departure = ((totals - lpa[:, None, :]) / lpa[:, None, :] * 100).astype(np.float32)
+    rank, order = _ranks(totals)
+    arrays = {'monthly': monthly, 'totals': totals, 'lpa': lpa, 'departure': departure,
+              'rolling': _rolling(totals, window).astype(np.float32), 'rank': rank, 'order': order}
+    meta = {'subdivisions': subdivisions, 'first_year': first, 'last_year': last,
+            'periods': list(PERIODS), 'lpa_years': [first + lo, first + hi - 1], 'rolling_years': window}
+    return meta, {name: array.astype(ARRAYS[name]) for name, array in arrays.items()}
+
+
+def build_climatology(src=RAINFALL_DATA, out_dir=CLIMATOLOGY_DIR, lpa_years=LPA_YEARS, window=ROLLING_YEARS):
+    """Pack the cleaned rainfall table and write every statistic; returns the saved metadata"""
+    meta, arrays = compute_climatology(src, lpa_years, window)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, array in arrays.items():
+        _save(os.path.join(out_dir, f"{name}.npy"), array)
+    # Written last, so an interrupted first build leaves nothing to load
+    tmp = os.path.join(out_dir, f"{META_FILE}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(out_dir, META_FILE))
+    return meta
+
+
+class Climatology:
+    """Memory-mapped climatology arrays with range queries by subdivision, period and years"""
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.subdivisions = meta['subdivisions']
+        self.periods = meta['periods']
+        self.first_year = meta['first_year']
+        self.last_year = meta['last_year']
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self._index = {normalize(name): i for i, name in enumerate(self.subdivisions)}
+
+    @classmethod
+    def load(cls, root=CLIMATOLOGY_DIR):
+        """Arrays saved by build_climatology(), memory-mapped; None if none were built"""
+        if not os.path.exists(os.path.join(root, META_FILE)):
+            return None
+        with open(os.path.join(root, META_FILE)) as f:
+            meta = json.load(f)
+        # Plain ndarray views of the maps: numpy's memmap subclass adds overhead to every tiny slice
+        arrays = {name: np.load(os.path.join(root, f"{name}.npy"), mmap_mode='r').view(np.ndarray)
+                  for name in ARRAYS}
+        return cls(meta, arrays)
+
+    def subdivision(self, name):
+        """Row of a subdivision by (any casing of) its name, or None"""
+        return self._index.get(normalize(name))
+
+    def _span(self, start, end):
+        lo = self.first_year if start is None else max(int(start), self.first_year)
+        hi = self.last_year if end is None else min(int(end), self.last_year)
+        return lo - self.first_year, hi - self.first_year + 1
+
+    def series(self, subdivision, period='annual', start=None, end=None):
+        """(years, totals in mm) for one subdivision and period"""
+        s, p = self.subdivision(subdivision), self.periods.index(period)
+        lo, hi = self._span(start, end)
+        return np.arange(lo, max(hi, lo)) + self.first_year, self.totals[s, lo:hi, p]
+
+    def range_stats(self, subdivision, period='jjas', start=None, end=None):
+        """Mean, LPA, departure and wettest/driest year of a period over a year range, or None"""
+        s = self.subdivision(subdivision)
+        if s is None:
+            return None
+        p = self.periods.index(period)
+        lo, hi = self._span(start, end)
+        values = self.totals[s, lo:hi, p]
+        present = values[values == values]          # NaN != NaN
+        if not len(present):
+            return None
+        mean = float(present.sum()) / len(present)
+        lpa = float(self.lpa[s, p])
+        # Rank is 0 for missing years, so the wettest year in range has the smallest positive rank
+        ranks = self.rank[s, lo:hi, p]
+        wettest = lo + int(np.where(ranks > 0, ranks, np.iinfo(np.int16).max).argmin())
+        driest = lo + int(ranks.argmax())
+        return {
+            'subdivision': self.subdivisions[s], 'period': period,
+            'start': lo + self.first_year, 'end': hi - 1 + self.first_year, 'years': len(present),
+            'mean_mm': mean, 'lpa_mm': lpa, 'departure_pct': (mean - lpa) / lpa * 100 if lpa else float('nan'),
+            'wettest': (wettest + self.first_year, float(self.totals[s, wettest, p]), int(self.rank[s, wettest, p])),
+            'driest': (driest + self.first_year, float(self.totals[s, driest, p]), int(self.rank[s, driest, p])),
+        }
+
+    def extremes(self, subdivision, period='annual', n=5, driest=False):
+        """[(year, mm)] of the n wettest (or driest) years on record, from the rank table"""
+        s, p = self.subdivision(subdivision), self.periods.index(period)
+        order = self.order[s, :, p]
+        order = order[:int((order >= 0).sum())]
+        picked = order[::-1][:n] if driest else order[:n]
+        return [(int(y) + self.first_year, float(self.totals[s, y, p])) for y in picked]
+
+    def table(self, subdivisions, periods, years=None, max_rows=60):
+        """Per-year (or, when that is over ``max_rows``, per-decade) figures plus a mean and LPA row
+        per subdivision, with prompt-ready column names"""
+        rows = []
+        span = (min(years), max(years)) if years else (None, None)
+        lo, hi = self._span(*span)
+        selected = np.array(sorted(int(y) for y in years), dtype=np.int64) - self.first_year if years \
+            else np.arange(lo, hi)
+        selected = selected[(selected >= 0) & (selected < self.totals.shape[1])]
+        by_decade = len(subdivisions) * (len(selected) + 2) > max_rows
+        for name in subdivisions:
+            s = self.subdivision(name)
+            if s is None or not len(selected):
+                continue
+            label = self.subdivisions[s]
+            if by_decade:
+                decades = (selected + self.first_year) // 10 * 10
+                for decade in np.unique(decades):
+                    picked = selected[decades == decade]
+                    row = {'Subdivision': label,
+                           'Years': f"{picked.min() + self.first_year}-{picked.max() + self.first_year}"}
+                    for period in periods:
+                        p = self.periods.index(period)
+                        mean = _nanmean(self.totals[s, picked, p], axis=0)
+                        row[f"{PERIOD_LABELS[period]} mean (mm)"] = mean
+                        row[f"{PERIOD_LABELS[period]} vs LPA (%)"] = (mean - self.lpa[s, p]) / self.lpa[s, p] * 100
+                    rows.append(row)
+            else:
+                for y in selected:
+                    row = {'Subdivision': label, 'Years': str(y + self.first_year)}
+                    for period in periods:
+                        p = self.periods.index(period)
+                        rank = int(self.rank[s, y, p])
+                        row[f"{PERIOD_LABELS[period]} (mm)"] = self.totals[s, y, p]
+                        row[f"{PERIOD_LABELS[period]} vs LPA (%)"] = self.departure[s, y, p]
+                        row[f"{PERIOD_LABELS[period]} {self.meta['rolling_years']}-yr mean (mm)"] = \
+                            self.rolling[s, y, p]
+                        row[f"{PERIOD_LABELS[period]} rank (1 = wettest)"] = \
+                            f"{rank} of {int((self.rank[s, :, p] > 0).sum())}" if rank else ""
+                    rows.append(row)
+            # Over the selected years only: '2002, 2005 and 2009' is not 2002-2009
+            first, last = selected.min() + self.first_year, selected.max() + self.first_year
+            contiguous = len(selected) == last - first + 1
+            summary = {'Subdivision': label,
+                       'Years': f"mean {first}-{last}" if contiguous else f"mean of {len(selected)} years {first}-{last}"}
+            normal = {'Subdivision': label, 'Years': "LPA {}-{}".format(*self.meta['lpa_years'])}
+            for period in periods:
+                p = self.periods.index(period)
+                key = f"{PERIOD_LABELS[period]} mean (mm)" if by_decade else f"{PERIOD_LABELS[period]} (mm)"
+                mean = _nanmean(self.totals[s, selected, p], axis=0)
+                summary[key] = mean
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    summary[f"{PERIOD_LABELS[period]} vs LPA (%)"] = (mean - self.lpa[s, p]) / self.lpa[s, p] * 100
+                normal[key] = self.lpa[s, p]
+            rows += [summary, normal]
+        return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    meta = build_climatology()
+    print(f"✅ climatology: {len(meta['subdivisions'])} subdivisions x "
+          f"{meta['last_year'] - meta['first_year'] + 1} years x {len(meta['periods'])} periods")
@@ -0,0 +1,142 @@
+"""
+Token-budgeted context packing for the answer prompt
+- Retrieved documents are parsed back into their labelled fields ("Crop:
+  Rice", "Area: 389.0 hectares") and deduplicated
+- Rows from the same source become one compact table: the section title,
+  units and citation are written once, and columns that hold the same value
+  in every row (e.g. the state or the crop) move into the section header
+- Rows are added in retrieval order until the context reaches the token
+  budget, so the prompt carries as many rows as fit rather than a fixed five
+- SAMARTH_CONTEXT_TOKENS sets the budget (0 = the previous "five documents
+  joined verbatim" prompt); SAMARTH_CONTEXT_MAX_DOCS caps retrieval depth
+"""
+import os
+import re
+
+from tracing import estimate_tokens
+
+CONTEXT_TOKENS = int(os.getenv('SAMARTH_CONTEXT_TOKENS', '400'))
+MAX_CONTEXT_DOCS = int(os.getenv('SAMARTH_CONTEXT_MAX_DOCS', '20'))
+
+_NUMBER_UNIT = re.compile(r"^(-?[\d.,]+|nan|<NA>)\s+(\S.*)$")
+
+SHORT_LABELS = {
+    'January': 'Jan', 'February': 'Feb', 'March': 'Mar', 'April': 'Apr', 'May': 'May', 'June': 'Jun',
+    'July': 'Jul', 'August': 'Aug', 'September': 'Sep', 'October': 'Oct', 'November': 'Nov',
+    'December': 'Dec', 'Annual Total': 'Annual',
+}
+
+# Only these values are split into a number and a unit: a name such as the
+# district '24 PARAGANAS NORTH' also starts with a digit
+NUMERIC_LABELS = {'Area', 'Production', 'Yield', *SHORT_LABELS}
+UNITS = {'hectares', 'tonnes', 'tonnes/hectare', 'mm'}
+
+
+def parse_document(text):
+    """(title, citation, [(label, value, unit)]) from a rendered 'Label: value unit' document"""
+    title, citation, fields = None, None, []
+    for line in text.strip().splitlines():
+        label, sep, value = line.partition(':')
+        value = value.strip()
+        if not sep:
+            continue
+        if not value:
+            title = label.strip()
+        elif label == 'Source':
+            citation = value
+        else:
+            label = label.strip()
+            match = _NUMBER_UNIT.match(value)
+            if match and (label in NUMERIC_LABELS or match.group(2) in UNITS):
+                fields.append((label, match.group(1), match.group(2)))
+            else:
+                fields.append((label, value, None))
+    return title, citation, fields
+
+
+class _Section:
+    def __init__(self, title, citation):
+        self.title = title
+        self.citation = citation
+        self.labels = []
+        self.rows = []
+
+    def add(self, fields):
+        row = {}
+        for label, value, unit in fields:
+            if label not in self.labels:
+                self.labels.append(label)
+            row[label] = (value, unit)
+        self.rows.append(row)
+
+    def _unit(self, label):
+        """The unit every row gives ``label``, or None when there is none or the rows differ"""
+        units = {row[label][1] for row in self.rows if label in row}
+        return units.pop() if len(units) == 1 else None
+
+    def _cell(self, row, label):
+        value, unit = row.get(label, ('', None))
+        # Units that differ between rows stay on each value, never in the header
+        return value if self._unit(label) else _with_unit(value, unit)
+
+    def render(self):
+        shared = [label for label in self.labels
+                  if len(self.rows) > 1 and len({row.get(label) for row in self.rows}) == 1]
+        columns = [label for label in self.labels if label not in shared]
+        title = self.title or 'Data'
+        if shared:
+            title += " - " + ", ".join(f"{label}: {_with_unit(*self.rows[0][label])}" for label in shared)
+        lines = [f"{title} [Source: {self.citation or 'data.gov.in'}]"]
+        if len(self.rows) == 1:
+            # A lone row is shorter as 'Label: value' lines than as a one-row table
+            lines += [f"{label}: {_with_unit(*self.rows[0].get(label, ('', None)))}" for label in columns]
+        elif columns:
+            lines.append(" | ".join(_header(label, self._unit(label)) for label in columns))
+            lines += [" | ".join(self._cell(row, label) for label in columns) for row in self.rows]
+        return "\n".join(lines)
+
+
+def _header(label, unit):
+    label = SHORT_LABELS.get(label, label)
+    return f"{label} ({unit})" if unit else label
+
+
+def _with_unit(value, unit):
+    return f"{value} {unit}" if unit else value
+
+
+def render(docs):
+    """Compact table text for ``docs`` (already deduplicated), one section per source"""
+    return _render([(doc.metadata.get('source'), parse_document(doc.page_content)) for doc in docs])
+
+
+def _render(parsed):
+    sections = {}
+    for source, (title, citation, fields) in parsed:
+        key = (source, title, citation)
+        if key not in sections:
+            sections[key] = _Section(title, citation)
+        sections[key].add(fields)
+    return "\n\n".join(section.render() for section in sections.values())
+
+
+def pack(docs, budget=CONTEXT_TOKENS):
+    """(context text, documents used) holding as many of ``docs`` as fit in ``budget`` tokens
+
+    Documents keep their retrieval order; exact duplicates are dropped and the
+    first document is always included, even if it alone exceeds the budget.
+    """
+    used, parsed, seen = [], [], set()
+    context = ""
+    for doc in docs:
+        if doc.page_content in seen:
+            continue
+        seen.add(doc.page_content)
+        entry = (doc.metadata.get('source'), parse_document(doc.page_content))
+        candidate = _render(parsed + [entry])
+        if used and estimate_tokens(candidate) > budget:
+            break
+        used.append(doc)
+        parsed.append(entry)
+        context = candidate
+    return context, used
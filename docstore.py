@@ -0,0 +1,208 @@
+"""
+Compact, memory-mapped docstore for the FAISS vector store
+- Replaces the pickled index.pkl: one SQLite table per source holding each
+  row's typed fields once (no pre-rendered page text), keyed by vector position
+- Opened read-only, immutable and memory-mapped: startup does no work
+  proportional to the corpus, and several app processes share the same
+  page-cache pages
+- Page text and metadata are rendered on demand, only for the rows a
+  search returns, with the same renderers the build uses (documents.py)
+"""
+import heapq
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+import pandas as pd
+from langchain.docstore.base import Docstore
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.schema import Document
+
+import documents
+import storage
+from vector_index import unique_keys
+
+DOCSTORE_FILE = "docs.sqlite"
+
+# Rows read and rendered at a time when streaming the whole docstore
+READ_BATCH = 50_000
+
+# Source -> (table, columns the renderers read, text renderer, metadata renderer, row renderer)
+SOURCES = {
+    'crop_production': (
+        'crop',
+        ['state_name', 'district_name', 'crop', 'season', 'crop_year', 'area_', 'production_'],
+        documents.render_crop_texts, documents.crop_metadatas, documents.crop_row_document,
+    ),
+    'rainfall': (
+        'rainfall',
+        ['subdivision', 'year'] + [col for col, _ in documents.MONTHS] + ['annual'],
+        documents.render_rainfall_texts, documents.rainfall_metadatas, documents.rainfall_row_document,
+    ),
+}
+
+# Generations are never modified after publish, so readers can map the whole file
+MMAP_BYTES = 1 << 30
+
+
+def _sql_type(column):
+    if column in storage.INTEGER_COLUMNS:
+        return 'INTEGER'
+    if column in storage.FLOAT_COLUMNS:
+        return 'REAL'
+    return 'TEXT'
+
+
+def write_docstore(path, index_to_docstore_id, tables, batch_size=50_000):
+    """Write the typed rows behind every vector to ``path``/docs.sqlite
+
+    ``tables`` is a list of (source, parquet path, key function) in build order;
+    row keys are recomputed exactly as the build did and matched to positions
+    through ``index_to_docstore_id``.
+    """
+    positions = {key: position for position, key in index_to_docstore_id.items()}
+    target = os.path.join(path, DOCSTORE_FILE)
+    tmp = f"{target}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    conn = sqlite3.connect(tmp)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    seen = {}
+    written = 0
+    for source, parquet_path, to_keys in tables:
+        table, wanted = SOURCES[source][:2]
+        columns = [c for c in wanted if c in storage.table_columns(parquet_path)]
+        conn.execute(
+            f"CREATE TABLE {table} (position INTEGER PRIMARY KEY, key TEXT NOT NULL, "
+            + ", ".join(f"{c} {_sql_type(c)}" for c in columns) + ")"
+        )
+        counter = seen.setdefault(source, Counter())
+        insert = f"INSERT INTO {table} VALUES ({', '.join('?' * (len(columns) + 2))})"
+        for df in storage.iter_batches(parquet_path, batch_size=batch_size, columns=columns):
+            keys = unique_keys(to_keys(df), counter)
+            rows = pd.DataFrame({'position': [positions.get(key, -1) for key in keys], 'key': keys})
+            for c in columns:
+                values = df[c]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    values = values.astype(object)
+                rows[c] = values.astype(object).where(values.notna(), None).to_numpy()
+            rows = rows[rows['position'] >= 0]
+            conn.executemany(insert, rows.itertuples(index=False, name=None))
+            written += len(rows)
+    conn.commit()
+    conn.close()
+    os.replace(tmp, target)
+    return written
+
+
+class PositionIds:
+    """index_to_docstore_id stand-in: vector position i is docstore ID i"""
+
+    def __init__(self, size):
+        self.size = size
+
+    def __getitem__(self, position):
+        position = int(position)
+        if not 0 <= position < self.size:
+            raise KeyError(position)
+        return position
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(range(self.size))
+
+    def items(self):
+        return ((i, i) for i in range(self.size))
+
+
+class SqliteDocstore(Docstore):
+    """Read-only docstore addressed by vector position, rendering documents on demand"""
+
+    def __init__(self, path):
+        self.path = os.path.join(path, DOCSTORE_FILE)
+        self._local = threading.local()
+        conn = self._conn()
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        self.sources = {source: spec for source, spec in SOURCES.items() if spec[0] in names}
+        self.columns = {
+            source: [row[1] for row in conn.execute(f"PRAGMA table_info({spec[0]})")]
+            for source, spec in self.sources.items()
+        }
+
+    def _conn(self):
+        # One connection per thread (Streamlit serves sessions from several threads)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True,
+                                   check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        conn = self._conn()
+        return sum(conn.execute(f"SELECT COUNT(*) FROM {spec[0]}").fetchone()[0]
+                   for spec in self.sources.values())
+
+    def _frames(self, source, batch_size=READ_BATCH):
+        """Typed DataFrames with 'position' and 'key' over every row of ``source``, in position order"""
+        cursor = self._conn().execute(f"SELECT * FROM {self.sources[source][0]} ORDER BY position")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield storage.normalize(pd.DataFrame(rows, columns=self.columns[source]))
+
+    def documents(self, positions):
+        """Documents for vector ``positions``, in the same order (a few rows: no pandas involved)"""
+        positions = [int(p) for p in positions]
+        marks = ", ".join("?" * len(positions))
+        conn = self._conn()
+        found = {}
+        for source, spec in self.sources.items():
+            columns = self.columns[source]
+            for values in conn.execute(f"SELECT * FROM {spec[0]} WHERE position IN ({marks})", positions):
+                row = dict(zip(columns, values))
+                found[row['position']] = spec[4](row)
+        return [found[p] for p in positions if p in found]
+
+    def search(self, search):
+        docs = self.documents([search])
+        return docs[0] if docs else f"ID {search} not found."
+
+    def _in_position_order(self, render):
+        # Each source streams in position order, one rendered batch at a time; merge them
+        def rendered(source):
+            for df in self._frames(source):
+                yield from zip(df['position'].tolist(), render(source, df))
+        for _, item in heapq.merge(*(rendered(source) for source in self.sources), key=lambda pair: pair[0]):
+            yield item
+
+    def iter_metadatas(self):
+        """Metadata dict for every row, in vector-position order"""
+        return self._in_position_order(lambda source, df: self.sources[source][3](df))
+
+    def iter_documents(self):
+        """Every Document, in vector-position order (rendered in batches, for index builds)"""
+        def render(source, df):
+            render_texts, render_metadatas = self.sources[source][2:4]
+            return [Document(page_content=text, metadata=metadata)
+                    for text, metadata in zip(render_texts(df), render_metadatas(df))]
+        return self._in_position_order(render)
+
+    def to_memory(self):
+        """(InMemoryDocstore keyed by row key, {position: row key}) for incremental updates"""
+        docs, index_to_docstore_id = {}, {}
+        for source, spec in self.sources.items():
+            render_texts, render_metadatas = spec[2:4]
+            for df in self._frames(source):
+                for position, key, text, metadata in zip(df['position'], df['key'],
+                                                         render_texts(df), render_metadatas(df)):
+                    docs[key] = Document(page_content=text, metadata=metadata)
+                    index_to_docstore_id[int(position)] = key
+        return InMemoryDocstore(docs), dict(sorted(index_to_docstore_id.items()))
@@ -0,0 +1,220 @@
+"""
+Embedding backends shared by the build scripts, the app and the service
+- huggingface: sentence-transformers all-MiniLM-L6-v2 on PyTorch (default)
+- onnx / onnx-int8: the same model exported to ONNX and run by onnxruntime,
+  in float32 or with dynamically quantized int8 weights; no torch needed
+- stub: deterministic hashed bag-of-words vectors, no model download or
+  torch; for offline benchmarks and CI (SAMARTH_EMBEDDINGS=stub)
+- SAMARTH_EMBED_BATCH / SAMARTH_EMBED_THREADS set the encode batch size and
+  CPU threads; the ONNX backends sort each batch by token length so little
+  time goes into padding
+- Build and query must use the same backend: the build records it in the
+  index (index.json) and for_index() loads it back, and each backend keeps
+  its own embedding cache
+"""
+import os
+import re
+import zlib
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+STUB_DIM = 384
+
+EMBED_BATCH = int(os.getenv('SAMARTH_EMBED_BATCH', '64'))
+EMBED_THREADS = int(os.getenv('SAMARTH_EMBED_THREADS', '0'))   # 0 = runtime default
+
+# Exported model.onnx + tokenizer.json (downloaded from the model repo on first use)
+ONNX_DIR = os.getenv('SAMARTH_ONNX_DIR', os.path.join('models', 'all-MiniLM-L6-v2-onnx'))
+ONNX_MAX_TOKENS = 256          # the model's max_seq_length
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class StubEmbeddings(Embeddings):
+    """Signed feature hashing of lower-cased word tokens, L2-normalized
+
+    Texts sharing words get similar vectors, so retrieval behaves sensibly
+    on synthetic data, and the same text always maps to the same vector.
+    """
+
+    model_name = f"stub-hashing-{STUB_DIM}"
+
+    def __init__(self, dim=STUB_DIM):
+        self.dim = dim
+        self._slots = {}  # token -> (column, sign)
+
+    def _slot(self, token):
+        slot = self._slots.get(token)
+        if slot is None:
+            h = zlib.crc32(token.encode())
+            slot = self._slots[token] = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+        return slot
+
+    def embed_array(self, texts):
+        rows, cols, signs = [], [], []
+        for i, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                column, sign = self._slot(token)
+                rows.append(i)
+                cols.append(column)
+                signs.append(sign)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)),
+                  np.asarray(signs, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_array([text])[0].tolist()
+
+
+class OnnxEmbeddings(Embeddings):
+    """all-MiniLM-L6-v2 on onnxruntime: mean-pooled, L2-normalized token states
+
+    Texts are tokenized up front, ordered by length and encoded in batches of
+    ``batch_size`` padded only to the longest text in the batch; results are
+    returned in the original order. ``sort_by_length=False`` keeps input
+    order (for measuring what the sort saves).
+    """
+
+    def __init__(self, quantize=False, batch_size=None, threads=None, model_dir=ONNX_DIR, sort_by_length=True):
+        import onnxruntime as ort
+
+        self.quantize = quantize
+        self.sort_by_length = sort_by_length
+        self.model_name = f"{EMBEDDING_MODEL}@onnx{'-int8' if quantize else ''}"
+        self.batch_size = batch_size or EMBED_BATCH
+        model_path, self.tokenizer = _onnx_files(model_dir, quantize)
+
+        options = ort.SessionOptions()
+        threads = EMBED_THREADS if threads is None else threads
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def embed_array(self, texts):
+        encodings = self.tokenizer.encode_batch(list(texts))
+        lengths = np.array([len(e.ids) for e in encodings])
+        order = np.argsort(lengths, kind='stable') if self.sort_by_length else np.arange(len(lengths))
+        out = None
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            width = int(lengths[batch].max())
+            ids = np.zeros((len(batch), width), dtype=np.int64)
+            mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                ids[row, :lengths[i]] = encodings[i].ids
+                mask[row, :lengths[i]] = 1
+            feeds = {'input_ids': ids, 'attention_mask': mask}
+            if 'token_type_ids' in self.input_names:
+                feeds['token_type_ids'] = np.zeros_like(ids)
+            states = self.session.run(None, feeds)[0]
+            # Mean over real tokens, then unit length (the model's Pooling + Normalize modules)
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (states * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            if out is None:
+                out = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            out[batch] = pooled
+        return out if out is not None else np.empty((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_array([text])[0].tolist()
+
+
+def _onnx_files(model_dir, quantize):
+    """(model path, tokenizer) under ``model_dir``, downloading/quantizing what is missing"""
+    from tokenizers import Tokenizer
+
+    os.makedirs(model_dir, exist_ok=True)
+    model_path = os.path.join(model_dir, 'model.onnx')
+    tokenizer_path = os.path.join(model_dir, 'tokenizer.json')
+    for path, remote in ((model_path, 'onnx/model.onnx'), (tokenizer_path, 'tokenizer.json')):
+        if not os.path.exists(path):
+            import shutil
+            from huggingface_hub import hf_hub_download
+            print(f"Downloading {EMBEDDING_MODEL}/{remote}...")
+            shutil.copyfile(hf_hub_download(EMBEDDING_MODEL, remote), path)
+
+    if quantize:
+        quantized = os.path.join(model_dir, 'model-int8.onnx')
+        if not os.path.exists(quantized):
+            try:
+                # Imports the onnx package, which onnxruntime itself does not install
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+            except ImportError as e:
+                message = (f"SAMARTH_EMBEDDINGS=onnx-int8 needs the onnx package to quantize the model "
+                           f"({e}); run pip install -r requirements.txt")
+                print(f"❌ {message}")
+                raise ImportError(message) from e
+            print("Quantizing the ONNX model to int8 weights...")
+            tmp = quantized + '.tmp'
+            quantize_dynamic(model_path, tmp, weight_type=QuantType.QInt8)
+            os.replace(tmp, quantized)
+        model_path = quantized
+
+    tokenizer = Tokenizer.from_file(tokenizer_path)
+    tokenizer.no_padding()
+    tokenizer.enable_truncation(max_length=ONNX_MAX_TOKENS)
+    return model_path, tokenizer
+
+
+def _huggingface():
+    from langchain.embeddings import HuggingFaceEmbeddings
+    if EMBED_THREADS:
+        import torch
+        torch.set_num_threads(EMBED_THREADS)
+    # sentence-transformers already sorts each encode call by length
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, encode_kwargs={'batch_size': EMBED_BATCH})
+
+
+BACKENDS = {
+    'huggingface': (EMBEDDING_MODEL, _huggingface),
+    'onnx': (f"{EMBEDDING_MODEL}@onnx", lambda: OnnxEmbeddings(quantize=False)),
+    'onnx-int8': (f"{EMBEDDING_MODEL}@onnx-int8", lambda: OnnxEmbeddings(quantize=True)),
+    'stub': (StubEmbeddings.model_name, StubEmbeddings),
+}
+
+
+def backend_name(name=None):
+    name = (name or os.getenv('SAMARTH_EMBEDDINGS') or 'huggingface').lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SAMARTH_EMBEDDINGS {name!r}; choose from {', '.join(BACKENDS)}")
+    return name
+
+
+def model_name(name=None):
+    """Identifier of the backend's vectors (embedding cache key prefix)"""
+    return BACKENDS[backend_name(name)][0]
+
+
+def get_embeddings(name=None):
+    """Embeddings for the backend named by ``name`` or SAMARTH_EMBEDDINGS (default huggingface)"""
+    return BACKENDS[backend_name(name)][1]()
+
+
+def for_index(path):
+    """Embeddings for the backend the index in generation ``path`` was built with
+
+    Generations from before the backend was recorded fall back to
+    SAMARTH_EMBEDDINGS. A different SAMARTH_EMBEDDINGS is overridden, since
+    its query vectors would not match the index.
+    """
+    import vector_index
+    recorded = vector_index.load_config(path).get('embeddings')
+    if recorded and os.getenv('SAMARTH_EMBEDDINGS') and backend_name() != recorded:
+        print(f"⚠️ Index was built with {recorded} embeddings; using them instead of "
+              f"SAMARTH_EMBEDDINGS={backend_name()}")
+    return get_embeddings(recorded)
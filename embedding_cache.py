@@ -0,0 +1,194 @@
+"""
+Content-addressed embedding cache
+- Every vector is keyed by a hash of (model name, document text)
+- Vectors live in a memory-mapped float32 matrix, keys in a parallel hash index
+- Cache hits never touch the embedding model; it is only loaded on the first miss
+- gc() drops entries that the current corpus no longer references
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+KEY_BYTES = 16
+
+
+def cache_key(model_name, text):
+    """16-byte content hash of (model name, text)"""
+    digest = hashlib.blake2b(digest_size=KEY_BYTES)
+    digest.update(model_name.encode())
+    digest.update(b"\0")
+    digest.update(text.encode())
+    return digest.digest()
+
+
+def _read_keys(path, count):
+    # Keys are raw digests; numpy's S dtype would strip trailing NUL bytes
+    with open(path, "rb") as f:
+        data = f.read(count * KEY_BYTES)
+    return [data[i:i + KEY_BYTES] for i in range(0, len(data), KEY_BYTES)]
+
+
+def _model_slug(model_name):
+    return model_name.replace("/", "__")
+
+
+class EmbeddingCache:
+    """Append-only vector matrix plus key index for one embedding model
+
+    Layout under ``<root>/<model>/``:
+        meta.json            {"model", "dim", "rows", "generation"}
+        vectors-<gen>.f32    rows x dim float32, memory-mapped on read
+        keys-<gen>.bin       rows x 16-byte keys, loaded into a dict
+    meta.json is the commit point: rows past its count are ignored, and
+    gc() writes a new generation before switching meta.json over to it.
+    """
+
+    def __init__(self, root, model_name):
+        self.model_name = model_name
+        self.dir = os.path.join(root, _model_slug(model_name))
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        os.makedirs(self.dir, exist_ok=True)
+        self._load()
+
+    def _paths(self, generation):
+        return (os.path.join(self.dir, f"vectors-{generation}.f32"),
+                os.path.join(self.dir, f"keys-{generation}.bin"))
+
+    def _load(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {"model": self.model_name, "dim": None, "rows": 0, "generation": 0}
+
+        rows = self.meta["rows"]
+        self.vectors_path, self.keys_path = self._paths(self.meta["generation"])
+        if rows:
+            self.index = {key: row for row, key in enumerate(_read_keys(self.keys_path, rows))}
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                     shape=(rows, self.meta["dim"]))
+        else:
+            self.index = {}
+            self.vectors = None
+
+    def _commit(self, **changes):
+        self.meta.update(changes)
+        tmp = f"{self.meta_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def lookup(self, keys):
+        """Row number for each key, -1 where the key is not cached"""
+        return np.fromiter((self.index.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+    def get(self, rows):
+        """Vectors for cached row numbers, as an in-memory float32 array"""
+        return np.asarray(self.vectors[rows])
+
+    def append(self, keys, vectors):
+        """Add new (key, vector) pairs; keys already present are skipped"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        fresh = list({key: i for i, key in enumerate(keys) if key not in self.index}.values())
+        if not fresh:
+            return
+        if self.meta["dim"] is None:
+            self.meta["dim"] = int(vectors.shape[1])
+
+        rows = self.meta["rows"]
+        new_keys = [keys[i] for i in fresh]
+        # Drop anything past the committed row count (left over from a crash)
+        for path, itemsize in ((self.vectors_path, 4 * self.meta["dim"]), (self.keys_path, KEY_BYTES)):
+            with open(path, "ab") as f:
+                f.truncate(rows * itemsize)
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors[fresh].tobytes())
+        with open(self.keys_path, "ab") as f:
+            f.write(b"".join(new_keys))
+
+        self._commit(rows=rows + len(fresh))
+        self.index.update((key, rows + i) for i, key in enumerate(new_keys))
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                 shape=(len(self), self.meta["dim"]))
+
+    def gc(self, live_keys):
+        """Rewrite the cache keeping only ``live_keys``; returns the number of entries dropped"""
+        live = set(live_keys)
+        keep = np.array(sorted(row for key, row in self.index.items() if key in live), dtype=np.int64)
+        dropped = len(self) - len(keep)
+        if not dropped:
+            return 0
+
+        old_paths = (self.vectors_path, self.keys_path)
+        generation = self.meta["generation"] + 1
+        vectors_path, keys_path = self._paths(generation)
+        keys = _read_keys(self.keys_path, len(self))
+        with open(vectors_path, "wb") as f:
+            if len(keep):
+                f.write(self.get(keep).tobytes())
+        with open(keys_path, "wb") as f:
+            f.write(b"".join(keys[row] for row in keep))
+
+        self.vectors = None
+        self._commit(rows=len(keep), generation=generation)
+        for path in old_paths:
+            os.remove(path)
+        self._load()
+        return dropped
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves document vectors from an EmbeddingCache
+
+    ``load_model`` is a zero-argument callable returning the real Embeddings;
+    it is only called the first time a text misses the cache.
+    """
+
+    def __init__(self, model_name, load_model, cache_dir="embedding_cache"):
+        self.model_name = model_name
+        self.cache = EmbeddingCache(cache_dir, model_name)
+        self._load_model = load_model
+        self._model = None
+        self.hits = 0
+        self.misses = 0
+        self.seen_keys = set()
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._load_model()
+        return self._model
+
+    def embed_documents_array(self, texts):
+        """Embed ``texts`` as an (n, dim) float32 array, embedding only cache misses"""
+        if not texts:
+            return np.empty((0, self.cache.meta["dim"] or 0), dtype=np.float32)
+        keys = [cache_key(self.model_name, text) for text in texts]
+        self.seen_keys.update(keys)
+        rows = self.cache.lookup(keys)
+        missing = np.flatnonzero(rows < 0)
+
+        if len(missing):
+            # Identical texts inside one batch are embedded once
+            unique = {}
+            for i in missing:
+                unique.setdefault(keys[i], texts[i])
+            fresh = np.asarray(self.model.embed_documents(list(unique.values())), dtype=np.float32)
+            self.cache.append(list(unique), fresh)
+            rows = self.cache.lookup(keys)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return self.cache.get(rows)
+
+    def embed_documents(self, texts):
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
@@ -0,0 +1,203 @@
+"""
+Concurrent page fetcher for the data.gov.in resource API
+- Pooled HTTP session shared by a bounded set of worker threads
+- Adaptive token-bucket rate limiter (backs off on 429/5xx, speeds up on success)
+- Per-page retries with exponential backoff and jitter
+- Pages are yielded back in offset order
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_ROOT = "https://api.data.gov.in/resource"
+
+# Status codes that mean "slow down / try again" rather than "this request is wrong"
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """Raised when a page could not be fetched after all retries"""
+
+    def __init__(self, offset, message):
+        super().__init__(f"offset {offset}: {message}")
+        self.offset = offset
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate adapts to how the API is responding
+
+    Every success nudges the rate up (additive increase), every 429/5xx
+    halves it (multiplicative decrease). A Retry-After header pauses the
+    whole bucket so that all workers back off together.
+    """
+
+    def __init__(self, rate=8.0, min_rate=0.5, max_rate=64.0, burst=None, step=0.25):
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.burst = float(burst) if burst else max(1.0, self.rate)
+        self.step = float(step)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Block until a request slot is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+            self.burst = max(self.burst, self.rate)
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2.0)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+
+def make_session(pool_size=8):
+    """requests.Session with a connection pool large enough for every worker"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def fetch_page(session, limiter, url, params, offset, limit,
+               retries=5, backoff=0.5, max_backoff=30.0, timeout=30):
+    """Fetch one page of records, retrying transient failures with jittered backoff
+
+    Returns the response JSON. Raises FetchError once retries are exhausted
+    or on a non-retryable HTTP status.
+    """
+    page_params = dict(params, offset=offset, limit=limit)
+    last_error = None
+
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            response = session.get(url, params=page_params, timeout=timeout)
+        except requests.RequestException as e:
+            last_error = str(e)
+            limiter.on_throttle()
+        else:
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                except ValueError:
+                    last_error = "response is not valid JSON"
+                else:
+                    limiter.on_success()
+                    return data
+            elif response.status_code in RETRYABLE_STATUS:
+                last_error = f"HTTP {response.status_code}"
+                limiter.on_throttle(_retry_after(response))
+            else:
+                raise FetchError(offset, f"HTTP {response.status_code}")
+
+        if attempt < retries:
+            # Full jitter: spread retries out so workers don't stampede together
+            time.sleep(random.uniform(0, min(max_backoff, backoff * (2 ** attempt))))
+
+    raise FetchError(offset, last_error or "unknown error")
+
+
+def fetch_pages(resource_id, api_key, limit, page_size=100, workers=8,
+                start_offset=0, limiter=None, session=None, base_url=API_ROOT):
+    """Yield (offset, records) for every page in [start_offset, limit), in offset order
+
+    At most ``workers * 2`` page requests are queued at once. Fetching stops
+    at the first empty page or at the API's reported total. A page that comes
+    back shorter than requested (the API may cap page sizes, e.g. 10 rows for
+    the sample key) is completed with follow-up requests before the next one
+    is yielded. A FetchError for a page is raised from the generator once all
+    earlier pages have been yielded.
+    """
+    url = f"{base_url}/{resource_id}"
+    params = {"api-key": api_key, "format": "json"}
+    limiter = limiter or AdaptiveRateLimiter()
+    own_session = session is None
+    session = session or make_session(workers)
+
+    offsets = iter(range(start_offset, limit, page_size))
+    pending = deque()
+    max_in_flight = workers * 2
+    end = limit
+
+    def read(data):
+        # The API reports its total row count; don't queue pages past it
+        nonlocal end
+        total = str(data.get("total", ""))
+        if total.isdigit():
+            end = min(end, int(total))
+        return data.get("records") or []
+
+    def submit(pool):
+        offset = next(offsets, None)
+        if offset is None or offset >= end:
+            return False
+        size = min(page_size, end - offset)
+        pending.append((offset, size, pool.submit(
+            fetch_page, session, limiter, url, params, offset, size)))
+        return True
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while len(pending) < max_in_flight and submit(pool):
+            pass
+
+        while pending:
+            offset, size, future = pending.popleft()
+            records = read(future.result())
+            if not records:
+                break
+            yield offset, records
+
+            # A short page is not the end of the data: fetch the rest of its range
+            got = len(records)
+            while got < size and offset + got < end:
+                records = read(fetch_page(session, limiter, url, params, offset + got, size - got))
+                if not records:
+                    return
+                yield offset + got, records
+                got += len(records)
+            submit(pool)
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=True, cancel_futures=True)
+        if own_session:
+            session.close()
@@ -0,0 +1,31 @@
+"""
+Non-blocking cross-process file locks (flock on POSIX, msvcrt on Windows)
+- try_lock(f) takes an exclusive lock on an open file, or returns False at once
+- unlock(f) releases it
+- Used by the first-run bootstrap and by the shared-memory generation mirror
+"""
+try:
+    import fcntl
+
+    def try_lock(f):
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def unlock(f):
+        fcntl.flock(f, fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def try_lock(f):
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def unlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
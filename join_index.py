@@ -0,0 +1,196 @@
+"""
+Crop x rainfall join: crop output next to the rainfall of its IMD subdivision
+- Districts and states are mapped to meteorological subdivisions: districts
+  of states split across subdivisions by the table below, every other
+  district by its state; a region spanning several subdivisions gets their
+  mean
+- Seasonal totals per subdivision-year (Jun-Sep monsoon, Oct-Dec, annual)
+  and their departure from the subdivision's long-period average, taken
+  from climatology.py so both use the same base (SAMARTH_LPA_YEARS)
+- Materialized at build time as two tables beside the rollups (district x
+  crop x year and state x crop x year, with production, area and yield);
+  RollupStore indexes them like any rollup, so a question about a crop and
+  rainfall is answered by one key lookup instead of extra vector searches
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import storage
+from metadata_index import normalize
+from rollups import ROLLUPS_DIR
+
+RAINFALL_DATA = "processed_data/rainfall_data_cleaned.parquet"
+
+# Join table -> (crop rollup it extends, key columns); order is the order tried when answering
+JOINS = {
+    'crop_rainfall_state': ('state_crop_year', ['state_name', 'crop', 'crop_year']),
+    'crop_rainfall_district': ('district_crop_year', ['state_name', 'district_name', 'crop', 'crop_year']),
+}
+
+SEASONS = {
+    'jjas': ['jun', 'jul', 'aug', 'sep'],       # southwest monsoon (kharif)
+    'ond': ['oct', 'nov', 'dec'],               # northeast monsoon / post-monsoon (rabi sowing)
+}
+
+RAINFALL_COLUMNS = ['jjas_mm', 'jjas_departure_pct', 'ond_mm', 'ond_departure_pct',
+                    'annual_mm', 'annual_departure_pct']
+
+# State -> IMD subdivisions covering it (names as in the IMD rainfall table)
+STATE_SUBDIVISIONS = {
+    'andaman and nicobar islands': ['ANDAMAN & NICOBAR ISLANDS'],
+    # Undivided before 2014, so Telangana is part of it in most years on record
+    'andhra pradesh': ['COASTAL ANDHRA PRADESH', 'RAYALSEEMA', 'TELANGANA'],
+    'arunachal pradesh': ['ARUNACHAL PRADESH'],
+    'assam': ['ASSAM & MEGHALAYA'],
+    'bihar': ['BIHAR'],
+    'chandigarh': ['HARYANA DELHI & CHANDIGARH'],
+    'chhattisgarh': ['CHHATTISGARH'],
+    'dadra and nagar haveli': ['GUJARAT REGION'],
+    'daman and diu': ['GUJARAT REGION'],
+    'delhi': ['HARYANA DELHI & CHANDIGARH'],
+    'goa': ['KONKAN & GOA'],
+    'gujarat': ['GUJARAT REGION', 'SAURASHTRA & KUTCH'],
+    'haryana': ['HARYANA DELHI & CHANDIGARH'],
+    'himachal pradesh': ['HIMACHAL PRADESH'],
+    'jammu and kashmir': ['JAMMU & KASHMIR'],
+    'jharkhand': ['JHARKHAND'],
+    'karnataka': ['COASTAL KARNATAKA', 'NORTH INTERIOR KARNATAKA', 'SOUTH INTERIOR KARNATAKA'],
+    'kerala': ['KERALA'],
+    'lakshadweep': ['LAKSHADWEEP'],
+    'madhya pradesh': ['WEST MADHYA PRADESH', 'EAST MADHYA PRADESH'],
+    'maharashtra': ['KONKAN & GOA', 'MADHYA MAHARASHTRA', 'MATATHWADA', 'VIDARBHA'],
+    'manipur': ['NAGA MANI MIZO TRIPURA'],
+    'meghalaya': ['ASSAM & MEGHALAYA'],
+    'mizoram': ['NAGA MANI MIZO TRIPURA'],
+    'nagaland': ['NAGA MANI MIZO TRIPURA'],
+    'odisha': ['ORISSA'],
+    'orissa': ['ORISSA'],
+    'puducherry': ['TAMIL NADU'],
+    'punjab': ['PUNJAB'],
+    'rajasthan': ['WEST RAJASTHAN', 'EAST RAJASTHAN'],
+    'sikkim': ['SUB HIMALAYAN WEST BENGAL & SIKKIM'],
+    'tamil nadu': ['TAMIL NADU'],
+    'telangana': ['TELANGANA'],
+    'tripura': ['NAGA MANI MIZO TRIPURA'],
+    'uttar pradesh': ['EAST UTTAR PRADESH', 'WEST UTTAR PRADESH'],
+    'uttarakhand': ['UTTARAKHAND'],
+    'west bengal': ['GANGETIC WEST BENGAL', 'SUB HIMALAYAN WEST BENGAL & SIKKIM'],
+}
+
+# Districts of split states, by subdivision (district names as in the crop dataset)
+SUBDIVISION_DISTRICTS = {
+    'COASTAL ANDHRA PRADESH': ['SRIKAKULAM', 'VIZIANAGARAM', 'VISAKHAPATANAM', 'EAST GODAVARI', 'WEST GODAVARI',
+                               'KRISHNA', 'GUNTUR', 'PRAKASAM', 'SPSR NELLORE'],
+    'RAYALSEEMA': ['ANANTAPUR', 'CHITTOOR', 'KADAPA', 'KURNOOL'],
+    # Telangana districts appear under Andhra Pradesh before 2014
+    'TELANGANA': ['ADILABAD', 'HYDERABAD', 'KARIMNAGAR', 'KHAMMAM', 'MAHBUBNAGAR', 'MEDAK', 'NALGONDA',
+                  'NIZAMABAD', 'RANGAREDDI', 'WARANGAL'],
+    'COASTAL KARNATAKA': ['DAKSHIN KANNAD', 'UDUPI', 'UTTAR KANNAD'],
+    'NORTH INTERIOR KARNATAKA': ['BAGALKOT', 'BELGAUM', 'BELLARY', 'BIDAR', 'BIJAPUR', 'DHARWAD', 'GADAG',
+                                 'GULBARGA', 'HAVERI', 'KOPPAL', 'RAICHUR', 'YADGIR'],
+    'SOUTH INTERIOR KARNATAKA': ['BANGALORE RURAL', 'BENGALURU URBAN', 'CHAMARAJANAGAR', 'CHIKBALLAPUR',
+                                 'CHIKMAGALUR', 'CHITRADURGA', 'DAVANGERE', 'HASSAN', 'KODAGU', 'KOLAR',
+                                 'MANDYA', 'MYSORE', 'RAMANAGARA', 'SHIMOGA', 'TUMKUR'],
+    'GUJARAT REGION': ['AHMADABAD', 'ANAND', 'BANAS KANTHA', 'BHARUCH', 'DANG', 'DOHAD', 'GANDHINAGAR',
+                       'KHEDA', 'MAHESANA', 'NARMADA', 'NAVSARI', 'PANCH MAHALS', 'PATAN', 'SABAR KANTHA',
+                       'SURAT', 'TAPI', 'VADODARA', 'VALSAD'],
+    'SAURASHTRA & KUTCH': ['AMRELI', 'BHAVNAGAR', 'JAMNAGAR', 'JUNAGADH', 'KACHCHH', 'PORBANDAR', 'RAJKOT',
+                           'SURENDRANAGAR'],
+    'KONKAN & GOA': ['MUMBAI', 'MUMBAI SUBURBAN', 'PALGHAR', 'RAIGAD', 'RATNAGIRI', 'SINDHUDURG', 'THANE'],
+    'MADHYA MAHARASHTRA': ['AHMEDNAGAR', 'DHULE', 'JALGAON', 'KOLHAPUR', 'NANDURBAR', 'NASHIK', 'PUNE',
+                           'SANGLI', 'SATARA', 'SOLAPUR'],
+    'MATATHWADA': ['AURANGABAD', 'BEED', 'HINGOLI', 'JALNA', 'LATUR', 'NANDED', 'OSMANABAD', 'PARBHANI'],
+    'VIDARBHA': ['AKOLA', 'AMRAVATI', 'BHANDARA', 'BULDHANA', 'CHANDRAPUR', 'GADCHIROLI', 'GONDIA', 'NAGPUR',
+                 'WARDHA', 'WASHIM', 'YAVATMAL'],
+    'WEST RAJASTHAN': ['BARMER', 'BIKANER', 'CHURU', 'GANGANAGAR', 'HANUMANGARH', 'JAISALMER', 'JALORE',
+                       'JODHPUR', 'NAGAUR', 'PALI'],
+    'EAST RAJASTHAN': ['AJMER', 'ALWAR', 'BANSWARA', 'BARAN', 'BHARATPUR', 'BHILWARA', 'BUNDI', 'CHITTORGARH',
+                       'DAUSA', 'DHOLPUR', 'DUNGARPUR', 'JAIPUR', 'JHALAWAR', 'JHUNJHUNU', 'KARAULI', 'KOTA',
+                       'PRATAPGARH', 'RAJSAMAND', 'SAWAI MADHOPUR', 'SIKAR', 'TONK', 'UDAIPUR'],
+    'SUB HIMALAYAN WEST BENGAL & SIKKIM': ['COOCHBEHAR', 'DARJEELING', 'DINAJPUR DAKSHIN', 'DINAJPUR UTTAR',
+                                           'JALPAIGURI', 'MALDAH'],
+    'GANGETIC WEST BENGAL': ['24 PARAGANAS NORTH', '24 PARAGANAS SOUTH', 'BANKURA', 'BIRBHUM', 'BURDWAN',
+                             'HOOGHLY', 'HOWRAH', 'KOLKATA', 'MEDINIPUR EAST', 'MEDINIPUR WEST', 'MURSHIDABAD',
+                             'NADIA', 'PURULIA'],
+}
+
+DISTRICT_SUBDIVISION = {normalize(district): subdivision
+                        for subdivision, districts in SUBDIVISION_DISTRICTS.items() for district in districts}
+
+
+def subdivisions_for(state, district=None):
+    """IMD subdivisions for a state, or for one of its districts (empty if unknown)"""
+    subdivisions = STATE_SUBDIVISIONS.get(normalize(state), [])
+    if district is not None:
+        # Only within the district's own state: Aurangabad is in Bihar as well as Maharashtra
+        subdivision = DISTRICT_SUBDIVISION.get(normalize(district))
+        if subdivision in subdivisions:
+            return [subdivision]
+    return subdivisions
+
+
+def seasonal_rainfall(src=RAINFALL_DATA, lpa_years=None):
+    """Subdivision x year seasonal totals (mm) and departures from the long-period average (%)
+
+    Read off the climatology arrays, so the departures match the climatology
+    answers for the same LPA base (``lpa_years``, default SAMARTH_LPA_YEARS).
+    """
+    import climatology
+    meta, arrays = climatology.compute_climatology(
+        src, climatology.LPA_YEARS if lpa_years is None else lpa_years)
+    years = np.arange(meta['first_year'], meta['last_year'] + 1)
+    out = pd.DataFrame({'subdivision': np.repeat(meta['subdivisions'], len(years)),
+                        'year': np.tile(years, len(meta['subdivisions']))})
+    for season in list(SEASONS) + ['annual']:
+        p = meta['periods'].index(season)
+        out[f"{season}_mm"] = arrays['totals'][:, :, p].ravel().astype(np.float64)
+        out[f"{season}_departure_pct"] = arrays['departure'][:, :, p].ravel().astype(np.float64)
+    # The arrays span every year for every subdivision; keep the subdivision-years on record
+    return out.dropna(subset=[f"{season}_mm" for season in list(SEASONS) + ['annual']], how='all')
+
+
+def _region_rainfall(regions, rainfall):
+    """Mean seasonal rainfall over each region's subdivisions, per region and year
+
+    ``regions`` has the region key columns plus 'subdivisions' (a list per row).
+    """
+    keys = [c for c in regions.columns if c != 'subdivisions']
+    pairs = regions.explode('subdivisions').dropna(subset=['subdivisions'])
+    pairs = pairs.rename(columns={'subdivisions': 'subdivision'})
+    joined = pairs.merge(rainfall, on='subdivision')
+    return joined.groupby(keys + ['year'], as_index=False, observed=True)[RAINFALL_COLUMNS].mean()
+
+
+def build_join_tables(rollups_dir=ROLLUPS_DIR, rainfall_src=RAINFALL_DATA, out_dir=ROLLUPS_DIR, lpa_years=None):
+    """Write every join table from the crop rollups and the cleaned rainfall; returns {name: rows}"""
+    rainfall = seasonal_rainfall(rainfall_src, lpa_years)
+    written = {}
+    for name, (rollup, keys) in JOINS.items():
+        path = os.path.join(rollups_dir, f"{rollup}.parquet")
+        if not os.path.exists(path):
+            continue
+        crops = storage.load_table(path)
+        region_keys = keys[:-2]               # without crop and year
+        regions = crops[region_keys].drop_duplicates().astype(str)
+        regions['subdivisions'] = [
+            subdivisions_for(row[0], row[1] if len(row) > 1 else None)
+            for row in regions.itertuples(index=False)
+        ]
+        climate = _region_rainfall(regions, rainfall).rename(columns={'year': 'crop_year'})
+
+        table = crops.astype({c: str for c in region_keys}).merge(regions, on=region_keys, how='left')
+        table['subdivisions'] = table['subdivisions'].map(lambda names: ", ".join(names) if names else "")
+        table = table.merge(climate.astype({'crop_year': table['crop_year'].dtype}),
+                            on=region_keys + ['crop_year'], how='left')
+        table = table.astype({c: 'category' for c in keys[:-1]})
+        table = table.sort_values(keys, kind='stable', ignore_index=True)
+        storage.save_table(table, os.path.join(out_dir, f"{name}.parquet"))
+        written[name] = len(table)
+    return written
+
+
+if __name__ == "__main__":
+    for name, rows in build_join_tables().items():
+        print(f"✅ {name}: {rows:,} rows")
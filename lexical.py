@@ -0,0 +1,169 @@
+"""
+BM25 inverted index over document text and metadata
+- Built alongside the FAISS index and saved with each generation
+- Postings are compact CSR arrays (term offsets, int32 doc positions,
+  uint16 term frequencies), memory-mapped at load
+- Scoring is vectorized per query term; terms present in most documents
+  (the page template: 'production', 'hectares'...) are skipped
+- exact_matches() finds the few rows that contain every informative query
+  term, so retrieval can skip the embedding call for questions like
+  'rice in GUNTUR in 2004'
+"""
+import json
+import math
+import os
+from array import array
+from collections import Counter
+from itertools import islice
+
+import numpy as np
+
+from metadata_index import normalize
+
+LEXICAL_DIR = "lexical"
+
+K1 = 1.2
+B = 0.75
+
+# Terms in more than this share of documents carry no signal (template words)
+MAX_DF_FRACTION = 0.5
+
+# Terms in less than this share of documents identify rows (names, years)
+INFORMATIVE_DF_FRACTION = 0.1
+
+
+def tokenize(text):
+    return normalize(text).split()
+
+
+def document_tokens(doc):
+    """Page text plus metadata values, so names count once more than template words"""
+    return tokenize(doc.page_content) + tokenize(" ".join(str(v) for v in doc.metadata.values()))
+
+
+class LexicalIndex:
+    def __init__(self, vocab, offsets, docs, tf, norms):
+        self.vocab = vocab                    # term -> term id
+        self.offsets = offsets                # int64[n_terms + 1]
+        self.docs = docs                      # int32 positions, grouped by term
+        self.tf = tf                          # uint16 term frequencies, same order
+        self.norms = norms                    # float32 per position: K1 * (1 - B + B * len / avg_len)
+        self.size = len(norms)
+
+    @classmethod
+    def build(cls, documents, batch_size=50_000):
+        """Index an iterable (or iterator) of Documents, in vector-position order
+
+        Postings are gathered per batch of ``batch_size`` documents into compact
+        arrays, so neither the documents nor per-posting Python objects are held
+        for the whole corpus.
+        """
+        documents = iter(documents)
+        vocab = {}
+        # (term ids, doc positions, term frequencies) per batch; starts with an empty one
+        batches = [(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.uint16))]
+        lengths = []
+        while True:
+            batch = list(islice(documents, batch_size))
+            if not batch:
+                break
+            term_ids, doc_ids, tfs = array('i'), array('i'), array('H')
+            for position, doc in enumerate(batch, start=len(lengths)):
+                counts = Counter(document_tokens(doc))
+                for term, tf in counts.items():
+                    term_ids.append(vocab.setdefault(term, len(vocab)))
+                    doc_ids.append(position)
+                    tfs.append(min(tf, 65535))
+                lengths.append(sum(counts.values()))
+            batches.append((np.frombuffer(term_ids, dtype=np.int32), np.frombuffer(doc_ids, dtype=np.int32),
+                            np.frombuffer(tfs, dtype=np.uint16)))
+
+        term_ids, doc_ids, tfs = (np.concatenate(parts) for parts in zip(*batches))
+        del batches
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=offsets[1:])
+        order = np.argsort(term_ids, kind='stable')   # keeps positions sorted within each term
+        del term_ids
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avg = float(lengths.mean()) if len(lengths) else 1.0
+        norms = (K1 * (1 - B + B * lengths / avg)).astype(np.float32)
+        return cls(vocab, offsets, doc_ids[order], tfs[order], norms)
+
+    def save(self, path):
+        root = os.path.join(path, LEXICAL_DIR)
+        os.makedirs(root, exist_ok=True)
+        for name in ('offsets', 'docs', 'tf', 'norms'):
+            np.save(os.path.join(root, f"{name}.npy"), getattr(self, name))
+        terms = sorted(self.vocab, key=self.vocab.get)
+        with open(os.path.join(root, "vocab.json"), "w") as f:
+            json.dump(terms, f)
+
+    @classmethod
+    def load(cls, path):
+        """Index saved with generation ``path`` (arrays memory-mapped), or None if it has none"""
+        root = os.path.join(path, LEXICAL_DIR)
+        if not os.path.exists(os.path.join(root, "vocab.json")):
+            return None
+        with open(os.path.join(root, "vocab.json")) as f:
+            vocab = {term: i for i, term in enumerate(json.load(f))}
+        arrays = [np.load(os.path.join(root, f"{name}.npy"), mmap_mode='r')
+                  for name in ('offsets', 'docs', 'tf', 'norms')]
+        return cls(vocab, *arrays)
+
+    def _postings(self, term):
+        t = self.vocab.get(term)
+        if t is None:
+            return None
+        lo, hi = self.offsets[t], self.offsets[t + 1]
+        return self.docs[lo:hi], self.tf[lo:hi]
+
+    def _terms(self, question, max_df):
+        for term in dict.fromkeys(tokenize(question)):
+            postings = self._postings(term)
+            if postings is not None and len(postings[0]) <= max_df * self.size:
+                yield term, postings
+
+    def search(self, question, k, positions=None):
+        """Top-``k`` vector positions by BM25 score (optionally only among ``positions``)"""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for _, (docs, tf) in self._terms(question, MAX_DF_FRACTION):
+            df = len(docs)
+            idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            tf = tf.astype(np.float32)
+            scores[docs] += idf * tf * (K1 + 1) / (tf + self.norms[docs])
+
+        if positions is not None:
+            positions = np.asarray(positions, dtype=np.int64)
+            subset = scores[positions]
+            top = np.argsort(-subset, kind='stable')[:k]
+            return [int(positions[i]) for i in top if subset[i] > 0]
+        k = min(k, self.size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < self.size else np.arange(self.size)
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [int(i) for i in top if scores[i] > 0]
+
+    def exact_matches(self, question, k):
+        """Positions containing every informative query term, if there are 1..k of them; else None
+
+        Needs at least two informative terms (e.g. a district and a year), so a
+        bare 'rice' or 'Bihar' never short-circuits retrieval.
+        """
+        matched = None
+        terms = 0
+        for _, (docs, _) in self._terms(question, INFORMATIVE_DF_FRACTION):
+            terms += 1
+            matched = docs if matched is None else np.intersect1d(matched, docs, assume_unique=True)
+            if not len(matched):
+                return None
+        if terms < 2 or matched is None or not 1 <= len(matched) <= k:
+            return None
+        return [int(i) for i in matched]
+
+
+def reciprocal_rank_fusion(rankings, k, c=60):
+    """Merge ranked position lists: score = sum of 1 / (c + rank) over the lists"""
+    scores = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (c + rank + 1)
+    return sorted(scores, key=lambda p: -scores[p])[:k]
@@ -0,0 +1,92 @@
+"""
+Pluggable LLM backends for answer generation
+- Every backend streams: stream(prompt) yields text chunks as they arrive
+- GeminiBackend creates its model client once and reuses it across turns
+- StubBackend answers locally with configurable delays, so time-to-first-token
+  and total latency of the answer path can be measured offline (an optional
+  per-prompt-token delay stands in for the model reading a longer prompt)
+- LLM_PROVIDER (from .env) picks the backend: gemini (default) or stub
+"""
+import os
+import re
+import time
+
+import tracing
+
+GEMINI_MODEL = 'models/gemini-2.5-flash'
+
+
+class LLMBackend:
+    name = 'base'
+
+    def stream(self, prompt):
+        """Yield the answer to ``prompt`` as text chunks"""
+        raise NotImplementedError
+
+    def generate(self, prompt):
+        return "".join(self.stream(prompt))
+
+
+class GeminiBackend(LLMBackend):
+    name = 'gemini'
+
+    def __init__(self, model_name=GEMINI_MODEL, api_key=None):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key or os.getenv('GOOGLE_API_KEY'))
+        self.model = genai.GenerativeModel(model_name)
+
+    def stream(self, prompt):
+        response = self.model.generate_content(prompt, stream=True)
+        for chunk in response:
+            # Chunks with no candidates (e.g. safety/finish markers) carry no text
+            if chunk.parts:
+                yield chunk.text
+        # Token counts arrive with the last chunk (older SDKs do not report them)
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            tracing.annotate(prompt_tokens=getattr(usage, 'prompt_token_count', None),
+                             output_tokens=getattr(usage, 'candidates_token_count', None))
+
+
+class StubBackend(LLMBackend):
+    """Offline stand-in: echoes the question and the prompt's data block, word by word"""
+    name = 'stub'
+
+    def __init__(self, first_token_delay=None, token_delay=None, prompt_token_delay=None):
+        self.first_token_delay = float(os.getenv('SAMARTH_STUB_FIRST_TOKEN_S', '0.3')
+                                       if first_token_delay is None else first_token_delay)
+        self.token_delay = float(os.getenv('SAMARTH_STUB_TOKEN_S', '0.01')
+                                 if token_delay is None else token_delay)
+        self.prompt_token_delay = float(os.getenv('SAMARTH_STUB_PROMPT_TOKEN_S', '0')
+                                        if prompt_token_delay is None else prompt_token_delay)
+
+        # Every data-block header the answer path's templates use (qa.CONTEXT_HEADERS)
+        from qa import CONTEXT_HEADERS
+        self.context_pattern = re.compile(
+            rf"^(?:{'|'.join(re.escape(header) for header in CONTEXT_HEADERS)}):\n(.*?)^Question:",
+            re.MULTILINE | re.DOTALL)
+
+    def stream(self, prompt):
+        question = re.search(r"^Question: (.*)$", prompt, re.MULTILINE)
+        context = self.context_pattern.search(prompt)
+        lines = [line for line in (context.group(1) if context else "").splitlines() if line.strip()]
+        answer = (f"[stub] Answer to: {question.group(1) if question else 'question'}\n\n"
+                  + "\n".join(lines[:20]))
+        time.sleep(self.first_token_delay + self.prompt_token_delay * tracing.estimate_tokens(prompt))
+        for word in re.findall(r"\S+\s*", answer):
+            yield word
+            time.sleep(self.token_delay)
+
+
+BACKENDS = {
+    'gemini': GeminiBackend,
+    'stub': StubBackend,
+}
+
+
+def get_backend(name=None, **kwargs):
+    """Backend named by ``name`` or LLM_PROVIDER (default gemini)"""
+    name = (name or os.getenv('LLM_PROVIDER') or 'gemini').lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM_PROVIDER {name!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,216 @@
+"""
+Structured metadata index for entity-specific questions
+- Inverted index: metadata field -> value -> sorted array of vector positions
+- Entity extractor: finds state, district, crop, season and subdivision names
+  plus years / year ranges and rainfall periods in a question, using the
+  index's own vocabulary
+- candidates() turns extracted entities into the set of matching vector positions
+"""
+import json
+import os
+import re
+from array import array
+from collections import defaultdict
+
+import numpy as np
+
+# Metadata fields per document source (see documents.py); 'year' is shared
+SOURCE_FIELDS = {
+    'crop_production': ['state', 'district', 'crop', 'season'],
+    'rainfall': ['subdivision'],
+}
+NAME_FIELDS = ['state', 'district', 'crop', 'season', 'subdivision']
+
+# Saved with each vectorstore generation: all postings back to back + their offsets
+POSTINGS_FILE = "metadata_postings.npy"
+OFFSETS_FILE = "metadata_postings.json"
+
+# Words that point at one source when no entity names are present
+SOURCE_KEYWORDS = {
+    'rainfall': {'rain', 'rainfall', 'rains', 'monsoon', 'precipitation', 'climate', 'wettest', 'driest'},
+}
+
+# Rainfall periods (see climatology.PERIODS), tried in order on normalized text and
+# removed once matched, so 'post monsoon' is not also read as 'monsoon'
+PERIOD_PATTERNS = [
+    ('ond', re.compile(r"\b(?:post monsoon|north ?east monsoon|retreating monsoon|oct(?:ober)? (?:to )?dec(?:ember)?)\b")),
+    ('mam', re.compile(r"\b(?:pre monsoon|mar(?:ch)? (?:to )?may)\b")),
+    ('jf', re.compile(r"\b(?:winter|jan(?:uary)? (?:to |and )?feb(?:ruary)?)\b")),
+    ('jjas', re.compile(r"\b(?:monsoon|jjas|jun(?:e)? (?:to )?sep(?:tember)?)\b")),
+    ('annual', re.compile(r"\b(?:annual|annually|yearly)\b")),
+]
+
+YEAR = r"(1[89]\d\d|20\d\d)"
+YEAR_RANGE_PATTERNS = [
+    re.compile(rf"\b(?:from|between)\s+{YEAR}\s+(?:to|and|till|until|-)\s+{YEAR}\b"),
+    re.compile(rf"\b{YEAR}\s*(?:-|–|to)\s*{YEAR}\b"),
+]
+YEAR_SINCE_PATTERN = re.compile(rf"\b(?:since|after|from)\s+{YEAR}\b")
+YEAR_PATTERN = re.compile(rf"\b{YEAR}\b")
+
+
+def normalize(text):
+    """Lowercase, punctuation to spaces, collapse whitespace ('Arhar/Tur' -> 'arhar tur')"""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(text).lower()).split())
+
+
+class MetadataIndex:
+    """Inverted index over document metadata, addressed by FAISS vector position"""
+
+    def __init__(self, postings, size):
+        self.postings = postings          # field -> normalized value -> np.ndarray[int64]
+        self.size = size
+        self.years = sorted(int(y) for y in postings.get('year', {}) if y.isdigit())
+        self._build_vocabulary()
+
+    @classmethod
+    def from_metadatas(cls, metadatas):
+        """Build from an iterable of metadata dicts, in vector-position order"""
+        # Positions go straight into int64 arrays, not lists of Python ints
+        lists = defaultdict(lambda: defaultdict(lambda: array('q')))
+        size = 0
+        for position, metadata in enumerate(metadatas):
+            for field, value in metadata.items():
+                # Names are matched against normalized question text; source/year stay as stored
+                lists[field][normalize(value) if field in NAME_FIELDS else str(value)].append(position)
+            size = position + 1
+        postings = {
+            field: {value: np.frombuffer(rows, dtype=np.int64) for value, rows in values.items()}
+            for field, values in lists.items()
+        }
+        return cls(postings, size)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        if hasattr(vectorstore.docstore, 'iter_metadatas'):
+            return cls.from_metadatas(vectorstore.docstore.iter_metadatas())
+        ids = vectorstore.index_to_docstore_id
+        return cls.from_metadatas(
+            vectorstore.docstore.search(ids[i]).metadata for i in range(len(ids))
+        )
+
+    def save(self, path):
+        """Write the postings next to a vectorstore generation in ``path``"""
+        offsets, arrays, start = {}, [], 0
+        for field, values in self.postings.items():
+            offsets[field] = {}
+            for value, rows in values.items():
+                offsets[field][value] = [start, len(rows)]
+                arrays.append(rows)
+                start += len(rows)
+        np.save(os.path.join(path, POSTINGS_FILE),
+                np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64))
+        with open(os.path.join(path, OFFSETS_FILE), "w") as f:
+            json.dump({'size': self.size, 'offsets': offsets}, f)
+
+    @classmethod
+    def load(cls, path):
+        """Index saved by save(); postings stay memory-mapped. None if the generation has none"""
+        if not os.path.exists(os.path.join(path, OFFSETS_FILE)):
+            return None
+        with open(os.path.join(path, OFFSETS_FILE)) as f:
+            saved = json.load(f)
+        flat = np.load(os.path.join(path, POSTINGS_FILE), mmap_mode='r')
+        postings = {
+            field: {value: flat[start:start + length] for value, (start, length) in values.items()}
+            for field, values in saved['offsets'].items()
+        }
+        return cls(postings, saved['size'])
+
+    def _build_vocabulary(self):
+        # phrase (tuple of tokens) -> [(field, value), ...]
+        self.phrases = defaultdict(list)
+        for field in NAME_FIELDS:
+            for value in self.postings.get(field, {}):
+                tokens = tuple(value.split())
+                if tokens and not (len(tokens) == 1 and tokens[0] in ('n', 'a', 'nan')):
+                    self.phrases[tokens].append((field, value))
+        self.max_phrase = max((len(p) for p in self.phrases), default=0)
+
+    def extract(self, question):
+        """Entities named in ``question``: {field: set(values)}, years as a set of 'YYYY' strings"""
+        text = normalize(question)
+        tokens = text.split()
+        entities = defaultdict(set)
+
+        # Tokens inside any crop name: 'other kharif pulses' names a crop, not the kharif season
+        in_crop = set()
+        for i in range(len(tokens)):
+            for n in range(1, min(self.max_phrase, len(tokens) - i) + 1):
+                if any(field == 'crop' for field, _ in self.phrases.get(tuple(tokens[i:i + n]), ())):
+                    in_crop.update(range(i, i + n))
+
+        # Greedy longest match, so 'coastal andhra pradesh' wins over 'andhra pradesh'
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self.max_phrase, len(tokens) - i), 0, -1):
+                matches = self.phrases.get(tuple(tokens[i:i + n]))
+                if matches:
+                    for field, value in matches:
+                        if field == 'season' and in_crop.issuperset(range(i, i + n)):
+                            continue
+                        entities[field].add(value)
+                    i += n
+                    break
+            else:
+                i += 1
+
+        for source, words in SOURCE_KEYWORDS.items():
+            if words.intersection(tokens):
+                entities['source'].add(source)
+        for period, pattern in PERIOD_PATTERNS:
+            if pattern.search(text):
+                entities['period'].add(period)
+                text = pattern.sub(" ", text)
+
+        years = set()
+        lowered = question.lower()
+        for pattern in YEAR_RANGE_PATTERNS:
+            for start, end in pattern.findall(lowered):
+                lo, hi = sorted((int(start), int(end)))
+                years.update(range(lo, hi + 1))
+            # So 'from 2010 to 2014' isn't also read as an open-ended 'from 2010'
+            lowered = pattern.sub(" ", lowered)
+        for start in YEAR_SINCE_PATTERN.findall(lowered):
+            if self.years:
+                years.update(range(int(start), self.years[-1] + 1))
+        years.update(int(y) for y in YEAR_PATTERN.findall(lowered))
+        if years:
+            entities['year'] = {str(y) for y in years}
+        return dict(entities)
+
+    def _match(self, field, values):
+        arrays = [self.postings.get(field, {}).get(v) for v in values]
+        arrays = [a for a in arrays if a is not None]
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        return arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+
+    def candidates(self, entities):
+        """Sorted vector positions matching ``entities``, or None when nothing constrains the search
+
+        Name constraints only apply to the source they belong to; a source is
+        searched if one of its own fields was named, or if no names were found
+        at all (a year-only question, or one that only says e.g. 'rainfall').
+        """
+        named = {f for f in NAME_FIELDS if entities.get(f)}
+        if not named and not entities.get('year') and not entities.get('source'):
+            return None
+
+        results = []
+        for source, fields in SOURCE_FIELDS.items():
+            if named and not named.intersection(fields):
+                continue
+            if not named and entities.get('source') and source not in entities['source']:
+                continue
+            rows = self.postings.get('source', {}).get(source)
+            if rows is None:
+                continue
+            for field in fields + ['year']:
+                if entities.get(field):
+                    rows = np.intersect1d(rows, self._match(field, entities[field]), assume_unique=True)
+            results.append(rows)
+
+        if not results:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(results))
@@ -0,0 +1,351 @@
+"""
+Pipeline runner: download -> clean -> rollups, crop x rainfall joins, climatology and index build as a DAG
+- Every stage declares the files it reads and writes, the parameters that
+  change its output and the code it runs; stages wired output -> input form
+  the DAG (crop and rainfall are separate branches until the build)
+- A stage is skipped when the content hashes of its inputs and code and its
+  parameters match its last successful run and its outputs are unchanged;
+  a stage whose upstream re-ran but wrote identical bytes is skipped too
+- Ready stages run in parallel worker processes (--jobs), each logging to
+  logs/pipeline-<stage>.log; downloads run only when their file is missing
+  or with --force download
+- File hashes are cached by (size, mtime) in .pipeline.json, so a run where
+  nothing changed reads no data and finishes in about a second
+- Prints which stages ran or were skipped and how long each took
+
+Run from the repo root:
+    python pipeline.py                       # whatever is out of date
+    python pipeline.py --dry-run             # what would run, and why
+    python pipeline.py --force clean_crop    # re-run a stage (and what its output changes)
+    python pipeline.py --index-type hnsw -j 2
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+STATE_FILE = ".pipeline.json"
+LOG_DIR = "logs"
+
+RAW_CROP = 'data/agriculture/crop_production.parquet'
+RAW_RAINFALL = 'data/climate/rainfall.parquet'
+CLEAN_CROP = 'processed_data/crop_data_cleaned.parquet'
+CLEAN_RAINFALL = 'processed_data/rainfall_data_cleaned.parquet'
+ROLLUP_TABLES = [f"rollups/{name}.parquet"
+                 for name in ('state_crop_year', 'state_season_year', 'district_crop_year')]
+JOIN_TABLES = [f"rollups/{name}.parquet" for name in ('crop_rainfall_state', 'crop_rainfall_district')]
+CLIMATOLOGY_FILES = [f"rollups/climatology/{name}" for name in
+                     ('monthly.npy', 'totals.npy', 'lpa.npy', 'departure.npy', 'rolling.npy', 'rank.npy',
+                      'order.npy', 'climatology.json')]
+VECTORSTORE_CURRENT = 'vectorstore/CURRENT'
+
+CLEAN_CODE = ['2_clean_data.py', 'storage.py']
+BUILD_CODE = ['3_build_vectorstore.py', 'documents.py', 'embedding_backends.py', 'embedding_cache.py',
+              'vector_index.py', 'docstore.py', 'lexical.py', 'metadata_index.py', 'storage.py']
+
+
+class Stage:
+    """One step of the pipeline: ``run(params)`` reads ``inputs`` and writes ``outputs``"""
+
+    def __init__(self, name, run, inputs=(), outputs=(), code=(), params=None):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+        self.params = params or (lambda options: {})
+
+
+def _download(dataset, limit):
+    def run(params):
+        step = importlib.import_module('1_download_data')
+        if not step.API_KEY or step.API_KEY == 'your_key_here':
+            raise RuntimeError("DATA_GOV_API_KEY is not set (see .env)")
+        if not step.download_dataset(step.DATASETS[dataset], dataset, limit=limit):
+            raise RuntimeError(f"No {dataset} records downloaded")
+    return run
+
+
+def _clean(function):
+    def run(params):
+        rows, _ = getattr(importlib.import_module('2_clean_data'), function)()
+        if not rows:
+            raise RuntimeError("Cleaning kept no rows")
+    return run
+
+
+def _rollups(params):
+    import rollups
+    rollups.build_rollups()
+
+
+def _joins(params):
+    import join_index
+    join_index.build_join_tables(lpa_years=params['lpa_years'])
+
+
+def _climatology(params):
+    import climatology
+    climatology.build_climatology(lpa_years=params['lpa_years'], window=params['rolling_years'])
+
+
+def _build(params):
+    step = importlib.import_module('3_build_vectorstore')
+    argv = ['3_build_vectorstore.py', '--update', '--skip-rollups']
+    for flag, value in params['index'].items():
+        if value is not None:
+            argv += [f"--{flag.replace('_', '-')}", str(value)]
+    sys.argv = argv
+    step.main()
+
+
+def _build_params(options):
+    import embedding_backends
+    return {'embeddings': embedding_backends.backend_name(),
+            'index': {'index_type': options.index_type, 'nlist': options.nlist, 'nprobe': options.nprobe,
+                      'pq_m': options.pq_m, 'hnsw_m': options.hnsw_m, 'ef_search': options.ef_search}}
+
+
+def _joins_params(options):
+    import climatology
+    return {'lpa_years': climatology.LPA_YEARS}
+
+
+def _climatology_params(options):
+    import climatology
+    return {'lpa_years': climatology.LPA_YEARS, 'rolling_years': climatology.ROLLING_YEARS}
+
+
+STAGES = [
+    Stage('download_crop', _download('crop_production', 50000), outputs=[RAW_CROP],
+          code=['1_download_data.py', 'fetcher.py', 'checkpoint.py']),
+    Stage('download_rainfall', _download('rainfall', 10000), outputs=[RAW_RAINFALL],
+          code=['1_download_data.py', 'fetcher.py', 'checkpoint.py']),
+    Stage('clean_crop', _clean('clean_crop_data'), inputs=[RAW_CROP], outputs=[CLEAN_CROP], code=CLEAN_CODE),
+    Stage('clean_rainfall', _clean('clean_rainfall_data'), inputs=[RAW_RAINFALL], outputs=[CLEAN_RAINFALL],
+          code=CLEAN_CODE),
+    Stage('rollups', _rollups, inputs=[CLEAN_CROP], outputs=ROLLUP_TABLES,
+          code=['rollups.py', 'metadata_index.py', 'storage.py']),
+    Stage('joins', _joins, inputs=ROLLUP_TABLES + [CLEAN_RAINFALL], outputs=JOIN_TABLES,
+          code=['join_index.py', 'climatology.py', 'metadata_index.py', 'storage.py'], params=_joins_params),
+    Stage('climatology', _climatology, inputs=[CLEAN_RAINFALL], outputs=CLIMATOLOGY_FILES,
+          code=['climatology.py', 'join_index.py', 'metadata_index.py', 'storage.py'],
+          params=_climatology_params),
+    # After the rollups, joins and climatology, so CURRENT never switches before the tables it is served with
+    Stage('build', _build, inputs=[CLEAN_CROP, CLEAN_RAINFALL] + ROLLUP_TABLES + JOIN_TABLES + CLIMATOLOGY_FILES,
+          outputs=[VECTORSTORE_CURRENT],
+          code=BUILD_CODE, params=_build_params),
+]
+
+STAGE_NAMES = {stage.name: stage for stage in STAGES}
+
+
+def dependencies(stage):
+    """Stages whose outputs ``stage`` reads"""
+    return [other.name for other in STAGES if set(other.outputs) & set(stage.inputs)]
+
+
+class FileHashes:
+    """SHA-256 of files and directories, re-read only when size or mtime changed"""
+
+    def __init__(self, cache):
+        self.cache = cache               # path -> [size, mtime_ns, sha256]
+
+    def file(self, path):
+        stat = os.stat(path)
+        cached = self.cache.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.cache[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def path(self, path):
+        """Hash of a file, of a directory's files and names, or None if missing"""
+        if os.path.isfile(path):
+            return self.file(path)
+        if not os.path.isdir(path):
+            return None
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode() + b'\0' + self.file(full).encode())
+        return digest.hexdigest()
+
+
+def fingerprint(stage, hashes, params):
+    """Hash of everything that determines the stage's output"""
+    record = {
+        'inputs': {path: hashes.path(path) for path in stage.inputs},
+        'code': {path: hashes.path(os.path.join(ROOT, path)) for path in stage.code},
+        'params': params,
+    }
+    return hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'stages': {}, 'files': {}}
+
+
+def save_state(state, path=STATE_FILE):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def reason_to_run(stage, state, hashes, params, force):
+    """Why ``stage`` has to run, or None if its last run is still valid"""
+    if stage.name in force:
+        return "forced"
+    outputs = {path: hashes.path(path) for path in stage.outputs}
+    missing = [path for path, digest in outputs.items() if digest is None]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    last = state['stages'].get(stage.name)
+    if not stage.inputs:
+        # Sources (downloads) are refreshed only on request; adopt what is on disk
+        return None
+    if last is None:
+        return "never ran"
+    if last['fingerprint'] != fingerprint(stage, hashes, params):
+        return "inputs, code or parameters changed"
+    if last['outputs'] != outputs:
+        return "outputs changed since its last run"
+    return None
+
+
+def execute(name, params, log_path):
+    """Worker process: run one stage with its output going to ``log_path``"""
+    start = time.perf_counter()
+    with open(log_path, 'w') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            STAGE_NAMES[name].run(params)
+        except BaseException:
+            traceback.print_exc()
+            return False, time.perf_counter() - start
+    return True, time.perf_counter() - start
+
+
+def run_pipeline(options):
+    state = load_state()
+    hashes = FileHashes(state.setdefault('files', {}))
+    force = set(STAGE_NAMES) if options.force == 'all' else set(filter(None, (options.force or '').split(',')))
+    if 'download' in force:
+        force = (force - {'download'}) | {'download_crop', 'download_rainfall'}
+    unknown = force - set(STAGE_NAMES)
+    if unknown:
+        raise SystemExit(f"❌ Unknown stage(s): {', '.join(sorted(unknown))}; choose from {', '.join(STAGE_NAMES)}")
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    params = {stage.name: stage.params(options) for stage in STAGES}
+    deps = {stage.name: dependencies(stage) for stage in STAGES}
+    results = {}                             # name -> (status, seconds, detail)
+    pending = [stage.name for stage in STAGES]
+    running = {}
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=options.jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                if any(results.get(dep, ('pending',))[0] in ('failed', 'blocked') for dep in deps[name]):
+                    results[name] = ('blocked', 0.0, "an upstream stage failed")
+                    pending.remove(name)
+                    continue
+                if any(dep not in results for dep in deps[name]):
+                    continue
+                pending.remove(name)
+                stage = STAGE_NAMES[name]
+                check = time.perf_counter()
+                reason = reason_to_run(stage, state, hashes, params[name], force)
+                if reason is None:
+                    results[name] = ('skipped', time.perf_counter() - check, "up to date")
+                    print(f"⏭️  {name}: up to date")
+                elif options.dry_run:
+                    results[name] = ('would run', 0.0, reason)
+                    print(f"▶️  {name}: would run ({reason})")
+                else:
+                    print(f"▶️  {name}: running ({reason})")
+                    log_path = os.path.join(LOG_DIR, f"pipeline-{name}.log")
+                    running[pool.submit(execute, name, params[name], log_path)] = (name, reason, log_path)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, reason, log_path = running.pop(future)
+                ok, seconds = future.result()
+                stage = STAGE_NAMES[name]
+                if not ok:
+                    results[name] = ('failed', seconds, f"see {log_path}")
+                    print(f"❌ {name}: failed after {seconds:.1f}s (see {log_path})")
+                    continue
+                # Record what this run consumed and produced (hashes are re-read: files were rewritten)
+                state['stages'][name] = {
+                    'fingerprint': fingerprint(stage, hashes, params[name]),
+                    'outputs': {path: hashes.path(path) for path in stage.outputs},
+                    'params': params[name],
+                    'seconds': round(seconds, 3),
+                    'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+                }
+                save_state(state)
+                results[name] = ('ran', seconds, reason)
+                print(f"✅ {name}: done in {seconds:.1f}s")
+
+    if not options.dry_run:
+        save_state(state)
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--force', help="comma-separated stages to re-run ('download' for both, 'all')")
+    parser.add_argument('--dry-run', action='store_true', help="only report what would run")
+    parser.add_argument('-j', '--jobs', type=int, default=max(2, min(4, os.cpu_count() or 1)),
+                        help="stages run at once (default: 2-4 by CPU count)")
+    parser.add_argument('--index-type', help="passed to 3_build_vectorstore.py")
+    parser.add_argument('--nlist', type=int)
+    parser.add_argument('--nprobe', type=int)
+    parser.add_argument('--pq-m', type=int)
+    parser.add_argument('--hnsw-m', type=int)
+    parser.add_argument('--ef-search', type=int)
+    options = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    print("\n" + "="*60)
+    print("PROJECT SAMARTH - PIPELINE")
+    print("="*60)
+    results, elapsed = run_pipeline(options)
+
+    print("\n" + "="*60)
+    print(f"{'stage':<20} {'status':<10} {'seconds':>8}  detail")
+    for stage in STAGES:
+        status, seconds, detail = results.get(stage.name, ('pending', 0.0, ''))
+        print(f"{stage.name:<20} {status:<10} {seconds:>8.2f}  {detail}")
+    ran = sum(status == 'ran' for status, _, _ in results.values())
+    print(f"\n⏱️  {ran} of {len(STAGES)} stages ran, {elapsed:.1f}s total")
+    if any(status in ('failed', 'blocked') for status, _, _ in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
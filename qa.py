@@ -0,0 +1,158 @@
+"""
+Answer path shared by the Streamlit app and offline tools
+- prepare_answer(): retrieval (or a rollup / crop x rainfall / climatology
+  lookup) and prompt assembly, no LLM call
+- stream_answer(): sources first, then the LLM answer as a stream of chunks
+- get_answer(): the same, collected into one string
+- Each step is a tracing span (retrieval, rollup lookup, prompt, generation)
+"""
+import re
+
+import context_packer
+import tracing
+from join_index import JOINS
+from retrieval import retrieve
+from rollups import format_table
+
+DOCUMENT_PROMPT = """You are an intelligent assistant analyzing Indian agricultural and climate data from data.gov.in.
+
+Use the following context to answer the question accurately.
+
+IMPORTANT INSTRUCTIONS:
+- Provide specific numbers and statistics from the data
+- Always cite the source (state, district, year, subdivision) for each data point
+- If comparing regions, present data in a clear format
+- If data is unavailable, clearly state that
+- Be precise and factual
+
+Context from data.gov.in:
+{context}
+
+Question: {question}
+
+Detailed Answer with Citations:"""
+
+ROLLUP_PROMPT = """You are an intelligent assistant analyzing Indian agricultural data from data.gov.in.
+
+The table below holds exact totals computed from every matching record ({rollup}).
+
+IMPORTANT INSTRUCTIONS:
+- Use these numbers as given; do not re-derive or estimate them
+- Describe trends and comparisons across the rows where relevant
+- Always cite the state, district, crop, season and year for each figure you quote
+- Source: Ministry of Agriculture & Farmers Welfare, data.gov.in
+
+Aggregated data:
+{table}
+
+Question: {question}
+
+Detailed Answer with Citations:"""
+
+JOIN_PROMPT = """You are an intelligent assistant analyzing Indian agricultural and climate data from data.gov.in.
+
+The table below puts exact crop totals ({rollup}) next to the rainfall of the matching IMD
+meteorological subdivision(s) for the same year: Jun-Sep (southwest monsoon), Oct-Dec and annual
+totals, each with its departure from that subdivision's long-period average.
+
+IMPORTANT INSTRUCTIONS:
+- Use these numbers as given; do not re-derive or estimate them
+- Relate changes in production and yield to rainfall surpluses or deficits year by year
+- Say so when the years are too few to support a pattern; co-movement is not proof of cause
+- Always cite the state, district, crop, year and subdivision for each figure you quote
+- Sources: Ministry of Agriculture & Farmers Welfare and India Meteorological Department, data.gov.in
+
+Aggregated data:
+{table}
+
+Question: {question}
+
+Detailed Answer with Citations:"""
+
+CLIMATE_PROMPT = """You are an intelligent assistant analyzing Indian climate data from data.gov.in.
+
+The table below holds rainfall statistics precomputed from every year on record for the named IMD
+meteorological subdivision(s): seasonal totals, departures from the long-period average (LPA),
+rolling means and each year's rank (1 = wettest year on record). The "mean" and "LPA" rows
+already give the average over the years shown and the long-period normal.
+
+IMPORTANT INSTRUCTIONS:
+- Use these numbers as given; do not re-derive or estimate them
+- Answer averages, departures and wettest/driest questions from the mean, LPA and rank columns
+- Always cite the subdivision, season and years for each figure you quote
+- Source: India Meteorological Department, data.gov.in
+
+Rainfall statistics:
+{table}
+
+Question: {question}
+
+Detailed Answer with Citations:"""
+
+TEMPLATES = {name: JOIN_PROMPT for name in JOINS}
+TEMPLATES['rainfall_climatology'] = CLIMATE_PROMPT
+
+# The line introducing each prompt's data block ('Aggregated data', ...), for the stub LLM to find it
+CONTEXT_HEADERS = sorted({re.search(r"^(.*):\n\{(?:context|table)\}", template, re.MULTILINE).group(1)
+                          for template in [DOCUMENT_PROMPT, ROLLUP_PROMPT, *TEMPLATES.values()]})
+
+
+def prepare_answer(question, vectorstore, metadata_index=None, rollups=None, lexical_index=None, k=5,
+                   embed=None, context_tokens=None):
+    """(prompt, source documents, rollup table or None) for ``question``
+
+    ``embed`` overrides how the question is embedded (see retrieval.retrieve).
+    Retrieved rows are packed into a table of at most ``context_tokens``
+    (default SAMARTH_CONTEXT_TOKENS; 0 joins the top ``k`` documents verbatim).
+    """
+    budget = context_packer.CONTEXT_TOKENS if context_tokens is None else context_tokens
+    with tracing.span('answer.prepare') as s:
+        # Questions that map onto a rollup get an exact table instead of raw documents
+        if metadata_index is not None and rollups is not None:
+            with tracing.span('answer.rollup_lookup'):
+                match = rollups.lookup(metadata_index.extract(question))
+            if match is not None:
+                name, table = match
+                with tracing.span('answer.prompt'):
+                    template = TEMPLATES.get(name, ROLLUP_PROMPT)
+                    prompt = template.format(rollup=name.replace('_', ' x '),
+                                             table=format_table(table), question=question)
+                source = 'join' if name in JOINS else 'climatology' if name == 'rainfall_climatology' else 'rollup'
+                s.set(source=source, table_rows=len(table), **_prompt_size(prompt))
+                return prompt, [], table
+
+        depth = max(k, context_packer.MAX_CONTEXT_DOCS) if budget > 0 else k
+        docs = retrieve(question, vectorstore, metadata_index, lexical_index, k=depth, embed=embed)
+        with tracing.span('answer.prompt'):
+            if budget > 0:
+                # As many rows as fit the budget, as compact tables
+                context, docs = context_packer.pack(docs, budget)
+            else:
+                context = "\n\n".join([doc.page_content for doc in docs])
+            prompt = DOCUMENT_PROMPT.format(context=context, question=question)
+        s.set(source='documents', context_docs=len(docs), context_chars=len(context), **_prompt_size(prompt))
+        return prompt, docs, None
+
+
+def _prompt_size(prompt):
+    if not tracing.enabled():
+        return {}
+    return {'prompt_chars': len(prompt), 'prompt_tokens_est': tracing.estimate_tokens(prompt)}
+
+
+def stream_answer(question, vectorstore, backend, metadata_index=None, rollups=None, lexical_index=None,
+                  embed=None):
+    """(sources, table, chunks): sources are ready immediately, ``chunks`` streams the answer
+
+    ``embed`` is passed on to prepare_answer (e.g. to reuse a vector computed for the answer cache).
+    """
+    prompt, sources, table = prepare_answer(question, vectorstore, metadata_index, rollups, lexical_index,
+                                            embed=embed)
+    return sources, table, tracing.traced_stream('answer.generate', backend.stream(prompt), backend=backend.name)
+
+
+def get_answer(question, vectorstore, backend, metadata_index=None, rollups=None, lexical_index=None):
+    with tracing.span('answer'):
+        sources, table, chunks = stream_answer(question, vectorstore, backend, metadata_index, rollups,
+                                               lexical_index)
+        return "".join(chunks), sources, table
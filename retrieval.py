@@ -0,0 +1,113 @@
+"""
+Retrieval for the Q&A path
+- Entities named in the question narrow the candidate set via the metadata index
+- Few enough candidates are returned directly (no embedding call at all)
+- Otherwise only the candidate subset is scored against the question vector
+- With a BM25 index, dense and lexical rankings are merged by reciprocal-rank
+  fusion, and a handful of exact lexical matches skips the embedding call
+- Questions without recognisable entities (or matching most of the corpus)
+  fall back to a plain vector search
+"""
+import faiss
+import numpy as np
+
+import tracing
+from lexical import reciprocal_rank_fusion
+
+# Above this share of the corpus a filtered scan costs more than the ANN index itself
+MAX_SUBSET_FRACTION = 0.25
+
+# Each retriever contributes this many candidates per requested result to the fusion
+FUSION_DEPTH = 4
+
+
+def _documents(vectorstore, positions):
+    if hasattr(vectorstore.docstore, 'documents'):
+        # SQLite docstore: one query for all hits
+        return vectorstore.docstore.documents(positions)
+    ids = vectorstore.index_to_docstore_id
+    return [vectorstore.docstore.search(ids[int(i)]) for i in positions]
+
+
+def search_subset(vectorstore, query_vector, positions, k):
+    """Nearest ``k`` vector positions to ``query_vector`` among ``positions`` only"""
+    index = vectorstore.index
+    query = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+    positions = np.asarray(positions, dtype=np.int64)
+
+    if isinstance(index, faiss.IndexIVF):
+        # Compressed/clustered codes: let faiss scan every list, restricted to the subset
+        params = faiss.SearchParametersIVF(sel=faiss.IDSelectorBatch(positions), nprobe=index.nlist)
+        _, found = index.search(query, k, params=params)
+        return [int(i) for i in found[0] if i >= 0]
+
+    # Flat and HNSW-flat storage can hand back exact vectors for just the subset
+    vectors = index.reconstruct_batch(positions)
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    top = np.argsort(distances, kind="stable")[:k]
+    return positions[top].tolist()
+
+
+def search_dense(vectorstore, query_vector, k):
+    query = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+    _, found = vectorstore.index.search(query, k)
+    return [int(i) for i in found[0] if i >= 0]
+
+
+def retrieve(question, vectorstore, metadata_index=None, lexical_index=None, k=5, embed=None):
+    """Top-``k`` documents for ``question``, narrowed by named entities when possible
+
+    ``embed`` (question -> vector) replaces the vectorstore's own embed_query,
+    e.g. to batch concurrent questions into one model call; it is only called
+    when the question actually needs a vector.
+    """
+    with tracing.span('retrieve', k=k) as s:
+        path, positions = _rank(question, vectorstore, metadata_index, lexical_index, k,
+                                embed or vectorstore.embeddings.embed_query)
+        s.set(path=path, hits=len(positions))
+        with tracing.span('retrieve.documents'):
+            return _documents(vectorstore, positions)
+
+
+def _rank(question, vectorstore, metadata_index, lexical_index, k, embed):
+    """(retrieval path taken, ranked vector positions)"""
+    candidates = None
+    if metadata_index is not None:
+        with tracing.span('retrieve.entities') as s:
+            entities = metadata_index.extract(question)
+            candidates = metadata_index.candidates(entities)
+            s.set(candidates=-1 if candidates is None else len(candidates))
+        if candidates is not None and 0 < len(candidates) <= MAX_SUBSET_FRACTION * metadata_index.size:
+            if len(candidates) <= k:
+                return 'entities', candidates
+        else:
+            candidates = None
+
+    if lexical_index is None:
+        query_vector = _embed(embed, question)
+        with tracing.span('retrieve.search'):
+            if candidates is None:
+                return 'dense', search_dense(vectorstore, query_vector, k)
+            return 'subset', search_subset(vectorstore, query_vector, candidates, k)
+
+    if candidates is None:
+        with tracing.span('retrieve.exact'):
+            exact = lexical_index.exact_matches(question, k)
+        if exact is not None:
+            return 'exact', exact
+
+    depth = k * FUSION_DEPTH
+    query_vector = _embed(embed, question)
+    with tracing.span('retrieve.search'):
+        if candidates is None:
+            dense = search_dense(vectorstore, query_vector, depth)
+        else:
+            dense = search_subset(vectorstore, query_vector, candidates, depth)
+    with tracing.span('retrieve.bm25'):
+        lexical = lexical_index.search(question, depth, positions=candidates)
+    return 'hybrid', reciprocal_rank_fusion([dense, lexical], k)
+
+
+def _embed(embed, question):
+    with tracing.span('retrieve.embed'):
+        return embed(question)
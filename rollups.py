@@ -0,0 +1,244 @@
+"""
+Precomputed aggregate cubes over the cleaned crop data
+- state x crop x year, district x crop x year and state x season x year
+  rollups of total production, area and yield, built once at build time
+- Stored as small Parquet tables sorted by their key columns
+- Loaded once by the app with an in-memory index from key prefix to row range,
+  so a question that names a state/district/crop/season is answered from an
+  exact table in milliseconds instead of from 5 retrieved text rows
+- The crop x rainfall join tables (join_index.py) live and load alongside,
+  and answer questions that ask about a crop and rainfall together
+- So does the rainfall climatology (climatology.py), for rainfall questions
+  that name a subdivision or state but no crop
+"""
+import os
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+import storage
+from metadata_index import normalize
+
+ROLLUPS_DIR = "rollups"
+CROP_DATA = "processed_data/crop_data_cleaned.parquet"
+
+# Rollup name -> key columns (year last); order is the order tried when answering
+ROLLUPS = {
+    'state_crop_year': ['state_name', 'crop', 'crop_year'],
+    'state_season_year': ['state_name', 'season', 'crop_year'],
+    'district_crop_year': ['state_name', 'district_name', 'crop', 'crop_year'],
+}
+
+# Key column -> metadata/entity field name (see documents.crop_metadatas)
+ENTITY_FIELDS = {
+    'state_name': 'state',
+    'district_name': 'district',
+    'crop': 'crop',
+    'season': 'season',
+}
+
+# Larger results are left to document retrieval rather than pasted into the prompt
+MAX_TABLE_ROWS = 60
+
+
+def _asks_rainfall(entities):
+    """True for a rainfall question: a rainfall keyword, or a subdivision that is not
+    just the name of a state also named ('Bihar', 'Kerala' and 'Punjab' are both)"""
+    if 'rainfall' in entities.get('source', ()):
+        return True
+    return bool(set(entities.get('subdivision', ())) - set(entities.get('state', ())))
+
+
+def version(root=ROLLUPS_DIR):
+    """Newest modification time of the saved rollups, joins and climatology (0 if none)"""
+    return max((entry.stat().st_mtime for folder in (root, os.path.join(root, "climatology"))
+                if os.path.isdir(folder) for entry in os.scandir(folder) if entry.is_file()), default=0)
+
+
+def _aggregate(df, keys):
+    grouped = df.groupby(keys, observed=True, sort=False)
+    out = grouped[['production_', 'area_']].sum(min_count=1)
+    out['records'] = grouped['records'].sum()
+    return out.reset_index()
+
+
+def build_rollups(src=CROP_DATA, out_dir=ROLLUPS_DIR, batch_size=200_000):
+    """Stream the cleaned crop table once and write every rollup; returns {name: rows}"""
+    columns = [c for c in ['state_name', 'district_name', 'crop', 'season', 'crop_year',
+                           'area_', 'production_'] if c in storage.table_columns(src)]
+    partials = defaultdict(list)
+    for df in storage.iter_batches(src, batch_size=batch_size, columns=columns):
+        df['records'] = 1
+        for name, keys in ROLLUPS.items():
+            if set(keys) <= set(df.columns):
+                partials[name].append(_aggregate(df, keys))
+
+    written = {}
+    for name, parts in partials.items():
+        keys = ROLLUPS[name]
+        # Batches may split a group; combine their partial sums
+        table = _aggregate(pd.concat(parts, ignore_index=True), keys)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table['yield'] = np.where(table['area_'] > 0, table['production_'] / table['area_'], np.nan)
+        table = table.sort_values(keys, kind='stable', ignore_index=True)
+        storage.save_table(table, os.path.join(out_dir, f"{name}.parquet"))
+        written[name] = len(table)
+    return written
+
+
+class Rollup:
+    """One rollup table plus an index from normalized key prefix to its contiguous row range"""
+
+    def __init__(self, name, table, keys=None):
+        self.name = name
+        self.keys = keys or ROLLUPS[name]
+        self.fields = [ENTITY_FIELDS[c] for c in self.keys[:-1]]
+        self.table = table
+        self.years = table[self.keys[-1]].to_numpy(dtype=np.int64)
+        self._build_index()
+
+    def _build_index(self):
+        prefix = self.keys[:-1]
+        # Rows are sorted by key, so each prefix is one run of equal codes
+        codes = np.column_stack([self.table[c].cat.codes.to_numpy() for c in prefix])
+        starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]).any(axis=1)])
+        stops = np.r_[starts[1:], len(self.table)]
+        names = [[normalize(v) for v in self.table[c].cat.categories] for c in prefix]
+
+        self.ranges = defaultdict(list)            # prefix tuple -> [(start, stop), ...]
+        self.by_field = [defaultdict(set) for _ in prefix]
+        for start, stop in zip(starts, stops):
+            key = tuple(names[i][codes[start, i]] for i in range(len(prefix)))
+            self.ranges[key].append((start, stop))
+            for i, value in enumerate(key):
+                self.by_field[i][value].add(key)
+
+    def covers(self, named):
+        return bool(named) and named <= set(self.fields)
+
+    def query(self, entities):
+        """Rows matching the named entities (and years, if any), or an empty DataFrame"""
+        keys = None
+        for i, field in enumerate(self.fields):
+            if entities.get(field):
+                matched = set().union(*(self.by_field[i].get(v, set()) for v in entities[field]))
+                keys = matched if keys is None else keys & matched
+        rows = [np.arange(start, stop) for key in sorted(keys or ())
+                for start, stop in self.ranges[key]]
+        if not rows:
+            return self.table.iloc[:0]
+        rows = np.concatenate(rows)
+        if entities.get('year'):
+            years = np.array(sorted(int(y) for y in entities['year']))
+            rows = rows[np.isin(self.years[rows], years)]
+        return self.table.iloc[rows]
+
+
+class RollupStore:
+    """All rollups, loaded once"""
+
+    def __init__(self, rollups, joins=None, climatology=None):
+        self.rollups = rollups
+        self.joins = joins or {}
+        self.climatology = climatology
+
+    @classmethod
+    def load(cls, root=ROLLUPS_DIR):
+        from climatology import Climatology
+        from join_index import JOINS
+        rollups, joins = {}, {}
+        for name in ROLLUPS:
+            path = os.path.join(root, f"{name}.parquet")
+            if os.path.exists(path):
+                rollups[name] = Rollup(name, storage.load_table(path))
+        for name, (_, keys) in JOINS.items():
+            path = os.path.join(root, f"{name}.parquet")
+            if os.path.exists(path):
+                joins[name] = Rollup(name, storage.load_table(path), keys)
+        return cls(rollups, joins, Climatology.load(os.path.join(root, "climatology")))
+
+    def lookup(self, entities, max_rows=MAX_TABLE_ROWS):
+        """(rollup name, exact table) for a crop question, or None if no rollup answers it
+
+        The first rollup whose key fields cover every named field is used, so
+        'rice in Bihar' reads state x crop x year and 'rice in Supaul' reads
+        district x crop x year. Questions that also ask about rainfall go to
+        the crop x rainfall joins, and rainfall questions without a crop to
+        the climatology.
+        """
+        if _asks_rainfall(entities):
+            return self.lookup_join(entities, max_rows) or self.lookup_climate(entities, max_rows)
+        named = {field for field in ENTITY_FIELDS.values() if entities.get(field)}
+        for name, rollup in self.rollups.items():
+            if rollup.covers(named):
+                table = rollup.query(entities)
+                if 0 < len(table) <= max_rows:
+                    return name, table
+                return None
+        return None
+
+    def lookup_join(self, entities, max_rows=MAX_TABLE_ROWS):
+        """(join name, crop x rainfall table) for a question naming a crop or district plus rainfall
+
+        The subdivision itself is not a key: it follows from the state or
+        district, so a state that shares its name with a subdivision
+        ('Kerala') still reads by state.
+        """
+        if 'rainfall' not in entities.get('source', ()) or entities.get('season'):
+            return None
+        if not (entities.get('crop') or entities.get('district')):
+            return None
+        named = {field for field in ('state', 'district', 'crop') if entities.get(field)}
+        for name, join in self.joins.items():
+            if join.covers(named):
+                table = join.query(entities)
+                if 0 < len(table) <= max_rows:
+                    return name, table
+                return None
+        return None
+
+    def lookup_climate(self, entities, max_rows=MAX_TABLE_ROWS):
+        """('rainfall_climatology', table) for a rainfall question about subdivisions or states
+
+        Named subdivisions win; otherwise a state reads the subdivisions that
+        cover it. The periods asked about (default Jun-Sep and annual) are
+        shown for the named years, or for every year when none are named.
+        """
+        from join_index import subdivisions_for
+        if self.climatology is None or entities.get('crop') or entities.get('district'):
+            return None
+        if not _asks_rainfall(entities):
+            return None
+        subdivisions = sorted(entities.get('subdivision') or
+                              {name for state in entities.get('state', ()) for name in subdivisions_for(state)})
+        subdivisions = [name for name in subdivisions if self.climatology.subdivision(name) is not None]
+        if not subdivisions:
+            return None
+        periods = [p for p in self.climatology.periods if p in entities.get('period', ())] or ['jjas', 'annual']
+        years = {int(y) for y in entities.get('year', ())}
+        table = self.climatology.table(subdivisions, periods, years, max_rows)
+        if 0 < len(table) <= max_rows:
+            return 'rainfall_climatology', table
+        return None
+
+
+def format_table(table):
+    """Plain-text table for the prompt: tonnes, hectares, tonnes/hectare"""
+    if 'records' in table.columns:
+        table = table.astype({'records': 'int64'})
+    table = table.rename(columns={
+        'state_name': 'State', 'district_name': 'District', 'crop': 'Crop', 'season': 'Season',
+        'crop_year': 'Year', 'production_': 'Production (tonnes)', 'area_': 'Area (hectares)',
+        'yield': 'Yield (tonnes/hectare)', 'records': 'Records',
+        'subdivisions': 'IMD subdivision', 'jjas_mm': 'Jun-Sep rain (mm)',
+        'jjas_departure_pct': 'Jun-Sep vs normal (%)', 'ond_mm': 'Oct-Dec rain (mm)',
+        'ond_departure_pct': 'Oct-Dec vs normal (%)', 'annual_mm': 'Annual rain (mm)',
+        'annual_departure_pct': 'Annual vs normal (%)',
+    })
+    return table.to_string(index=False, float_format=lambda v: f"{v:,.2f}")
+
+
+if __name__ == "__main__":
+    for name, rows in build_rollups().items():
+        print(f"✅ {name}: {rows:,} rows")
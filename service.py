@@ -0,0 +1,364 @@
+"""
+Headless Samarth query service and batch question runner
+- `serve`: asyncio HTTP/JSON service over the live vectorstore
+    POST /retrieve {"question": ..., "k": 5}  -> matching source rows
+    POST /answer   {"question": ...}          -> LLM answer + sources
+    GET  /health, GET /stats, GET /metrics (Prometheus text, SAMARTH_TRACE=1)
+- `batch`: answers a JSONL file of questions in parallel and writes one JSON
+  line per question (answer, sources, latency), then reports throughput and
+  p50/p99 latency
+- Concurrent questions are micro-batched into single embedding-model calls,
+  and in-flight LLM calls are bounded by a semaphore
+- LLM_PROVIDER=stub (or --llm stub) runs everything offline
+
+Run from the repo root:
+    python service.py serve --port 8600
+    python service.py batch questions.jsonl answers.jsonl --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+from dotenv import load_dotenv
+
+import tracing
+import vector_index
+
+VECTORSTORE_DIR = "vectorstore"
+
+MAX_BODY_BYTES = 1 << 20
+
+
+def load_components(vectorstore_dir=VECTORSTORE_DIR):
+    """Everything the answer path needs, for the live generation"""
+    from embedding_backends import for_index
+    from lexical import LexicalIndex
+    from metadata_index import MetadataIndex
+    from rollups import RollupStore
+    from shared_store import generation_path
+
+    generation = vector_index.current_generation(vectorstore_dir)
+    if generation is None:
+        raise SystemExit("❌ No vectorstore found. Run 3_build_vectorstore.py first!")
+    path = generation_path(vectorstore_dir, generation)
+    vectorstore = vector_index.load(path, for_index(path))
+    return {
+        'generation': generation,
+        'vectorstore': vectorstore,
+        'metadata_index': MetadataIndex.load(path) or MetadataIndex.from_vectorstore(vectorstore),
+        'lexical_index': LexicalIndex.load(path),
+        'rollups': RollupStore.load(),
+    }
+
+
+class EmbeddingBatcher:
+    """Collects questions for up to ``max_wait`` seconds and embeds them in one model call"""
+
+    def __init__(self, embeddings, max_batch=32, max_wait=0.005):
+        self.embeddings = embeddings
+        # Own thread: retrieval workers block on these results, so sharing their pool could deadlock
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="samarth-embed")
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+
+    async def run(self):
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Give concurrent requests one short window to join, then take whatever is queued
+            await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await loop.run_in_executor(self.executor, self.embeddings.embed_documents, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def embed(self, text):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+
+class QueryService:
+    """Retrieve/answer over shared components; safe to call from many coroutines at once"""
+
+    def __init__(self, components, backend, workers=8, max_llm_calls=4, max_batch=32, max_wait=0.005):
+        self.components = components
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="samarth")
+        self.batcher = EmbeddingBatcher(components['vectorstore'].embeddings,
+                                        max_batch=max_batch, max_wait=max_wait)
+        self.llm_slots = max_llm_calls
+        self._llm = None
+        self._loop = None
+        self._batcher_task = None
+        self.latencies = {'retrieve': deque(maxlen=10_000), 'answer': deque(maxlen=10_000)}
+        self.errors = 0
+        self.started = time.time()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._llm = asyncio.Semaphore(self.llm_slots)
+        self._batcher_task = asyncio.create_task(self.batcher.run())
+        await asyncio.sleep(0)  # let the batcher create its queue
+
+    async def stop(self):
+        self._batcher_task.cancel()
+        self.executor.shutdown(wait=False)
+        self.batcher.executor.shutdown(wait=False)
+
+    def _embed_from_thread(self, text):
+        # retrieve() runs in a worker thread; hand the embedding to the batcher on the loop
+        return asyncio.run_coroutine_threadsafe(self.batcher.embed(text), self._loop).result()
+
+    def _prepare(self, question, k):
+        from qa import prepare_answer
+        c = self.components
+        return prepare_answer(question, c['vectorstore'], c['metadata_index'], c['rollups'],
+                              c['lexical_index'], k=k, embed=self._embed_from_thread)
+
+    def _generate(self, prompt):
+        chunks = tracing.traced_stream('answer.generate', self.backend.stream(prompt), backend=self.backend.name)
+        return "".join(chunks)
+
+    async def retrieve(self, question, k=5):
+        from retrieval import retrieve
+        c = self.components
+        start = time.perf_counter()
+        docs = await self._loop.run_in_executor(
+            self.executor,
+            lambda: retrieve(question, c['vectorstore'], c['metadata_index'], c['lexical_index'],
+                             k=k, embed=self._embed_from_thread),
+        )
+        self.latencies['retrieve'].append((time.perf_counter() - start) * 1000)
+        return {'question': question, 'sources': [_source(doc) for doc in docs]}
+
+    async def answer(self, question, k=5):
+        start = time.perf_counter()
+        prompt, docs, table = await self._loop.run_in_executor(self.executor, self._prepare, question, k)
+        async with self._llm:
+            answer = await self._loop.run_in_executor(self.executor, self._generate, prompt)
+        latency = (time.perf_counter() - start) * 1000
+        self.latencies['answer'].append(latency)
+        return {
+            'question': question,
+            'answer': answer,
+            'sources': [_source(doc) for doc in docs],
+            'table': None if table is None else json.loads(table.to_json(orient='records')),
+            'latency_ms': round(latency, 1),
+        }
+
+    def stats(self):
+        out = {
+            'generation': self.components['generation'],
+            'llm_backend': self.backend.name,
+            'uptime_s': round(time.time() - self.started, 1),
+            'errors': self.errors,
+            'embedding_batches': self.batcher.batches,
+            'embedding_avg_batch': round(self.batcher.items / self.batcher.batches, 2) if self.batcher.batches else 0,
+        }
+        if tracing.enabled():
+            out['stages'] = tracing.summary()
+        for name, values in self.latencies.items():
+            values = list(values)
+            out[name] = {
+                'count': len(values),
+                'p50_ms': round(float(np.percentile(values, 50)), 1) if values else None,
+                'p99_ms': round(float(np.percentile(values, 99)), 1) if values else None,
+            }
+        return out
+
+
+def _source(doc):
+    return {'metadata': doc.metadata, 'text': doc.page_content.strip()}
+
+
+# ---------------------------------------------------------------- HTTP
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_BYTES:
+        raise ValueError("Request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+
+def _response(status, payload, keep_alive):
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), "text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload, ensure_ascii=False).encode(), "application/json"
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+
+async def _dispatch(service, method, path, body):
+    if method == 'GET' and path == '/health':
+        return HTTPStatus.OK, {'status': 'ok', 'generation': service.components['generation']}
+    if method == 'GET' and path == '/stats':
+        return HTTPStatus.OK, service.stats()
+    if method == 'GET' and path == '/metrics':
+        return HTTPStatus.OK, tracing.prometheus()
+    if method == 'POST' and path in ('/retrieve', '/answer'):
+        try:
+            request = json.loads(body or b'{}')
+            question = str(request['question']).strip()
+            k = int(request.get('k', 5))
+        except (ValueError, KeyError, TypeError):
+            return HTTPStatus.BAD_REQUEST, {'error': 'Expected JSON body {"question": "...", "k": 5}'}
+        if not question or not 1 <= k <= 50:
+            return HTTPStatus.BAD_REQUEST, {'error': 'question must be non-empty and k in 1..50'}
+        if path == '/retrieve':
+            return HTTPStatus.OK, await service.retrieve(question, k)
+        return HTTPStatus.OK, await service.answer(question, k)
+    return HTTPStatus.NOT_FOUND, {'error': f'No route for {method} {path}'}
+
+
+async def _handle(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, {'error': str(e)}, False))
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            try:
+                status, payload = await _dispatch(service, method, path, body)
+            except Exception as e:
+                service.errors += 1
+                status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host, port):
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: _handle(service, r, w), host, port)
+    print(f"✅ Samarth service listening on http://{host}:{port} "
+          f"(generation {service.components['generation']}, LLM: {service.backend.name})")
+    async with server:
+        await server.serve_forever()
+
+
+# ---------------------------------------------------------------- batch
+
+async def run_batch(service, src, dst, concurrency):
+    with open(src) as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+    await service.start()
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        question = item['question'] if isinstance(item, dict) else str(item)
+        async with gate:
+            try:
+                result = await service.answer(question)
+            except Exception as e:
+                service.errors += 1
+                result = {'question': question, 'error': str(e)}
+        if isinstance(item, dict):
+            result = {**{key: value for key, value in item.items() if key != 'question'}, **result}
+        return result
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(item) for item in questions))
+    elapsed = time.perf_counter() - start
+
+    tmp = f"{dst}.tmp"
+    with open(tmp, "w") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    os.replace(tmp, dst)
+    await service.stop()
+
+    latencies = [r['latency_ms'] for r in results if 'latency_ms' in r]
+    print("\n" + "="*60)
+    print("BATCH COMPLETE")
+    print("="*60)
+    print(f"Questions: {len(results)} ({service.errors} failed) -> {dst}")
+    print(f"Throughput: {len(results) / elapsed:.2f} questions/s ({elapsed:.1f}s, concurrency {concurrency})")
+    if latencies:
+        print(f"Latency: p50 {np.percentile(latencies, 50):,.0f} ms, p99 {np.percentile(latencies, 99):,.0f} ms")
+    stats = service.stats()
+    print(f"Embedding calls: {stats['embedding_batches']} (avg {stats['embedding_avg_batch']} questions each)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Samarth headless query service")
+    parser.add_argument('--llm', help="LLM backend: gemini or stub (default: LLM_PROVIDER)")
+    parser.add_argument('--max-llm-calls', type=int, default=4, help="LLM calls in flight at once")
+    parser.add_argument('--workers', type=int, default=8, help="threads for retrieval and LLM calls")
+    parser.add_argument('--batch-wait-ms', type=float, default=5.0, help="embedding micro-batch window")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_cmd = commands.add_parser('serve', help="run the HTTP service")
+    serve_cmd.add_argument('--host', default='127.0.0.1')
+    serve_cmd.add_argument('--port', type=int, default=8600)
+    batch_cmd = commands.add_parser('batch', help="answer a JSONL file of questions")
+    batch_cmd.add_argument('questions', help='JSONL input: {"question": ...} per line')
+    batch_cmd.add_argument('answers', help="JSONL output")
+    batch_cmd.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    load_dotenv()
+    tracing.configure()
+    from llm import get_backend
+    components = load_components()
+    service = QueryService(components, get_backend(args.llm), workers=args.workers,
+                           max_llm_calls=args.max_llm_calls, max_wait=args.batch_wait_ms / 1000)
+    try:
+        if args.command == 'serve':
+            asyncio.run(serve(service, args.host, args.port))
+        else:
+            asyncio.run(run_batch(service, args.questions, args.answers, args.concurrency))
+    except KeyboardInterrupt:
+        print("\nStopped")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
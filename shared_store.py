@@ -0,0 +1,83 @@
+"""
+Shared, read-only vectorstore generations for several app processes on one host
+- Workers never copy a generation onto their own heaps: the FAISS index
+  (IO_FLAG_MMAP_IFC), the SQLite docstore and the metadata / BM25 postings
+  are opened read-only and memory-mapped, so N workers share one copy of
+  their pages
+- With SAMARTH_SHARED_DIR (e.g. /dev/shm/samarth) the live generation is
+  first mirrored into that shared-memory directory, once per host: the
+  first worker that needs it copies it under a file lock and renames the
+  finished copy into place, and every other worker attaches that copy. Its
+  pages then stay in RAM instead of in page cache that can be evicted (or
+  on a network volume)
+- A refresh (vectorstore/CURRENT switched by vector_index.publish) is
+  mirrored the same way on first use. Workers still on the previous mirror
+  keep their mappings, and only the newest KEEP_GENERATIONS mirrors are kept
+"""
+import os
+import shutil
+import time
+
+import vector_index
+from file_lock import try_lock, unlock
+
+SHARED_DIR = os.getenv("SAMARTH_SHARED_DIR", "")
+
+LOCK_FILE = ".mirror.lock"
+
+# The row manifest is only read by incremental builds, from the original generation
+SKIP_FILES = {vector_index.MANIFEST_FILE}
+
+
+def generation_path(root, generation, shared_dir=None):
+    """Directory a worker should load ``generation`` from: its shared mirror when
+    ``shared_dir`` (default SAMARTH_SHARED_DIR) is set, else the generation itself"""
+    shared_dir = SHARED_DIR if shared_dir is None else shared_dir
+    source = vector_index.generation_path(root, generation)
+    if not shared_dir or generation == vector_index.LEGACY_GENERATION:
+        return source
+    return mirror(source, os.path.join(shared_dir, generation))
+
+
+def mirror(source, dest):
+    """Copy generation directory ``source`` to ``dest`` unless it is there already; returns ``dest``"""
+    if os.path.isdir(dest):
+        return dest
+    shared_dir = os.path.dirname(dest)
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(os.path.join(shared_dir, LOCK_FILE), "a+") as lock:
+        # One worker copies; the rest wait here and then find the finished mirror
+        while not try_lock(lock):
+            time.sleep(0.05)
+        try:
+            if not os.path.isdir(dest):
+                tmp = f"{dest}.tmp"
+                shutil.rmtree(tmp, ignore_errors=True)
+                shutil.copytree(source, tmp, ignore=lambda _, names: [n for n in names if n in SKIP_FILES])
+                # Complete mirrors only ever appear under their final name
+                os.rename(tmp, dest)
+                _prune(shared_dir, os.path.basename(dest))
+        finally:
+            unlock(lock)
+    return dest
+
+
+def _prune(shared_dir, live):
+    older = sorted(
+        (name for name in os.listdir(shared_dir)
+         if name.startswith("gen-") and not name.endswith(".tmp") and name != live
+         and os.path.isdir(os.path.join(shared_dir, name))),
+        key=lambda name: os.path.getmtime(os.path.join(shared_dir, name)),
+    )
+    # Files stay readable by processes that still map them until those let go
+    for name in older[:max(0, len(older) - (vector_index.KEEP_GENERATIONS - 1))]:
+        shutil.rmtree(os.path.join(shared_dir, name), ignore_errors=True)
+
+
+def mirror_bytes(shared_dir=None):
+    """Bytes held by the mirrors in ``shared_dir`` (0 when sharing is off)"""
+    shared_dir = SHARED_DIR if shared_dir is None else shared_dir
+    if not shared_dir or not os.path.isdir(shared_dir):
+        return 0
+    return sum(os.path.getsize(os.path.join(dirpath, name))
+               for dirpath, _, names in os.walk(shared_dir) for name in names)
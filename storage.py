@@ -0,0 +1,147 @@
+"""
+Columnar storage layer shared by every pipeline stage
+- Tables are Parquet files (via pyarrow) instead of CSV
+- Low-cardinality text columns are stored as dictionary/categorical columns
+- Numeric columns get fixed dtypes so nothing is re-parsed as object strings
+- Readers can load only the columns they need and push row filters down to the file
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Dictionary-encoded on disk, pandas 'category' in memory
+CATEGORICAL_COLUMNS = ['state_name', 'district_name', 'crop', 'season', 'subdivision']
+
+INTEGER_COLUMNS = ['crop_year', 'year']
+
+FLOAT_COLUMNS = [
+    'area_', 'production_',
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun',
+    'jul', 'aug', 'sep', 'oct', 'nov', 'dec', 'annual',
+]
+
+CATEGORY_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+
+def _field_type(name, series):
+    if name in CATEGORICAL_COLUMNS:
+        return CATEGORY_TYPE
+    if name in INTEGER_COLUMNS:
+        return pa.int32()
+    if name in FLOAT_COLUMNS or pd.api.types.is_numeric_dtype(series):
+        return pa.float64()
+    return pa.string()
+
+
+def normalize(df):
+    """Apply the storage dtypes to a DataFrame (known columns only, others to string/float64)"""
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('string').astype('category')
+        elif col in INTEGER_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int32')
+        elif col in FLOAT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif pd.api.types.is_bool_dtype(df[col]) or not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype('string')
+    return df
+
+
+def to_arrow(df):
+    """Convert a DataFrame to an Arrow table with the fixed storage schema"""
+    df = normalize(df)
+    schema = pa.schema([(col, _field_type(col, df[col])) for col in df.columns])
+    return pa.Table.from_pandas(df, preserve_index=False).cast(schema)
+
+
+def save_table(df, path):
+    """Write a DataFrame to ``path`` as Parquet (atomically)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.tmp"
+    pq.write_table(to_arrow(df), tmp)
+    os.replace(tmp, path)
+
+
+def load_table(path, columns=None, filters=None):
+    """Read a Parquet table, optionally projecting ``columns`` and pushing ``filters`` down
+
+    ``filters`` uses the pyarrow DNF form, e.g. ``[('state_name', '==', 'Bihar'), ('crop_year', '>=', 2010)]``.
+    """
+    return pd.read_parquet(path, engine='pyarrow', columns=columns, filters=filters)
+
+
+def iter_batches(path, batch_size=100_000, columns=None):
+    """Yield a Parquet table as DataFrames of at most ``batch_size`` rows"""
+    parquet = pq.ParquetFile(path)
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def table_columns(path):
+    """Column names stored in a table, without reading any rows"""
+    return pq.read_schema(path).names
+
+
+def table_rows(path):
+    """Row count from the Parquet footer, without reading any rows"""
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+class TableWriter:
+    """Append DataFrames to one Parquet file
+
+    The columns are fixed by ``columns`` if given, else by the first batch.
+    Columns a batch lacks are written as nulls; a column outside the schema
+    raises ValueError rather than being dropped.
+    """
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.tmp = f"{path}.tmp"
+        self.columns = list(columns) if columns is not None else None
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df):
+        table = to_arrow(df)
+        schema = self._writer.schema if self._writer is not None else None
+        names = self.columns or (schema.names if schema is not None else table.column_names)
+        unexpected = [c for c in table.column_names if c not in names]
+        if unexpected:
+            raise ValueError(f"{self.path}: columns {unexpected} are not in the table's columns {names}")
+        if table.column_names != names:
+            table = pa.table([
+                table[name] if name in table.column_names else pa.nulls(
+                    len(table), schema.field(name).type if schema is not None
+                    else _field_type(name, pd.Series(dtype=object)))
+                for name in names
+            ], names=names)
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._writer = pq.ParquetWriter(self.tmp, table.schema)
+        elif table.schema != self._writer.schema:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        """Finish the file and move it into place; returns the number of rows written"""
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self.tmp, self.path)
+            self._writer = None
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._writer is not None:
+            self._writer.close()
+            os.remove(self.tmp)
@@ -0,0 +1,200 @@
+"""
+Synthetic crop and rainfall tables with the data.gov.in schema
+- Same columns and file layout 1_download_data.py produces, so every later
+  stage runs on them unchanged, fully offline
+- Crop: state_name, district_name, crop_year, season, crop, area_, production_
+  (unique state/district/crop/season/year keys, ~2% rows the cleaner drops)
+- Rainfall: subdivision, year, jan..dec, annual (real IMD subdivision names,
+  monsoon-shaped monthly profile, unique subdivision/year keys)
+- Any scale: --scale 10k|1m|10m or --crop-rows N; written in chunks, so
+  memory stays flat however many rows are generated
+
+Run from the repo root:
+    python synthetic_data.py --scale 1m --root synthetic
+"""
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+CROP_PATH = 'data/agriculture/crop_production.parquet'
+RAINFALL_PATH = 'data/climate/rainfall.parquet'
+
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+CHUNK_ROWS = 500_000
+
+STATES = [
+    'Andaman and Nicobar Islands', 'Andhra Pradesh', 'Arunachal Pradesh', 'Assam', 'Bihar',
+    'Chandigarh', 'Chhattisgarh', 'Dadra and Nagar Haveli', 'Goa', 'Gujarat', 'Haryana',
+    'Himachal Pradesh', 'Jammu and Kashmir ', 'Jharkhand', 'Karnataka', 'Kerala', 'Madhya Pradesh',
+    'Maharashtra', 'Manipur', 'Meghalaya', 'Mizoram', 'Nagaland', 'Odisha', 'Puducherry',
+    'Punjab', 'Rajasthan', 'Sikkim', 'Tamil Nadu', 'Telangana ', 'Tripura', 'Uttar Pradesh',
+    'Uttarakhand', 'West Bengal',
+]
+
+# (crop, typical yield in tonnes/hectare)
+CROPS = [
+    ('Rice', 2.4), ('Wheat', 3.0), ('Maize', 2.6), ('Jowar', 0.9), ('Bajra', 1.2), ('Ragi', 1.4),
+    ('Small millets', 0.7), ('Barley', 2.5), ('Gram', 0.9), ('Arhar/Tur', 0.7), ('Moong(Green Gram)', 0.5),
+    ('Urad', 0.5), ('Masoor', 0.7), ('Other Kharif pulses', 0.5), ('Groundnut', 1.3),
+    ('Rapeseed &Mustard', 1.1), ('Sesamum', 0.4), ('Sunflower', 0.7), ('Soyabean', 1.1),
+    ('Castor seed', 1.4), ('Linseed', 0.4), ('Sugarcane', 70.0), ('Cotton(lint)', 0.5),
+    ('Jute', 2.4), ('Mesta', 1.2), ('Potato', 20.0), ('Onion', 16.0), ('Sweet potato', 9.0),
+    ('Turmeric', 4.5), ('Dry chillies', 1.5), ('Garlic', 5.0), ('Ginger', 4.0), ('Coriander', 0.6),
+    ('Banana', 30.0), ('Coconut ', 9000.0), ('Tobacco', 1.7), ('Black pepper', 0.3),
+    ('Cashewnut', 0.7), ('Arecanut', 1.5), ('Horse-gram', 0.5),
+]
+
+# Padded the way the published dataset pads them
+SEASONS = ['Kharif     ', 'Rabi       ', 'Whole Year ', 'Summer     ', 'Autumn     ', 'Winter     ']
+
+CROP_YEARS = (1997, 2015)      # crop_year range, end exclusive
+RAINFALL_YEARS = (1901, 2018)
+
+# Districts in the published dataset; more are added when the key space runs out
+MIN_DISTRICTS = 640
+
+SUBDIVISIONS = [
+    'ANDAMAN & NICOBAR ISLANDS', 'ARUNACHAL PRADESH', 'ASSAM & MEGHALAYA', 'NAGA MANI MIZO TRIPURA',
+    'SUB HIMALAYAN WEST BENGAL & SIKKIM', 'GANGETIC WEST BENGAL', 'ORISSA', 'JHARKHAND', 'BIHAR',
+    'EAST UTTAR PRADESH', 'WEST UTTAR PRADESH', 'UTTARAKHAND', 'HARYANA DELHI & CHANDIGARH', 'PUNJAB',
+    'HIMACHAL PRADESH', 'JAMMU & KASHMIR', 'WEST RAJASTHAN', 'EAST RAJASTHAN', 'WEST MADHYA PRADESH',
+    'EAST MADHYA PRADESH', 'GUJARAT REGION', 'SAURASHTRA & KUTCH', 'KONKAN & GOA', 'MADHYA MAHARASHTRA',
+    'MATATHWADA', 'VIDARBHA', 'CHHATTISGARH', 'COASTAL ANDHRA PRADESH', 'TELANGANA', 'RAYALSEEMA',
+    'TAMIL NADU', 'COASTAL KARNATAKA', 'NORTH INTERIOR KARNATAKA', 'SOUTH INTERIOR KARNATAKA', 'KERALA',
+    'LAKSHADWEEP',
+]
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+# All-India share of annual rainfall per month (southwest monsoon peak in Jul/Aug)
+MONTH_SHARE = np.array([0.015, 0.02, 0.025, 0.03, 0.05, 0.14, 0.24, 0.22, 0.14, 0.075, 0.03, 0.015])
+
+
+def parse_rows(value):
+    """'10k', '1m', '10m' or a plain row count"""
+    value = str(value).lower().replace(',', '').replace('_', '')
+    if value in SCALES:
+        return SCALES[value]
+    return int(value)
+
+
+def default_rainfall_rows(crop_rows):
+    """Rainfall at 1/10 of the crop rows, but never less than the full real subdivision x year grid"""
+    return max(len(SUBDIVISIONS) * (RAINFALL_YEARS[1] - RAINFALL_YEARS[0]), crop_rows // 10)
+
+
+def _sample_ids(rng, space, rows):
+    """``rows`` distinct ids from range(space), in random order"""
+    if rows > space:
+        raise ValueError(f"Cannot draw {rows:,} unique keys from {space:,}")
+    return rng.choice(space, size=rows, replace=False)
+
+
+def write_crop_table(path, rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """Write ``rows`` raw crop records to ``path``; returns the row count"""
+    rng = np.random.default_rng(seed)
+    years = CROP_YEARS[1] - CROP_YEARS[0]
+    per_district = years * len(SEASONS) * len(CROPS)
+    # Keys are drawn from a space about twice the row count, so districts stay sparse like the real data
+    districts = max(MIN_DISTRICTS, math.ceil(2 * rows / per_district))
+    ids = _sample_ids(rng, districts * per_district, rows)
+
+    district_names = np.array([f"DISTRICT_{i:04d}" for i in range(districts)], dtype=object)
+    district_states = np.array(STATES, dtype=object)[rng.integers(0, len(STATES), districts)]
+    crop_names = np.array([name for name, _ in CROPS], dtype=object)
+    crop_yields = np.array([y for _, y in CROPS])
+    seasons = np.array(SEASONS, dtype=object)
+
+    with storage.TableWriter(path) as writer:
+        for start in range(0, rows, chunk_rows):
+            chunk = ids[start:start + chunk_rows]
+            n = len(chunk)
+            year, rest = chunk % years, chunk // years
+            season, rest = rest % len(SEASONS), rest // len(SEASONS)
+            crop, district = rest % len(CROPS), rest // len(CROPS)
+
+            area = rng.gamma(1.5, 2000.0, n).round(0) + 1
+            production = (area * crop_yields[crop] * rng.lognormal(0.0, 0.35, n)).round(1)
+            df = pd.DataFrame({
+                'state_name': district_states[district],
+                'district_name': district_names[district],
+                'crop_year': CROP_YEARS[0] + year,
+                'season': seasons[season],
+                'crop': crop_names[crop],
+                'area_': area,
+                'production_': production,
+            })
+            # Rows the cleaner is expected to drop: missing/zero production, district totals
+            df.loc[rng.random(n) < 0.01, 'production_'] = np.nan
+            df.loc[rng.random(n) < 0.005, 'production_'] = 0.0
+            df.loc[rng.random(n) < 0.005, 'district_name'] = 'Total'
+            writer.write(df)
+    return rows
+
+
+def write_rainfall_table(path, rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """Write ``rows`` raw subdivision-year rainfall records to ``path``; returns the row count"""
+    rng = np.random.default_rng(seed + 1)
+    years = RAINFALL_YEARS[1] - RAINFALL_YEARS[0]
+    count = max(len(SUBDIVISIONS), math.ceil(rows / years))
+    names = np.array(SUBDIVISIONS + [f"SUBDIVISION_{i}" for i in range(len(SUBDIVISIONS), count)],
+                     dtype=object)
+    normals = rng.gamma(4.0, 350.0, count)          # long-period annual average per subdivision, mm
+    ids = _sample_ids(rng, count * years, rows)
+
+    with storage.TableWriter(path) as writer:
+        for start in range(0, rows, chunk_rows):
+            chunk = ids[start:start + chunk_rows]
+            n = len(chunk)
+            year, subdivision = chunk % years, chunk // years
+            monthly = (normals[subdivision, None] * MONTH_SHARE[None, :]
+                       * rng.gamma(4.0, 0.25, (n, len(MONTHS)))).round(1)
+            df = pd.DataFrame(monthly, columns=MONTHS)
+            df.insert(0, 'subdivision', names[subdivision])
+            df.insert(1, 'year', RAINFALL_YEARS[0] + year)
+            df['annual'] = monthly.sum(axis=1).round(1)
+            # A few missing months, as in the IMD series
+            gaps = rng.random((n, len(MONTHS))) < 0.002
+            df[MONTHS] = df[MONTHS].mask(gaps)
+            writer.write(df)
+    return rows
+
+
+def generate(root='.', crop_rows=SCALES['10k'], rainfall_rows=None, seed=0):
+    """Write both raw tables under ``root`` at the paths 2_clean_data.py reads"""
+    rainfall_rows = default_rainfall_rows(crop_rows) if rainfall_rows is None else rainfall_rows
+    crop = write_crop_table(os.path.join(root, CROP_PATH), crop_rows, seed)
+    rainfall = write_rainfall_table(os.path.join(root, RAINFALL_PATH), rainfall_rows, seed)
+    return crop, rainfall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Samarth input data")
+    parser.add_argument('--scale', default='10k', help="10k, 1m, 10m or a row count (crop rows)")
+    parser.add_argument('--crop-rows', help="crop rows (overrides --scale)")
+    parser.add_argument('--rainfall-rows', help="rainfall rows (default: crop rows / 10, at least 4,212)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--root', default='synthetic',
+                        help="directory to write data/ under ('.' replaces the downloaded data)")
+    args = parser.parse_args()
+
+    crop_rows = parse_rows(args.crop_rows or args.scale)
+    rainfall_rows = parse_rows(args.rainfall_rows) if args.rainfall_rows else None
+
+    print("\n" + "="*60)
+    print("PROJECT SAMARTH - SYNTHETIC DATA")
+    print("="*60)
+    crop, rainfall = generate(args.root, crop_rows, rainfall_rows, args.seed)
+    print(f"✅ {crop:,} crop records -> {os.path.join(args.root, CROP_PATH)}")
+    print(f"✅ {rainfall:,} rainfall records -> {os.path.join(args.root, RAINFALL_PATH)}")
+    print(f"\nNext: run 2_clean_data.py and 3_build_vectorstore.py from {args.root}/")
+
+
+if __name__ == "__main__":
+    main()
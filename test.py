@@ -25,8 +25,9 @@
 #     print("❌ The response is not valid JSON. Check your API key or resource ID.")
 
 
-import pandas as pd
-df = pd.read_csv('processed_data/crop_data_cleaned.csv')
+import storage
+df = storage.load_table('processed_data/crop_data_cleaned.parquet',
+                        columns=['state_name', 'crop_year', 'crop', 'district_name'])
 print("States:", df['state_name'].unique())
 print("Years:", df['crop_year'].unique())
 print("Crops:", df['crop'].unique())
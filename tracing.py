@@ -0,0 +1,368 @@
+"""
+Timing spans and metrics for the answer path and the build scripts
+- span('retrieve.search', k=5) times a block; spans nest per thread/task, and
+  s.set(prompt_tokens=...) / annotate(...) attach sizes and token counts
+- Rolling p50/p95 per span name (last SAMARTH_TRACE_WINDOW runs) for the
+  app's sidebar, service /stats and summary tables
+- Exports: one JSON line per finished top-level span (SAMARTH_TRACE_LOG, a
+  path or '-' for stderr) and Prometheus text (prometheus(), served by
+  service.py at /metrics or by serve_metrics() on SAMARTH_METRICS_PORT)
+- Off unless SAMARTH_TRACE=1 (or enable()); when off span() returns a shared
+  no-op object, so instrumented code pays one function call per span
+"""
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+
+WINDOW = int(os.getenv('SAMARTH_TRACE_WINDOW', '500'))
+
+_current = contextvars.ContextVar('samarth_span', default=None)
+
+
+def _env_enabled():
+    return os.getenv('SAMARTH_TRACE', '0').lower() in ('1', 'true', 'yes', 'on')
+
+
+_enabled = _env_enabled()
+
+
+def configure():
+    """Re-read SAMARTH_TRACE, e.g. after load_dotenv()"""
+    enable(_env_enabled())
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ('name', 'attrs', 'start', 'duration', 'children', 'parent', 'error', '_token')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+        self.duration = None
+        self.error = None
+
+    def __enter__(self):
+        self.parent = _current.get()
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        _close(self)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        out = {'name': self.name, 'ms': round(self.duration * 1000, 3)}
+        if self.attrs:
+            out['attrs'] = self.attrs
+        if self.error:
+            out['error'] = self.error
+        if self.children:
+            out['spans'] = [child.to_dict() for child in self.children]
+        return out
+
+
+def _close(s):
+    TRACER.observe(s)
+    if s.parent is not None:
+        s.parent.children.append(s)
+    else:
+        TRACER.finish(s)
+
+
+def span(name, **attrs):
+    """Context manager timing ``name``; a no-op when tracing is off"""
+    if not _enabled:
+        return NOOP
+    return Span(name, attrs)
+
+
+def annotate(**attrs):
+    """Attach attributes to the innermost open span (if any)"""
+    if _enabled:
+        current = _current.get()
+        if current is not None:
+            current.attrs.update(attrs)
+
+
+def record(name, seconds, **attrs):
+    """Record an already-timed stage as a span of the innermost open span"""
+    if not _enabled:
+        return
+    s = Span(name, attrs)
+    s.start = time.perf_counter() - seconds
+    s.duration = seconds
+    s.parent = _current.get()
+    _close(s)
+
+
+def traced_iter(name, iterable):
+    """Yield from ``iterable``, recording the time spent producing each item as span ``name``"""
+    if not _enabled:
+        yield from iterable
+        return
+    it = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        record(name, time.perf_counter() - start)
+        yield item
+
+
+def traced_stream(name, chunks, **attrs):
+    """Wrap a chunk generator: one span from first pull to exhaustion, with time-to-first-chunk
+
+    The span is current only while the wrapped generator runs, so backends can
+    annotate() it (e.g. with token counts) whichever thread consumes the stream.
+    """
+    if not _enabled:
+        yield from chunks
+        return
+    s = Span(name, attrs)
+    s.start = time.perf_counter()
+    it = iter(chunks)
+    count = chars = 0
+    try:
+        while True:
+            token = _current.set(s)
+            try:
+                chunk = next(it)
+            except StopIteration:
+                break
+            finally:
+                _current.reset(token)
+            if count == 0:
+                s.attrs['first_chunk_ms'] = round((time.perf_counter() - s.start) * 1000, 3)
+            count += 1
+            chars += len(chunk)
+            yield chunk
+    except Exception as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.duration = time.perf_counter() - s.start
+        s.attrs.update(chunks=count, output_chars=chars)
+        s.parent = _current.get()
+        _close(s)
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) for prompts with no tokenizer at hand"""
+    return (len(text) + 3) // 4
+
+
+class Tracer:
+    """Rolling per-span durations and numeric attributes, plus the JSON log sink"""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._durations = {}          # span name -> deque of seconds
+        self._values = {}             # (span name, attr) -> deque of numbers
+        self._counts = {}             # span name -> [count, total seconds, errors]
+        self._log = None
+
+    def observe(self, s):
+        with self._lock:
+            durations = self._durations.get(s.name)
+            if durations is None:
+                durations = self._durations[s.name] = deque(maxlen=self.window)
+                self._counts[s.name] = [0, 0.0, 0]
+            durations.append(s.duration)
+            counts = self._counts[s.name]
+            counts[0] += 1
+            counts[1] += s.duration
+            counts[2] += s.error is not None
+            for key, value in s.attrs.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values = self._values.get((s.name, key))
+                    if values is None:
+                        values = self._values[(s.name, key)] = deque(maxlen=self.window)
+                    values.append(value)
+
+    def finish(self, root):
+        target = os.getenv('SAMARTH_TRACE_LOG')
+        if not target:
+            return
+        record = {'ts': round(time.time(), 3), 'trace_id': uuid.uuid4().hex[:16], 'pid': os.getpid(),
+                  **root.to_dict()}
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if target == '-':
+                sys.stderr.write(line)
+                return
+            if self._log is None or self._log.name != target:
+                os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+                self._log = open(target, 'a', buffering=1)
+            self._log.write(line)
+
+    def summary(self):
+        """{span name: {count, p50_ms, p95_ms, last_ms, attrs: {attr: p50}}}, sorted by name"""
+        with self._lock:
+            last = {name: d[-1] for name, d in self._durations.items()}
+            durations = {name: sorted(d) for name, d in self._durations.items()}
+            values = {key: sorted(v) for key, v in self._values.items()}
+            counts = {name: list(c) for name, c in self._counts.items()}
+        out = {}
+        for name in sorted(durations):
+            d = [seconds * 1000 for seconds in durations[name]]
+            out[name] = {
+                'count': counts[name][0],
+                'errors': counts[name][2],
+                'p50_ms': round(_quantile(d, 0.5), 3),
+                'p95_ms': round(_quantile(d, 0.95), 3),
+                'last_ms': round(last[name] * 1000, 3),
+                'attrs': {key: round(_quantile(v, 0.5), 3)
+                          for (span_name, key), v in values.items() if span_name == name},
+            }
+        return out
+
+    def prometheus(self):
+        """Prometheus text exposition: a summary per span plus attribute quantiles"""
+        with self._lock:
+            durations = {name: sorted(d) for name, d in self._durations.items()}
+            values = {key: sorted(v) for key, v in self._values.items()}
+            counts = {name: list(c) for name, c in self._counts.items()}
+        lines = [
+            "# HELP samarth_span_seconds Duration of instrumented stages (rolling quantiles)",
+            "# TYPE samarth_span_seconds summary",
+        ]
+        for name in sorted(durations):
+            label = _label(name)
+            for q in (0.5, 0.95):
+                lines.append(f'samarth_span_seconds{{span="{label}",quantile="{q}"}} '
+                             f'{_quantile(durations[name], q):.6f}')
+            lines.append(f'samarth_span_seconds_count{{span="{label}"}} {counts[name][0]}')
+            lines.append(f'samarth_span_seconds_sum{{span="{label}"}} {counts[name][1]:.6f}')
+        lines += [
+            "# HELP samarth_span_errors_total Instrumented stages that raised",
+            "# TYPE samarth_span_errors_total counter",
+        ]
+        lines += [f'samarth_span_errors_total{{span="{_label(name)}"}} {counts[name][2]}'
+                  for name in sorted(counts)]
+        lines += [
+            "# HELP samarth_span_attribute Sizes and token counts recorded on spans (rolling quantiles)",
+            "# TYPE samarth_span_attribute summary",
+        ]
+        for (name, key) in sorted(values):
+            for q in (0.5, 0.95):
+                lines.append(f'samarth_span_attribute{{span="{_label(name)}",attr="{_label(key)}",'
+                             f'quantile="{q}"}} {_quantile(values[(name, key)], q):.6g}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._values.clear()
+            self._counts.clear()
+
+
+def _quantile(ordered, q):
+    """Linear-interpolated quantile of an already sorted, non-empty list"""
+    position = (len(ordered) - 1) * q
+    lo = int(position)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (position - lo)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+TRACER = Tracer()
+
+
+def summary():
+    return TRACER.summary()
+
+
+def prometheus():
+    return TRACER.prometheus()
+
+
+def print_summary(title="STAGE TIMINGS"):
+    """Table of the recorded spans, for the end of a build script run"""
+    if not _enabled:
+        return
+    stats = TRACER.summary()
+    if not stats:
+        return
+    print("\n" + "="*60)
+    print(title)
+    print("="*60)
+    print(f"{'stage':<32} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, s in stats.items():
+        print(f"{name:<32} {s['count']:>5} {s['p50_ms']:>10,.1f} {s['p95_ms']:>10,.1f}")
+
+
+def serve_metrics(port=None):
+    """Serve prometheus() on http://0.0.0.0:<port>/metrics from a daemon thread (once per process)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    port = int(port or os.getenv('SAMARTH_METRICS_PORT') or 0)
+    if not port or getattr(serve_metrics, 'server', None) is not None:
+        return getattr(serve_metrics, 'server', None)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    except OSError:
+        # Another process (e.g. a second Streamlit worker) already serves this port
+        return None
+    threading.Thread(target=server.serve_forever, name='samarth-metrics', daemon=True).start()
+    serve_metrics.server = server
+    return server
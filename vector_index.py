@@ -0,0 +1,251 @@
+"""
+Versioned on-disk layout for the FAISS vector store
+- Each build or update is saved to its own generation directory
+- vectorstore/CURRENT names the live generation and is switched atomically,
+  so a running app never loads a half-written index
+- Each generation has a manifest (row key -> content hash) that incremental
+  updates diff against
+- The FAISS index type (flat, IVF, IVF-PQ, IVF-SQ8, HNSW) is chosen at build
+  time and recorded with the generation, along with its search parameters
+- Documents live in a memory-mapped SQLite docstore (docstore.py) rather than
+  a pickled index.pkl; generations saved before that still load
+- faiss/numpy/pandas are imported where they are used, so checking for an
+  index (exists, current_generation) stays cheap at app startup
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "rows.parquet"
+CONFIG_FILE = "index.json"
+
+# Index types and the faiss index_factory description each one builds
+INDEX_TYPES = {
+    "flat": "Flat",
+    "ivf": "IVF{nlist},Flat",
+    "ivfpq": "IVF{nlist},PQ{pq_m}x{pq_bits}",
+    "ivfsq8": "IVF{nlist},SQ8",
+    "hnsw": "HNSW{hnsw_m}",
+}
+
+DEFAULT_INDEX_PARAMS = {
+    "nlist": 1024,       # IVF: number of coarse clusters (capped to corpus size)
+    "nprobe": 16,        # IVF: clusters scanned per query
+    "pq_m": 48,          # PQ: sub-quantizers (must divide the embedding dim)
+    "pq_bits": 8,        # PQ: bits per sub-quantizer code
+    "hnsw_m": 32,        # HNSW: graph neighbours per node
+    "ef_construction": 80,
+    "ef_search": 64,     # HNSW: candidate list size per query
+}
+
+# IVF training wants ~40 points per cluster; more than this adds little
+TRAIN_POINTS_PER_LIST = 64
+
+# Generations kept on disk, so readers that just resolved CURRENT can still load theirs
+KEEP_GENERATIONS = 2
+
+# A vectorstore saved straight into the root directory (before generations existed)
+LEGACY_GENERATION = "."
+
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def unique_keys(keys, seen):
+    """Make row keys unique across a whole build; repeats get a '#n' suffix
+
+    ``seen`` is a Counter shared across every batch of the build.
+    """
+    out = []
+    for key in keys:
+        n = seen[key]
+        seen[key] += 1
+        out.append(key if n == 0 else f"{key}#{n}")
+    return out
+
+
+def current_generation(root):
+    """Name of the live generation, or None if nothing has been built yet"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        if os.path.exists(os.path.join(root, "index.faiss")):
+            return LEGACY_GENERATION
+        return None
+
+
+def generation_path(root, generation):
+    return os.path.normpath(os.path.join(root, generation))
+
+
+def exists(root):
+    generation = current_generation(root)
+    if generation is None:
+        return False
+    path = generation_path(root, generation)
+    return (os.path.exists(os.path.join(path, "index.faiss"))
+            and (os.path.exists(os.path.join(path, "docs.sqlite"))
+                 or os.path.exists(os.path.join(path, "index.pkl"))))
+
+
+def load(path, embeddings, in_memory=False):
+    """Load the vectorstore saved in generation directory ``path``
+
+    The FAISS index is memory-mapped (faiss >= 1.8) and documents come from
+    the SQLite docstore, rendered per hit. With ``in_memory`` every document is rendered
+    into an InMemoryDocstore keyed by row key, which is what incremental
+    updates (delete/add by key) need.
+    """
+    import faiss
+    from langchain.vectorstores import FAISS
+    from docstore import PositionIds, SqliteDocstore
+
+    if not os.path.exists(os.path.join(path, "docs.sqlite")):
+        # Generation from before the SQLite docstore: the pickle is all there is
+        vectorstore = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    else:
+        # Map the vectors read-only rather than copying them, unless they are about to change
+        flags = 0 if in_memory else getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        index = faiss.read_index(os.path.join(path, "index.faiss"), flags)
+        store = SqliteDocstore(path)
+        if in_memory:
+            docs, index_to_docstore_id = store.to_memory()
+            vectorstore = FAISS(embeddings, index, docs, index_to_docstore_id)
+        else:
+            vectorstore = FAISS(embeddings, index, store, PositionIds(index.ntotal))
+    apply_search_params(vectorstore.index, load_config(path))
+    return vectorstore
+
+
+def load_manifest(root):
+    """{row key: content hash} for the live generation, or None if it has no manifest"""
+    generation = current_generation(root)
+    if generation is None:
+        return None
+    path = os.path.join(generation_path(root, generation), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    import storage
+    df = storage.load_table(path)
+    return dict(zip(df['key'], df['hash']))
+
+
+def index_config(index_type="flat", **params):
+    """Validated index configuration: {"type": ..., "params": {...}}"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; choose from {', '.join(INDEX_TYPES)}")
+    merged = dict(DEFAULT_INDEX_PARAMS)
+    merged.update({k: v for k, v in params.items() if v is not None})
+    return {"type": index_type, "params": merged}
+
+
+def build_index(vectors, config):
+    """Build (and train, if needed) a faiss index of ``config``'s type over ``vectors``
+
+    Vectors keep their row positions, so an existing index_to_docstore_id still applies.
+    """
+    import faiss
+    import numpy as np
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    params = dict(config["params"])
+    # Never ask for more clusters than the corpus can train
+    params["nlist"] = max(1, min(params["nlist"], n // 39 or 1))
+
+    index = faiss.index_factory(dim, INDEX_TYPES[config["type"]].format(**params), faiss.METRIC_L2)
+    if config["type"] == "hnsw":
+        faiss.downcast_index(index).hnsw.efConstruction = params["ef_construction"]
+    if not index.is_trained:
+        # PQ codebooks need a few thousand points of their own, even with few lists
+        sample = min(n, max(params["nlist"] * TRAIN_POINTS_PER_LIST, 10_000))
+        rows = np.random.default_rng(0).choice(n, sample, replace=False) if sample < n else slice(None)
+        index.train(vectors[rows])
+    index.add(vectors)
+    apply_search_params(index, config)
+    return index
+
+
+def apply_search_params(index, config):
+    """Set query-time parameters (nprobe / efSearch) on a loaded index"""
+    if not config:
+        return
+    import faiss
+    params = faiss.ParameterSpace()
+    if config["type"].startswith("ivf"):
+        params.set_index_parameter(index, "nprobe", int(config["params"]["nprobe"]))
+    elif config["type"] == "hnsw":
+        params.set_index_parameter(index, "efSearch", int(config["params"]["ef_search"]))
+
+
+def flat_vectors(index):
+    """All vectors of an exact (flat) index, in row order"""
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def load_config(path):
+    """Index configuration stored with a generation; flat if none was recorded"""
+    try:
+        with open(os.path.join(path, CONFIG_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return index_config("flat")
+
+
+def publish(root, vectorstore, keys, hashes, tables, config=None):
+    """Save ``vectorstore`` as a new generation and make it the live one; returns its name
+
+    ``tables`` lists the (source, parquet path, key function) the rows came
+    from; the docstore is written from them rather than from rendered text.
+    """
+    import faiss
+    import pandas as pd
+    import storage
+    from docstore import SqliteDocstore, write_docstore
+    from lexical import LexicalIndex
+    from metadata_index import MetadataIndex
+    os.makedirs(root, exist_ok=True)
+    generation = f"gen-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}"
+    path = os.path.join(root, generation)
+
+    os.makedirs(path)
+    faiss.write_index(vectorstore.index, os.path.join(path, "index.faiss"))
+    write_docstore(path, vectorstore.index_to_docstore_id, tables)
+    # Side indexes over the same rows, addressed by the same vector positions, streamed from the docstore
+    docstore = SqliteDocstore(path)
+    MetadataIndex.from_metadatas(docstore.iter_metadatas()).save(path)
+    LexicalIndex.build(docstore.iter_documents()).save(path)
+    storage.save_table(pd.DataFrame({'key': keys, 'hash': hashes}), os.path.join(path, MANIFEST_FILE))
+    with open(os.path.join(path, CONFIG_FILE), "w") as f:
+        json.dump(config or index_config("flat"), f, indent=2)
+
+    # The generation is complete on disk; switching CURRENT is the commit point
+    tmp = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(tmp, "w") as f:
+        f.write(generation)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+
+    _prune(root, generation)
+    return generation
+
+
+def _prune(root, live):
+    older = sorted(
+        (name for name in os.listdir(root)
+         if name.startswith("gen-") and name != live and os.path.isdir(os.path.join(root, name))),
+        key=lambda name: os.path.getmtime(os.path.join(root, name)),
+    )
+    for name in older[:max(0, len(older) - (KEEP_GENERATIONS - 1))]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    # Files from a pre-generation build in the root are superseded now
+    for name in ("index.faiss", "index.pkl"):
+        legacy = os.path.join(root, name)
+        if os.path.exists(legacy):
+            os.remove(legacy)